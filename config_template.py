@@ -76,6 +76,10 @@ MAP_CONFIG = {
     "show_buildings": True,  # 是否显示建筑物
 }
 
+# 服务区域（西, 南, 东, 北），坐标在此范围外的上报视为可疑（多为地理编码错误），
+# 不计入热力图和插值。不配置时取各区县中心的范围向外扩展 25 公里
+# SERVICE_AREA = (120.2, 31.6, 121.95, 32.75)
+
 # ================================
 # 数据配置
 # ================================
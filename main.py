@@ -11,6 +11,12 @@
     
 或双击运行（Windows）。
 
+带参数运行时使用命令行模式（不启动图形界面，适合服务器部署）:
+    python main.py generate      # 生成地图
+    python main.py serve         # 启动HTTP服务器
+    python main.py run --watch   # 生成地图、启动服务器并监视数据文件
+    python main.py --help
+
 作者: Signal Coverage Mapper Team
 版本: v2.1
 许可: MIT License
@@ -23,7 +29,11 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 def main():
-    """主函数 - 启动GUI应用程序"""
+    """主函数 - 启动GUI应用程序，带参数时运行命令行模式"""
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    
     try:
         from signal_mapper_gui import main as gui_main
         gui_main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可疑上报识别
+有些上报本身是错的：周围几十条上报都是 8 分的街区里冒出一条 1 分，
+或者地理编码错误把点放到了几十公里外的海上。本模块标出两类可疑上报：
+- 坐标不在服务区域内（默认为各区县中心的范围向外扩展 AREA_MARGIN_METERS，
+  可在 config.py 中用 SERVICE_AREA = (西, 南, 东, 北) 指定）
+- 信号与周围上报明显不符：取附近 k 个上报（不含自身）信号的中位数和
+  绝对中位差（MAD），稳健 z 值 = (信号 - 中位数) / (1.4826 × MAD) 超过阈值
+近邻用 GeoIndex 批量查询，中位数对排序后的 (查询点, k) 矩阵按位置取值，全程向量化。
+可疑上报默认不参与热力图、插值和密度计算，但仍在地图上显示。
+"""
+
+import numpy as np
+import pandas as pd
+
+from districts import DISTRICT_CENTERS
+from spatial_index import GeoIndex, meter_scales
+
+try:
+    from config import SERVICE_AREA
+except ImportError:
+    SERVICE_AREA = None
+
+# 未配置服务区域时，各区县中心的范围向外扩展的距离（米）
+AREA_MARGIN_METERS = 25000
+# 参与比较的近邻数和近邻的最大距离（米）
+DEFAULT_NEIGHBORS = 20
+DEFAULT_RADIUS_METERS = 300
+# 近邻少于该数时不判断信号是否异常
+MIN_NEIGHBORS = 5
+# 稳健 z 值的阈值（Iglewicz-Hoaglin 建议的 3.5）
+Z_THRESHOLD = 3.5
+# MAD 的下限（信号等级）：近邻信号完全一致时 MAD 为 0，避免相差一两级就被标为异常
+MIN_MAD = 1.0
+# 正态分布下 MAD 与标准差的换算系数
+MAD_SCALE = 1.4826
+# 近邻查询的网格边长（米）：远小于近邻距离，密集区域只需检查相邻几格，
+# 稀疏区域逐圈扩大到近邻距离为止
+INDEX_CELL_METERS = 25
+# 每批查询近邻的点数，控制临时数组的大小
+QUERY_CHUNK = 20000
+
+ANOMALY_COLUMNS = ['outside_area', 'neighbors', 'local_median', 'local_mad', 'z',
+                   'signal_outlier', 'anomaly']
+
+
+def service_area():
+    """服务区域 (西, 南, 东, 北)"""
+    if SERVICE_AREA is not None:
+        return tuple(SERVICE_AREA)
+    centers = np.array([(lng, lat) for _, lng, lat in DISTRICT_CENTERS])
+    lng_scale, lat_scale = meter_scales(centers[:, 1])
+    west, south = centers.min(axis=0)
+    east, north = centers.max(axis=0)
+    return (west - AREA_MARGIN_METERS / lng_scale, south - AREA_MARGIN_METERS / lat_scale,
+            east + AREA_MARGIN_METERS / lng_scale, north + AREA_MARGIN_METERS / lat_scale)
+
+
+def _sorted_row_median(values, count):
+    """每行已升序排列、有效值在前（共 count 个）的矩阵的行中位数，count 为 0 时为 NaN"""
+    rows = np.arange(len(values))
+    last = np.maximum(count - 1, 0)
+    low = values[rows, last // 2]
+    high = values[rows, np.minimum(count // 2, last)]
+    return np.where(count > 0, (low + high) / 2, np.nan)
+
+
+def local_signal_stats(lng, lat, signal, k=DEFAULT_NEIGHBORS, radius=DEFAULT_RADIUS_METERS):
+    """每个点附近 radius 米内最近的 k 个其他点的 (近邻数, 信号中位数, MAD)"""
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    signal = np.asarray(signal, dtype=float)
+    count = np.zeros(len(lng), dtype=np.int64)
+    median = np.full(len(lng), np.nan)
+    mad = np.full(len(lng), np.nan)
+    if len(lng) < 2:
+        return count, median, mad
+
+    index = GeoIndex(lng, lat, cell_meters=min(INDEX_CELL_METERS, radius))
+    # 按网格顺序分批查询，同一批的点在空间上相邻，访问的索引数据也集中
+    queries = index.grid.order
+    for begin in range(0, len(lng), QUERY_CHUNK):
+        rows = queries[begin:begin + QUERY_CHUNK]
+        # 多取一个，去掉查询点自身
+        _, idx = index.query_knn(lng[rows], lat[rows], k + 1, max_distance=radius)
+        valid = (idx >= 0) & (idx != rows[:, None])
+        # 自身不在结果中时（同一位置的点超过 k 个）去掉最远的一个
+        valid[:, -1] &= valid.sum(axis=1) <= k
+        n = valid.sum(axis=1)
+        neighbor = np.sort(np.where(valid, signal[np.maximum(idx, 0)], np.inf), axis=1)
+        center = _sorted_row_median(neighbor, n)
+        deviation = np.sort(np.where(valid, np.abs(signal[np.maximum(idx, 0)] - center[:, None]),
+                                     np.inf), axis=1)
+        count[rows], median[rows], mad[rows] = n, center, _sorted_row_median(deviation, n)
+    return count, median, mad
+
+
+def detect_anomalies(located, k=DEFAULT_NEIGHBORS, radius=DEFAULT_RADIUS_METERS,
+                     threshold=Z_THRESHOLD, bounds=None):
+    """标出可疑上报，返回与 located 逐行对应（索引相同）的 ANOMALY_COLUMNS 的 DataFrame
+
+    服务区域外的点不作为其他点的近邻，它们自身的信号也不再判断。
+    """
+    lng = located['lng'].to_numpy(dtype=float)
+    lat = located['lat'].to_numpy(dtype=float)
+    signal = located['signal'].to_numpy(dtype=float)
+    west, south, east, north = service_area() if bounds is None else bounds
+    inside = (lng >= west) & (lng <= east) & (lat >= south) & (lat <= north)
+
+    neighbors = np.zeros(len(lng), dtype=np.int64)
+    median = np.full(len(lng), np.nan)
+    mad = np.full(len(lng), np.nan)
+    rows = np.nonzero(inside)[0]
+    neighbors[rows], median[rows], mad[rows] = local_signal_stats(
+        lng[rows], lat[rows], signal[rows], k, radius)
+
+    z = (signal - median) / (MAD_SCALE * np.maximum(mad, MIN_MAD))
+    outlier = (neighbors >= MIN_NEIGHBORS) & (np.abs(np.nan_to_num(z)) > threshold)
+    return pd.DataFrame({
+        'outside_area': ~inside, 'neighbors': neighbors, 'local_median': median,
+        'local_mad': mad, 'z': z, 'signal_outlier': outlier, 'anomaly': ~inside | outlier,
+    }, index=located.index)
+
+
+def drop_anomalies(located, **options):
+    """去掉可疑上报，返回 (剩余的上报, 可疑上报及其判断依据)"""
+    flags = detect_anomalies(located, **options)
+    anomaly = flags['anomaly'].to_numpy()
+    return located[~anomaly], located[anomaly].join(flags[anomaly])
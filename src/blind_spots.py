@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+盲区识别
+把弱信号上报（信号强度 <= 2）落到规则网格上，相邻的盲区格子连成一片，
+每片输出一个凸包多边形及其统计（上报数、弱信号占比、平均信号、面积），
+让使用者看到"这几片区域是盲区"，而不是成千上万个红点。
+网格统计、连通分量（并查集的向量化实现）都用 numpy 完成。
+"""
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import meter_scales
+
+# 弱信号阈值：信号强度不高于该值的上报视为盲区上报
+WEAK_SIGNAL = 2
+DEFAULT_CELL_METERS = 200
+# 格子内弱信号上报的占比达到该值才算盲区格子，避免少数异常上报把正常区域标为盲区
+MIN_WEAK_SHARE = 0.3
+# 一片盲区至少包含的弱信号上报数
+MIN_AREA_REPORTS = 5
+
+BLIND_SPOT_COLUMNS = ['area_id', 'lng', 'lat', 'path', 'cells', 'area_km2', 'reports', 'weak',
+                      'weak_share', 'mean_signal']
+
+# 8 邻域中"向前"的 4 个方向，每对相邻格子只生成一条边
+_FORWARD_NEIGHBORS = [(1, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+def connected_components(count, u, v):
+    """无向图的连通分量，u、v 为边的两个端点，返回每个顶点的分量编号（分量内最小顶点号）
+
+    向量化的并查集：每轮把每条边两端的根挂到较小的根上，再用指针跳跃压缩路径，
+    直到所有边两端的根相同。
+    """
+    parent = np.arange(count)
+    while len(u):
+        pu, pv = parent[u], parent[v]
+        if np.array_equal(pu, pv):
+            break
+        np.minimum.at(parent, np.maximum(pu, pv), np.minimum(pu, pv))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def convex_hull(points):
+    """平面点集的凸包（Andrew 单调链），按逆时针返回顶点，不含共线点"""
+    points = np.unique(points, axis=0)
+    if len(points) <= 2:
+        return points
+
+    def half(sequence):
+        hull = []
+        for p in sequence:
+            while len(hull) >= 2 and ((hull[-1][0] - hull[-2][0]) * (p[1] - hull[-2][1])
+                                      - (hull[-1][1] - hull[-2][1]) * (p[0] - hull[-2][0])) <= 0:
+                hull.pop()
+            hull.append(p)
+        return hull
+
+    rows = points.tolist()
+    lower, upper = half(rows), half(reversed(rows))
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def detect_blind_spots(located, cell_meters=DEFAULT_CELL_METERS, weak_signal=WEAK_SIGNAL,
+                       min_weak_share=MIN_WEAK_SHARE, min_reports=MIN_AREA_REPORTS):
+    """识别盲区，返回每片盲区一行的 DataFrame（按弱信号上报数降序）
+
+    path 为多边形顶点 [[经度, 纬度], ...]，lng/lat 为盲区内弱信号上报的平均位置。
+    """
+    lng = located['lng'].to_numpy(dtype=float)
+    lat = located['lat'].to_numpy(dtype=float)
+    signal = located['signal'].to_numpy(dtype=float)
+    if not len(lng):
+        return pd.DataFrame(columns=BLIND_SPOT_COLUMNS)
+
+    # 栅格化：每个格子的上报数、弱信号上报数、信号总和
+    lng_scale, lat_scale = meter_scales(lat)
+    cx = np.floor(lng * lng_scale / cell_meters).astype(np.int64)
+    cy = np.floor(lat * lat_scale / cell_meters).astype(np.int64)
+    width = int(cx.max() - cx.min()) + 3
+    keys = (cy - cy.min() + 1) * width + (cx - cx.min() + 1)
+    cell_keys, cell_of = np.unique(keys, return_inverse=True)
+    weak = signal <= weak_signal
+    reports = np.bincount(cell_of)
+    weak_count = np.bincount(cell_of, weak)
+    signal_sum = np.bincount(cell_of, signal)
+
+    blind = (weak_count > 0) & (weak_count / reports >= min_weak_share)
+    blind_keys = cell_keys[blind]
+    if not len(blind_keys):
+        return pd.DataFrame(columns=BLIND_SPOT_COLUMNS)
+
+    # 相邻（8 邻域）的盲区格子之间连边，求连通分量
+    u, v = [], []
+    for dx, dy in _FORWARD_NEIGHBORS:
+        neighbor = blind_keys + dy * width + dx
+        pos = np.minimum(np.searchsorted(blind_keys, neighbor), len(blind_keys) - 1)
+        found = blind_keys[pos] == neighbor
+        u.append(np.nonzero(found)[0])
+        v.append(pos[found])
+    component = connected_components(len(blind_keys), np.concatenate(u), np.concatenate(v))
+    _, area_of_cell = np.unique(component, return_inverse=True)
+    area_count = area_of_cell.max() + 1
+
+    # 各片盲区的统计
+    cells = np.bincount(area_of_cell, minlength=area_count)
+    area_reports = np.bincount(area_of_cell, reports[blind], minlength=area_count)
+    area_weak = np.bincount(area_of_cell, weak_count[blind], minlength=area_count)
+    area_signal = np.bincount(area_of_cell, signal_sum[blind], minlength=area_count)
+
+    # 弱信号上报的平均位置
+    area_of_point = np.full(len(cell_keys), -1)
+    area_of_point[np.nonzero(blind)[0]] = area_of_cell
+    point_area = area_of_point[cell_of]
+    in_area = weak & (point_area >= 0)
+    center_lng = np.bincount(point_area[in_area], lng[in_area], minlength=area_count)
+    center_lat = np.bincount(point_area[in_area], lat[in_area], minlength=area_count)
+
+    # 每个盲区格子的四个角，用于求凸包
+    gx = (blind_keys % width + cx.min() - 1).astype(float)
+    gy = (blind_keys // width + cy.min() - 1).astype(float)
+    corners_x = np.concatenate([gx, gx + 1, gx, gx + 1]) * cell_meters / lng_scale
+    corners_y = np.concatenate([gy, gy, gy + 1, gy + 1]) * cell_meters / lat_scale
+    corner_area = np.tile(area_of_cell, 4)
+    order = np.argsort(corner_area, kind='stable')
+    bounds = np.searchsorted(corner_area[order], np.arange(area_count + 1))
+
+    rows = []
+    for area in np.nonzero(area_weak >= min_reports)[0]:
+        corners = order[bounds[area]:bounds[area + 1]]
+        hull = convex_hull(np.column_stack([corners_x[corners], corners_y[corners]]))
+        rows.append({
+            'lng': center_lng[area] / area_weak[area],
+            'lat': center_lat[area] / area_weak[area],
+            'path': np.round(hull, 6).tolist(),
+            'cells': int(cells[area]),
+            'area_km2': cells[area] * cell_meters ** 2 / 1e6,
+            'reports': int(area_reports[area]),
+            'weak': int(area_weak[area]),
+            'weak_share': area_weak[area] / area_reports[area],
+            'mean_signal': area_signal[area] / area_reports[area],
+        })
+    spots = pd.DataFrame(rows, columns=BLIND_SPOT_COLUMNS[1:])
+    spots = spots.sort_values('weak', ascending=False, ignore_index=True)
+    spots.insert(0, 'area_id', np.arange(1, len(spots) + 1))
+    return spots
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行入口（无界面模式）
+不依赖 tkinter 和 psutil，可在没有图形界面的服务器上生成地图或长期运行HTTP服务。
+各命令需要的模块在执行时才导入，查看帮助等操作无需加载 pandas。
+
+使用方法:
+    python main.py generate [-i 数据.xlsx] [-o 地图.html] [--format amap|folium] [--dedup] [--reports 解析数据集.parquet]
+    python main.py serve [--host 0.0.0.0] [--port 8888] [--watch 数据.xlsx]
+    python main.py run [-i 数据.xlsx] [--port 8888] [--watch]
+    python main.py sample [-n 100000] [-o 数据.parquet] [--coordinates] [--seed 1]
+    python main.py export [-i 解析数据集.parquet] -o 结果.xlsx
+    python main.py density [-i 解析数据集.parquet] -o 密度.png|.geojson|.npz [--bandwidth 300]
+    python main.py stats [-i 解析数据集.parquet] [-o 统计.csv|.xlsx]
+    python main.py anomalies [-i 解析数据集.parquet] [-o 可疑上报.csv|.xlsx]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from project_paths import (DEFAULT_EXCEL_FILE, MAP_HTML_FILE,
+                           RESOLVED_REPORTS_FILE, STATIC_DIR)
+
+
+def generate(input_file, output_file, map_format='amap', use_cache=True, dedup=False,
+             resolved_file=None):
+    """生成地图网页，成功时返回 True
+
+    resolved_file 不为空时把Excel的解析结果保存到该文件（高德地图页面）。
+    """
+    if not os.path.exists(input_file):
+        print(f"❌ 数据文件不存在: {input_file}")
+        return False
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    if map_format == 'folium':
+        from signal_mapper import SignalMapper
+        try:
+            mapper = SignalMapper()
+        except ValueError as e:
+            print(f"❌ 初始化失败: {e}")
+            return False
+        return mapper.generate_heatmap(input_file, output_file, use_cache=use_cache, dedup=dedup)
+
+    if dedup:
+        print("⚠️  重复上报合并目前只用于 folium 热力图，已忽略 --dedup")
+    from generate_amap_html import generate_amap_html
+    return bool(generate_amap_html(input_file, output_file, use_cache=use_cache,
+                                   resolved_file=resolved_file))
+
+
+def sample(output_file, count, seed=None, include_coordinates=False):
+    """生成模拟数据文件（.xlsx / .csv / .parquet），成功时返回 True"""
+    from synthetic_data import generate_reports, write_reports
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    started = time.perf_counter()
+    df = generate_reports(count, seed=seed, include_coordinates=include_coordinates)
+    try:
+        write_reports(df, output_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"✅ 已生成 {len(df)} 条模拟数据: {output_file}（{time.perf_counter() - started:.1f} 秒）")
+    return True
+
+
+def export(input_file, output_file):
+    """把解析数据集流式导出为Excel，成功时返回 True"""
+    if not os.path.exists(input_file):
+        print(f"❌ 解析数据集不存在: {input_file}，请先生成地图")
+        return False
+    from excel_export import export_reports
+    try:
+        count = export_reports(input_file, output_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"✅ 已导出 {count} 条记录: {output_file}")
+    return True
+
+
+def density(input_file, output_file, bandwidth, cell_meters):
+    """由解析数据集计算弱信号核密度并导出，成功时返回 True"""
+    if not os.path.exists(input_file):
+        print(f"❌ 解析数据集不存在: {input_file}，请先生成地图")
+        return False
+    from density import signal_density, write_density
+    from resolved_reports import load_resolved_reports, located_reports
+    started = time.perf_counter()
+    try:
+        surface = signal_density(located_reports(load_resolved_reports(input_file)),
+                                 cell_meters=cell_meters, bandwidth=bandwidth)
+        write_density(surface, output_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"✅ 已导出 {surface.shape[1]}×{surface.shape[0]} 密度网格: {output_file}"
+          f"（{time.perf_counter() - started:.1f} 秒）")
+    return True
+
+
+def stats(input_file, output_file=None):
+    """输出区县 × 网络类型统计，指定 output_file 时另存为 .csv 或 .xlsx，成功时返回 True"""
+    if not os.path.exists(input_file):
+        print(f"❌ 解析数据集不存在: {input_file}，请先生成地图")
+        return False
+    from district_stats import district_stats
+    from resolved_reports import load_resolved_reports, located_reports
+    table = district_stats(located_reports(load_resolved_reports(input_file)))
+    print(table.to_string(index=False, float_format=lambda value: f'{value:.2f}'))
+    if output_file:
+        if output_file.lower().endswith('.csv'):
+            table.to_csv(output_file, index=False, encoding='utf-8-sig')
+        elif output_file.lower().endswith('.xlsx'):
+            table.to_excel(output_file, index=False)
+        else:
+            print("❌ 不支持的输出格式，请使用 .csv 或 .xlsx")
+            return False
+        print(f"✅ 已导出 {len(table)} 行统计: {output_file}")
+    return True
+
+
+def anomalies(input_file, output_file=None):
+    """找出可疑上报（信号与周围明显不符、坐标在服务区域外），指定 output_file 时另存，成功时返回 True"""
+    if not os.path.exists(input_file):
+        print(f"❌ 解析数据集不存在: {input_file}，请先生成地图")
+        return False
+    from anomalies import drop_anomalies
+    from resolved_reports import load_resolved_reports, located_reports
+    started = time.perf_counter()
+    located = located_reports(load_resolved_reports(input_file))
+    _, suspect = drop_anomalies(located)
+    outside = int(suspect['outside_area'].sum())
+    print(f"共 {len(located)} 条已定位上报，可疑 {len(suspect)} 条（坐标在服务区域外 {outside} 条，"
+          f"信号与周围不符 {len(suspect) - outside} 条，{time.perf_counter() - started:.1f} 秒）")
+    if output_file:
+        columns = ['name', 'address', 'lng', 'lat', 'signal', 'network', 'time', 'reporter',
+                   'outside_area', 'neighbors', 'local_median', 'z']
+        if output_file.lower().endswith('.csv'):
+            suspect[columns].to_csv(output_file, index=False, encoding='utf-8-sig')
+        elif output_file.lower().endswith('.xlsx'):
+            suspect[columns].to_excel(output_file, index=False)
+        else:
+            print("❌ 不支持的输出格式，请使用 .csv 或 .xlsx")
+            return False
+        print(f"✅ 已导出 {len(suspect)} 条可疑上报: {output_file}")
+    return True
+
+
+def serve(root=STATIC_DIR, host='localhost', port=8888, reports_file=RESOLVED_REPORTS_FILE,
+          watch_file=None):
+    """在当前线程运行HTTP服务器，直到 Ctrl+C"""
+    from map_server import MapServer
+
+    def log(message):
+        print(message, flush=True)
+
+    server = MapServer(root, host=host, port=port, log_callback=log, reports_file=reports_file)
+    reloader = None
+    if watch_file:
+        from generate_amap_html import AMAP_API_KEY
+        from live_reload import LiveReloader
+        reloader = LiveReloader(watch_file, AMAP_API_KEY, server.events.publish,
+                                resolved_file=reports_file, log=log)
+        reloader.start()
+        print(f"👀 实时更新已开启，正在监视: {watch_file}")
+
+    page = os.path.relpath(MAP_HTML_FILE, root).replace(os.sep, '/')
+    print(f"🌐 服务器地址: {server.url}/{page}（按 Ctrl+C 停止）", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务器...")
+    finally:
+        if reloader:
+            reloader.stop()
+        server.events.close()
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py',
+                                     description='信号覆盖地图分析器（命令行模式，不带参数运行时启动图形界面）')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_generate_options(command):
+        command.add_argument('-i', '--input', default=DEFAULT_EXCEL_FILE,
+                             help='Excel数据文件或解析数据集（.parquet）')
+        command.add_argument('-o', '--output', default=MAP_HTML_FILE, help='输出的地图网页')
+        command.add_argument('--format', choices=['amap', 'folium'], default='amap',
+                             help='amap: 高德地图页面（默认）；folium: 离线热力图')
+        command.add_argument('--no-cache', action='store_true', help='忽略渲染缓存，强制重新生成')
+        command.add_argument('--dedup', action='store_true',
+                             help='合并距离和时间相近的重复上报（folium 热力图）')
+
+    def add_serve_options(command):
+        command.add_argument('--host', default='localhost',
+                             help='监听地址，局域网访问时使用 0.0.0.0')
+        command.add_argument('--port', type=int, default=8888, help='监听端口')
+        command.add_argument('--root', default=STATIC_DIR, help='站点根目录（默认为 static 目录）')
+        command.add_argument('--reports', default=RESOLVED_REPORTS_FILE,
+                             help='/api/ 接口使用的解析数据集（run 命令把输入的解析结果保存到该文件）')
+
+    generate_parser = commands.add_parser('generate', help='生成地图网页')
+    add_generate_options(generate_parser)
+    generate_parser.add_argument('--reports', metavar='PARQUET',
+                                 help='同时把解析数据集保存到该文件，供 serve、export 等命令使用'
+                                      '（默认不保存，不覆盖服务器正在使用的数据集）')
+
+    serve_parser = commands.add_parser('serve', help='启动HTTP服务器')
+    add_serve_options(serve_parser)
+    serve_parser.add_argument('--watch', metavar='EXCEL',
+                              help='监视Excel文件，变化时推送到已打开的页面')
+
+    run_parser = commands.add_parser('run', help='生成地图后启动HTTP服务器')
+    add_generate_options(run_parser)
+    add_serve_options(run_parser)
+    run_parser.add_argument('--watch', action='store_true', help='监视输入的Excel文件')
+
+    sample_parser = commands.add_parser('sample', help='生成模拟数据')
+    sample_parser.add_argument('-n', '--count', type=int, default=1000, help='记录数')
+    sample_parser.add_argument('-o', '--output', default=DEFAULT_EXCEL_FILE,
+                               help='输出文件，按扩展名写出 .xlsx / .csv / .parquet')
+    sample_parser.add_argument('--seed', type=int, help='随机种子，相同种子生成相同数据')
+    sample_parser.add_argument('--coordinates', action='store_true',
+                               help='附带真实坐标（经度、纬度列），解析时不调用地理编码API')
+
+    export_parser = commands.add_parser('export', help='把解析结果（含坐标）导出为Excel')
+    export_parser.add_argument('-i', '--input', default=RESOLVED_REPORTS_FILE, help='解析数据集')
+    export_parser.add_argument('-o', '--output', required=True, help='输出的Excel文件')
+
+    density_parser = commands.add_parser('density', help='计算弱信号核密度并导出为图片或等值线')
+    density_parser.add_argument('-i', '--input', default=RESOLVED_REPORTS_FILE, help='解析数据集')
+    density_parser.add_argument('-o', '--output', required=True,
+                                help='输出文件：.png 图片、.geojson 等值线或 .npz 网格')
+    density_parser.add_argument('--bandwidth', type=float, default=300,
+                                help='高斯核带宽（米），默认 300')
+    density_parser.add_argument('--cell', type=float, default=100, help='网格边长（米），默认 100')
+
+    stats_parser = commands.add_parser('stats', help='按区县和网络类型统计信号情况')
+    stats_parser.add_argument('-i', '--input', default=RESOLVED_REPORTS_FILE, help='解析数据集')
+    stats_parser.add_argument('-o', '--output', help='另存为 .csv 或 .xlsx')
+
+    anomalies_parser = commands.add_parser('anomalies', help='找出可疑上报（不计入热力和插值）')
+    anomalies_parser.add_argument('-i', '--input', default=RESOLVED_REPORTS_FILE, help='解析数据集')
+    anomalies_parser.add_argument('-o', '--output', help='另存为 .csv 或 .xlsx')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'sample':
+        return 0 if sample(args.output, args.count, args.seed, args.coordinates) else 1
+    if args.command == 'export':
+        return 0 if export(args.input, args.output) else 1
+    if args.command == 'density':
+        return 0 if density(args.input, args.output, args.bandwidth, args.cell) else 1
+    if args.command == 'stats':
+        return 0 if stats(args.input, args.output) else 1
+    if args.command == 'anomalies':
+        return 0 if anomalies(args.input, args.output) else 1
+
+    if args.command in ('generate', 'run'):
+        if not generate(args.input, args.output, args.format, not args.no_cache, args.dedup,
+                        args.reports):
+            print("❌ 生成失败！")
+            return 1
+        print(f"✅ 地图已就绪: {args.output}")
+
+    if args.command == 'serve':
+        watch_file = args.watch
+    elif args.command == 'run':
+        watch_file = args.input if args.watch else None
+        if watch_file and watch_file.lower().endswith('.parquet'):
+            print("⚠️  实时更新只能监视Excel文件，已忽略 --watch")
+            watch_file = None
+    else:
+        return 0
+
+    try:
+        serve(args.root, args.host, args.port, args.reports, watch_file)
+    except OSError as e:
+        print(f"❌ 服务器启动失败: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
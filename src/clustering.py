@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区域聚类
+用 Mini-batch K-means 把监测点按地理位置分成若干区域，统计各区域的中心、点数和平均信号：
+- k-means++ 初始化（在抽样上进行），每轮只用一小批点更新中心
+- 距离在当地的米制平面坐标中计算，全部运算向量化
+- 可按信号弱的程度加权，使区域中心偏向盲区
+百万级的点可在数秒内完成。
+"""
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import meter_scales
+
+DEFAULT_CLUSTERS = 12
+BATCH_SIZE = 4096
+MAX_ITERATIONS = 300
+# 连续若干轮中心的最大移动距离（米）都小于该值时认为已收敛
+TOLERANCE_METERS = 1.0
+PATIENCE = 10
+# k-means++ 初始化使用的最多点数
+INIT_SAMPLE_SIZE = 20000
+# 分配标签时每块的点数
+ASSIGN_CHUNK = 65536
+
+# 信号强度上限，弱信号权重 = SIGNAL_MAX + 1 - 信号强度
+SIGNAL_MAX = 8
+
+
+def weakness_weights(signal):
+    """信号越弱权重越大：信号 1 的权重为 8，信号 8 及以上为 1"""
+    return np.clip(SIGNAL_MAX + 1 - np.asarray(signal, dtype=float), 1, None)
+
+
+def _squared_distances(points, centers):
+    # |p - c|^2 = |p|^2 - 2 p·c + |c|^2
+    d2 = ((points ** 2).sum(axis=1)[:, None] - 2 * points @ centers.T
+          + (centers ** 2).sum(axis=1)[None, :])
+    return np.maximum(d2, 0)
+
+
+def kmeans_plus_plus(points, k, rng, weights=None):
+    """k-means++ 初始化：按到已选中心距离的平方（乘以权重）为概率依次选取中心"""
+    if len(points) > INIT_SAMPLE_SIZE:
+        chosen = rng.choice(len(points), INIT_SAMPLE_SIZE, replace=False)
+        points = points[chosen]
+        weights = weights[chosen] if weights is not None else None
+    weights = np.ones(len(points)) if weights is None else weights
+
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    closest = _squared_distances(points, centers[0][None, :])[:, 0]
+    for _ in range(1, k):
+        scores = closest * weights
+        if scores.sum() <= 0:
+            break
+        center = points[rng.choice(len(points), p=scores / scores.sum())]
+        centers.append(center)
+        closest = np.minimum(closest, _squared_distances(points, center[None, :])[:, 0])
+    return np.array(centers)
+
+
+def assign_clusters(points, centers):
+    """每个点最近的中心编号及到中心的距离（分块计算，内存占用固定）"""
+    labels = np.empty(len(points), dtype=np.int64)
+    distances = np.empty(len(points))
+    for start in range(0, len(points), ASSIGN_CHUNK):
+        d2 = _squared_distances(points[start:start + ASSIGN_CHUNK], centers)
+        labels[start:start + ASSIGN_CHUNK] = d2.argmin(axis=1)
+        distances[start:start + ASSIGN_CHUNK] = np.sqrt(d2.min(axis=1))
+    return labels, distances
+
+
+def minibatch_kmeans(points, k, weights=None, batch_size=BATCH_SIZE,
+                     max_iterations=MAX_ITERATIONS, seed=0):
+    """Mini-batch K-means，返回中心坐标（与 points 同一坐标系）
+
+    每轮随机抽取一批点，中心更新为 已累计的加权均值 与 本批点 的加权平均，
+    中心连续 PATIENCE 轮移动都小于 TOLERANCE_METERS 时提前结束。
+    """
+    rng = np.random.default_rng(seed)
+    centers = kmeans_plus_plus(points, k, rng, weights)
+    k = len(centers)
+    totals = np.zeros(k)
+    quiet = 0
+    for _ in range(max_iterations):
+        batch = rng.integers(0, len(points), min(batch_size, len(points)))
+        x = points[batch]
+        w = weights[batch] if weights is not None else np.ones(len(batch))
+        labels = _squared_distances(x, centers).argmin(axis=1)
+
+        batch_weight = np.bincount(labels, w, minlength=k)
+        batch_sum = np.stack([np.bincount(labels, w * x[:, axis], minlength=k)
+                              for axis in range(x.shape[1])], axis=1)
+        updated = batch_weight > 0
+        new_totals = totals + batch_weight
+        new_centers = centers.copy()
+        new_centers[updated] = ((centers[updated] * totals[updated, None] + batch_sum[updated])
+                                / new_totals[updated, None])
+
+        shift = np.sqrt(((new_centers - centers) ** 2).sum(axis=1)).max()
+        centers, totals = new_centers, new_totals
+        quiet = quiet + 1 if shift < TOLERANCE_METERS else 0
+        if quiet >= PATIENCE:
+            break
+    return centers
+
+
+def cluster_reports(located, k=DEFAULT_CLUSTERS, weight_by_weakness=True, seed=0):
+    """对已定位的上报做区域聚类
+
+    返回 (labels, summary)：labels 为每条上报所属区域的编号；
+    summary 每行一个区域，包含 cluster, lng, lat, size, mean_signal, severe, radius
+    （radius 为 90% 的点到中心的距离，米），按平均信号升序排列。
+    """
+    lng = located['lng'].to_numpy(dtype=float)
+    lat = located['lat'].to_numpy(dtype=float)
+    signal = located['signal'].to_numpy(dtype=float)
+    if not len(lng):
+        return np.empty(0, dtype=np.int64), pd.DataFrame(
+            columns=['cluster', 'lng', 'lat', 'size', 'mean_signal', 'severe', 'radius'])
+
+    lng_scale, lat_scale = meter_scales(lat)
+    # 以平均位置为原点，避免平方距离展开式中的大数相减损失精度
+    origin = np.array([lng.mean() * lng_scale, lat.mean() * lat_scale])
+    points = np.column_stack([lng * lng_scale, lat * lat_scale]) - origin
+    weights = weakness_weights(signal) if weight_by_weakness else None
+    centers = minibatch_kmeans(points, max(1, min(k, len(points))), weights, seed=seed)
+    labels, distances = assign_clusters(points, centers)
+
+    frame = pd.DataFrame({'cluster': labels, 'signal': signal, 'distance': distances,
+                          'severe': signal <= 2})
+    groups = frame.groupby('cluster')
+    summary = pd.DataFrame({
+        'size': groups.size(),
+        'mean_signal': groups['signal'].mean(),
+        'severe': groups['severe'].sum(),
+        'radius': groups['distance'].quantile(0.9),
+    })
+    summary['lng'] = (centers[summary.index, 0] + origin[0]) / lng_scale
+    summary['lat'] = (centers[summary.index, 1] + origin[1]) / lat_scale
+    summary = summary.reset_index().sort_values('mean_signal', ignore_index=True)
+    return labels, summary[['cluster', 'lng', 'lat', 'size', 'mean_signal', 'severe', 'radius']]
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+弱信号密度
+folium 热力图的权重在浏览器端按固定的像素半径叠加，"热度"随缩放级别变化。
+本模块在服务端计算与缩放无关的核密度估计（KDE）：
+- 按信号加权（与热力图相同：信号越弱权重越大）的上报落到米制规则网格上
+- 与高斯核做卷积，卷积在频域（FFT）完成，计算量为 O(格子数 × log 格子数)，与上报数无关
+- 结果为每平方公里的加权上报数，可输出为图片图层或等值线
+"""
+
+import json
+import os
+
+import numpy as np
+
+from interpolation import MAX_GRID_CELLS, SignalSurface
+from raster import DENSITY_COLOR_STOPS, colorize, encode_png
+from spatial_index import meter_scales
+
+# 默认网格边长和高斯核带宽（标准差），单位：米
+DEFAULT_CELL_METERS = 100
+DEFAULT_BANDWIDTH_METERS = 300
+# 高斯核截断半径（带宽的倍数），网格也向外扩展这么多
+KERNEL_SIGMAS = 3
+# 低于最大密度该比例的格子不着色
+MIN_VISIBLE = 0.02
+# 默认等值线：最大密度的比例
+CONTOUR_LEVELS = (0.25, 0.5, 0.75)
+
+
+def heat_weights(signal):
+    """热力权重：信号强度 1 对应 10，信号强度 10 及以上对应 1，与热力图一致"""
+    return np.maximum(1, 11 - np.asarray(signal, dtype=float))
+
+
+class DensitySurface(SignalSurface):
+    """核密度结果：values 为每平方公里的加权上报数，网格约定同 SignalSurface"""
+
+    def to_rgba(self, vmin=0, vmax=None):
+        # 颜色上限取正值的 99% 分位数，避免个别极大值使其余区域颜色过浅
+        positive = self.values[self.values > 0]
+        if vmax is None:
+            vmax = np.percentile(positive, 99) if len(positive) else 1.0
+        visible = np.where(self.values >= vmax * MIN_VISIBLE, self.values, np.nan)
+        return colorize(np.flipud(visible), vmin, vmax, DENSITY_COLOR_STOPS)
+
+
+def _fast_size(n):
+    """不小于 n 且只含因子 2、3、5 的长度，FFT 在这些长度上最快"""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def gaussian_kernel(sigma_cells):
+    """归一化（总和为 1）的二维高斯核，截断在 KERNEL_SIGMAS 倍标准差处"""
+    radius = max(1, int(np.ceil(KERNEL_SIGMAS * sigma_cells)))
+    g = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma_cells) ** 2)
+    kernel = np.outer(g, g)
+    return kernel / kernel.sum()
+
+
+def fft_convolve(grid, kernel):
+    """二维卷积，输出与 grid 同形（kernel 的中心对齐）
+
+    两者补零到不小于完整卷积的长度，避免频域相乘造成的循环卷绕。
+    """
+    ky, kx = kernel.shape
+    shape = (_fast_size(grid.shape[0] + ky - 1), _fast_size(grid.shape[1] + kx - 1))
+    full = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    result = full[ky // 2:ky // 2 + grid.shape[0], kx // 2:kx // 2 + grid.shape[1]]
+    # 去掉浮点误差造成的微小负值
+    return np.maximum(result, 0.0)
+
+
+def kde_surface(lng, lat, weights=None, cell_meters=DEFAULT_CELL_METERS,
+                bandwidth=DEFAULT_BANDWIDTH_METERS, bounds=None):
+    """计算加权核密度网格，返回 DensitySurface（每平方公里的加权上报数）
+
+    bounds 为 (西, 南, 东, 北)，默认取上报范围并向外扩展 KERNEL_SIGMAS 倍带宽。
+    """
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    weights = np.ones(len(lng)) if weights is None else np.asarray(weights, dtype=float)
+    valid = np.isfinite(lng) & np.isfinite(lat) & np.isfinite(weights)
+    lng, lat, weights = lng[valid], lat[valid], weights[valid]
+    if not len(lng):
+        raise ValueError("没有可用于密度估计的上报点")
+
+    lng_scale, lat_scale = meter_scales(lat)
+    lng_step, lat_step = cell_meters / lng_scale, cell_meters / lat_scale
+    if bounds is None:
+        pad = KERNEL_SIGMAS * bandwidth
+        bounds = (lng.min() - pad / lng_scale, lat.min() - pad / lat_scale,
+                  lng.max() + pad / lng_scale, lat.max() + pad / lat_scale)
+    west, south, east, north = bounds
+    nx = max(1, int(np.ceil((east - west) / lng_step)))
+    ny = max(1, int(np.ceil((north - south) / lat_step)))
+    if nx * ny > MAX_GRID_CELLS:
+        raise ValueError(f"密度网格过大（{nx}×{ny}），请增大格子边长或缩小范围")
+
+    # 落到网格：每格的权重之和
+    col = np.floor((lng - west) / lng_step).astype(np.int64)
+    row = np.floor((lat - south) / lat_step).astype(np.int64)
+    inside = (row >= 0) & (row < ny) & (col >= 0) & (col < nx)
+    grid = np.bincount(row[inside] * nx + col[inside], weights[inside],
+                       minlength=nx * ny).reshape(ny, nx)
+
+    density = fft_convolve(grid, gaussian_kernel(bandwidth / cell_meters))
+    return DensitySurface(west, south, lng_step, lat_step, density / (cell_meters / 1000) ** 2)
+
+
+def signal_density(located, **options):
+    """已定位上报按弱信号加权的核密度"""
+    return kde_surface(located['lng'], located['lat'], heat_weights(located['signal']), **options)
+
+
+# 等值线的行进方块查表：格子四角按 左下=1、右下=2、右上=4、左上=8 组成编号，
+# 每条线段连接方块的两条边（0=下、1=右、2=上、3=左）；5、10 为鞍点，固定取一种连法
+_SQUARE_SEGMENTS = {
+    1: [(3, 0)], 2: [(0, 1)], 3: [(3, 1)], 4: [(1, 2)], 5: [(3, 2), (0, 1)], 6: [(0, 2)],
+    7: [(3, 2)], 8: [(2, 3)], 9: [(2, 0)], 10: [(0, 3), (2, 1)], 11: [(2, 1)], 12: [(1, 3)],
+    13: [(1, 0)], 14: [(0, 3)],
+}
+
+
+def contour_paths(surface, level):
+    """密度等于 level 的等值线（行进方块法），返回折线列表 [[[经度, 纬度], ...], ...]
+
+    线段的端点位于格子中心连线上（线性插值），相邻线段共用端点所在的边，按边编号首尾相接。
+    """
+    values = surface.values
+    ny, nx = values.shape
+    if ny < 2 or nx < 2:
+        return []
+    above = values >= level
+    case = (above[:-1, :-1] * 1 + above[:-1, 1:] * 2 + above[1:, 1:] * 4 + above[1:, :-1] * 8)
+
+    # 各边的编号：水平边 (i, j)-(i, j+1) 为 i*nx+j，竖直边 (i, j)-(i+1, j) 为 ny*nx + i*nx+j
+    def edge_ids(rows, cols, side):
+        return np.select([side == 0, side == 1, side == 2],
+                         [rows * nx + cols, ny * nx + rows * nx + cols + 1,
+                          (rows + 1) * nx + cols],
+                         ny * nx + rows * nx + cols)
+
+    starts, ends = [], []
+    for code, segments in _SQUARE_SEGMENTS.items():
+        rows, cols = np.nonzero(case == code)
+        for a, b in segments:
+            starts.append(edge_ids(rows, cols, np.full(len(rows), a)))
+            ends.append(edge_ids(rows, cols, np.full(len(rows), b)))
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    if not len(starts):
+        return []
+
+    # 边上的插值点（格子坐标）
+    edges = np.unique(np.concatenate([starts, ends]))
+    vertical = edges >= ny * nx
+    base = np.where(vertical, edges - ny * nx, edges)
+    r0, c0 = base // nx, base % nx
+    r1, c1 = r0 + vertical, c0 + ~vertical
+    v0, v1 = values[r0, c0], values[r1, c1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.clip(np.nan_to_num((level - v0) / (v1 - v0), nan=0.5), 0, 1)
+    lng_center, lat_center = surface.cell_centers()
+    point_lng = lng_center[c0] + t * (c1 - c0) * surface.lng_step
+    point_lat = lat_center[r0] + t * (r1 - r0) * surface.lat_step
+    position = {edge: i for i, edge in enumerate(edges.tolist())}
+
+    # 按共用的边把线段连成折线（每条边最多属于两条线段）
+    neighbors = {}
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        neighbors.setdefault(s, []).append(e)
+        neighbors.setdefault(e, []).append(s)
+    paths, visited = [], set()
+    # 先从只连一条线段的端点（开放折线）开始，再处理闭合环
+    for edge in sorted(neighbors, key=lambda e: len(neighbors[e])):
+        if edge in visited:
+            continue
+        chain, current, previous = [edge], edge, None
+        visited.add(edge)
+        while True:
+            following = [n for n in neighbors[current] if n != previous and n not in visited]
+            if not following:
+                if previous is not None and edge in neighbors[current] and len(chain) > 2:
+                    chain.append(edge)
+                break
+            previous, current = current, following[0]
+            visited.add(current)
+            chain.append(current)
+        if len(chain) > 1:
+            index = [position[e] for e in chain]
+            paths.append(np.column_stack([point_lng[index], point_lat[index]]).round(6).tolist())
+    return paths
+
+
+def density_contours(surface, levels=CONTOUR_LEVELS):
+    """按最大密度的比例取若干等值线，返回 [(密度值, 折线列表), ...]"""
+    peak = float(surface.values.max()) if surface.values.size else 0.0
+    if peak <= 0:
+        return []
+    return [(peak * ratio, contour_paths(surface, peak * ratio)) for ratio in levels]
+
+
+def write_density(surface, path, levels=CONTOUR_LEVELS):
+    """按扩展名导出密度结果（先写临时文件再替换）
+
+    - .png: 着色后的图片，地理范围另存为同名的 .json（west/south/east/north）
+    - .geojson: 等值线，每条折线为一个 LineString，属性 density 为密度值
+    - .npz: 原始网格（可用 DensitySurface.load 读回）
+    """
+    lower = path.lower()
+    tmp_file = path + '.tmp'
+    if lower.endswith('.png'):
+        with open(tmp_file, 'wb') as f:
+            f.write(encode_png(surface.to_rgba()))
+        bounds = {'west': surface.west, 'south': surface.south,
+                  'east': surface.east, 'north': surface.north}
+        bounds_file = os.path.splitext(path)[0] + '.json'
+        with open(bounds_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(bounds, f)
+        os.replace(bounds_file + '.tmp', bounds_file)
+    elif lower.endswith('.geojson'):
+        features = [{'type': 'Feature', 'properties': {'density': round(level, 3)},
+                     'geometry': {'type': 'LineString', 'coordinates': line}}
+                    for level, lines in density_contours(surface, levels) for line in lines]
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features}, f)
+    elif lower.endswith('.npz'):
+        with open(tmp_file, 'wb') as f:
+            surface.save(f)
+    else:
+        raise ValueError("不支持的输出格式，请使用 .png、.geojson 或 .npz")
+    os.replace(tmp_file, path)
+    return path
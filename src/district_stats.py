@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区县 × 网络类型统计
+页面上的总体统计只有全部数据的四个数字。本模块按 区县 × 网络类型 给出上报数、
+平均信号、中位数、10% 分位数和严重盲区占比，并附带各区县、各网络类型和全部数据的汇总行。
+只对上报分组一次：得到每个 (区县, 网络类型) 的信号直方图（各信号等级的上报数），
+汇总行的直方图由这些部分直方图相加得到（同 rollups 的可加汇总），
+所有统计量（包括分位数）都由直方图计算，不逐组循环。信号只有少数几个等级，直方图很小。
+"""
+
+import numpy as np
+import pandas as pd
+
+from districts import assign_districts
+from rollups import SEVERE_SIGNAL, report_networks
+
+# 汇总行（全部区县或全部网络类型）的名称
+ALL_LABEL = '全部'
+
+STATS_COLUMNS = ['district', 'network', 'count', 'mean_signal', 'median_signal', 'p10_signal',
+                 'severe_ratio']
+
+
+def histogram_stats(hist, levels):
+    """hist 每行为一组各信号等级（levels，升序）的上报数（每组至少一条），返回各组的
+    (上报数, 平均值, 中位数, 10% 分位数, 严重盲区占比)，分位数按线性插值（同 numpy 默认）"""
+    count = hist.sum(axis=1)
+    cumulative = hist.cumsum(axis=1)
+
+    def value_at(position):
+        # 排序后第 position 个值所在的等级：累计数不超过 position 的等级个数
+        return levels[(cumulative <= position[:, None]).sum(axis=1)]
+
+    def quantile(q):
+        position = q * (count - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        return value_at(low) + (value_at(high) - value_at(low)) * (position - low)
+
+    mean = hist @ levels / count
+    severe = hist[:, levels <= SEVERE_SIGNAL].sum(axis=1) / count
+    return count, mean, quantile(0.5), quantile(0.1), severe
+
+
+def district_stats(located):
+    """已定位上报按 区县 × 网络类型 的统计，返回 STATS_COLUMNS 的 DataFrame
+
+    区县或网络类型为 ALL_LABEL 的行是对应的汇总，排在各组的最后。
+    """
+    if not len(located):
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    level_codes, levels = pd.factorize(located['signal'].to_numpy(dtype=float), sort=True)
+    levels = np.asarray(levels, dtype=float)
+    district_codes, districts = pd.factorize(assign_districts(located), sort=True)
+    network_codes, networks = pd.factorize(report_networks(located), sort=True)
+    districts = np.append(districts.astype(object), ALL_LABEL)
+    networks = np.append(networks.astype(object), ALL_LABEL)
+    width = len(networks)
+
+    # 唯一的一次分组：(区县, 网络类型) × 信号等级 的上报数
+    pairs, pair_codes = np.unique(district_codes * width + network_codes, return_inverse=True)
+    hist = np.bincount(pair_codes * len(levels) + level_codes,
+                       minlength=len(pairs) * len(levels)).reshape(len(pairs), len(levels))
+
+    # 汇总行的直方图由部分直方图相加
+    pair_district, pair_network = pairs // width, pairs % width
+    totals = {}
+    for key in (pair_district * width + width - 1,
+                (len(districts) - 1) * width + pair_network,
+                np.full(len(pairs), len(districts) * width - 1)):
+        keys, codes = np.unique(key, return_inverse=True)
+        summed = np.zeros((len(keys), len(levels)), dtype=hist.dtype)
+        np.add.at(summed, codes, hist)
+        totals.update(zip(keys.tolist(), summed))
+
+    keys = np.concatenate([pairs, np.fromiter(totals, dtype=np.int64, count=len(totals))])
+    hist = np.vstack([hist, np.array(list(totals.values()))])
+    order = np.argsort(keys, kind='stable')
+    keys, hist = keys[order], hist[order]
+    count, mean, median, p10, severe = histogram_stats(hist, levels)
+    return pd.DataFrame({
+        'district': districts[keys // width], 'network': networks[keys % width],
+        'count': count, 'mean_signal': mean, 'median_signal': median, 'p10_signal': p10,
+        'severe_ratio': severe,
+    })[STATS_COLUMNS]
+
+
+def stats_table(stats):
+    """页面使用的紧凑格式：{'fields': 列名, 'rows': [[...], ...]}，数值保留适当的小数位"""
+    rounded = stats.round({'mean_signal': 2, 'median_signal': 2, 'p10_signal': 2,
+                           'severe_ratio': 3})
+    return {'fields': STATS_COLUMNS,
+            'rows': rounded.astype(object).to_numpy().tolist()}
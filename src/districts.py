@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区县划分
+由详细地址（或位置描述）中的区县名判断上报所属的区县，地址中没有区县名时
+取离坐标最近的区县中心。区县列表默认为南通市各区县，可在 config.py 中用
+DISTRICT_CENTERS 覆盖。
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import meter_scales
+
+try:
+    from config import DISTRICT_CENTERS
+except ImportError:
+    # 区县名称及中心经纬度
+    DISTRICT_CENTERS = [
+        ('崇川区', 120.864, 32.010),
+        ('开发区', 120.950, 31.977),
+        ('通州区', 121.073, 32.084),
+        ('海门区', 121.181, 31.871),
+        ('如皋市', 120.573, 32.371),
+        ('海安市', 120.467, 32.533),
+        ('启东市', 121.657, 31.808),
+        ('如东县', 121.185, 32.331),
+    ]
+
+# 无法判断区县（既没有区县名也没有坐标）时的名称
+UNKNOWN_DISTRICT = '未知'
+
+
+def district_names():
+    return [name for name, _, _ in DISTRICT_CENTERS]
+
+
+def district_from_text(text):
+    """文本中第一个出现的区县名，没有时为 NaN
+
+    相同的地址只提取一次（大量上报共用少数地址），提取本身是向量化的正则匹配。
+    """
+    pattern = '(' + '|'.join(re.escape(name) for name in district_names()) + ')'
+    codes, uniques = pd.factorize(pd.Series(text))
+    found = pd.Series(uniques).astype(str).str.extract(pattern, expand=False)
+    found = np.append(found.to_numpy(dtype=object), np.nan)
+    # factorize 把空值编为 -1，对应末尾追加的 NaN
+    return pd.Series(found[codes], dtype=object)
+
+
+def nearest_district(lng, lat):
+    """离各坐标最近的区县中心（按当地米制距离），坐标无效时为 NaN"""
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    centers = np.array([(c_lng, c_lat) for _, c_lng, c_lat in DISTRICT_CENTERS])
+    lng_scale, lat_scale = meter_scales(centers[:, 1])
+    d2 = (((lng[:, None] - centers[None, :, 0]) * lng_scale) ** 2
+          + ((lat[:, None] - centers[None, :, 1]) * lat_scale) ** 2)
+    valid = np.isfinite(lng) & np.isfinite(lat)
+    names = np.array(district_names(), dtype=object)
+    nearest = np.where(valid, names[np.argmin(np.where(np.isfinite(d2), d2, np.inf), axis=1)],
+                       np.nan)
+    return pd.Series(nearest, dtype=object)
+
+
+def assign_districts(reports):
+    """每条上报所属的区县：详细地址 → 位置描述 → 最近的区县中心 → UNKNOWN_DISTRICT"""
+    district = district_from_text(reports['address'])
+    missing = district.isna()
+    if missing.any():
+        district[missing] = district_from_text(reports['name'][missing.to_numpy()]).to_numpy()
+        missing = district.isna()
+    if missing.any() and 'lng' in reports.columns:
+        district[missing] = nearest_district(reports['lng'].to_numpy()[missing],
+                                             reports['lat'].to_numpy()[missing]).to_numpy()
+    return district.fillna(UNKNOWN_DISTRICT).to_numpy(dtype=object)
+
+
+def district_center(name):
+    """区县中心 (经度, 纬度)，未知区县为 None"""
+    for district, lng, lat in DISTRICT_CENTERS:
+        if district == name:
+            return lng, lat
+    return None
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel流式写出
+使用 openpyxl 的只写模式逐行写出，写过的行直接落盘，不在内存中保留整个工作簿；
+数据按块转换，导出解析数据集时也按 Parquet 的记录批次读取，
+写出百万行时内存占用基本不随行数增长。
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Excel工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 每次转换的行数
+DEFAULT_CHUNK_ROWS = 50000
+
+# 解析数据集的列 -> 导出的Excel列名；其他列（如聚类编号）按原列名附加在后面
+EXPORT_HEADERS = {
+    'name': '位置描述',
+    'address': '详细地址',
+    'network': '网络类型',
+    'signal': '信号强度',
+    'time': '上报时间',
+    'reporter': '上报人',
+    'note': '备注',
+    'lng': '经度',
+    'lat': '纬度',
+    'geocode_status': '定位状态',
+    'geocode_level': '定位精度',
+    'cluster': '所属区域',
+    'anomaly': '可疑上报'
+}
+# 只在内部使用、不导出的列
+INTERNAL_COLUMNS = ('report_id', 'row_hash')
+# 导出时附加的分析结果列（由 report_analysis 计算）
+ANALYSIS_COLUMNS = ['cluster', 'anomaly']
+# 计算分析结果需要读取的解析数据集列
+ANALYSIS_SOURCE_COLUMNS = ['report_id', 'lng', 'lat', 'signal', 'geocode_status']
+
+
+def _check_row_count(count):
+    if count >= EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel最多 {EXCEL_MAX_ROWS - 1} 行数据，请改用 .csv 或 .parquet")
+
+
+def _cell(value):
+    # 空值写成空单元格
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def write_xlsx(path, header, rows, total=None, sheet_title='数据', progress=None):
+    """逐行写出 xlsx 文件，rows 可以是生成器，返回写出的行数
+
+    先写临时文件再替换，中途出错或取消时不会留下不完整的文件。
+    progress(已写行数, 总行数, 说明) 每写一个数据块调用一次。
+    """
+    if total is not None:
+        _check_row_count(total)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(list(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_file = path + '.tmp'
+    count = 0
+    try:
+        for row in rows:
+            count += 1
+            _check_row_count(count)
+            sheet.append([_cell(value) for value in row])
+            if progress and count % DEFAULT_CHUNK_ROWS == 0:
+                progress(count, total, '写出Excel')
+        workbook.save(tmp_file)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return count
+
+
+def iter_frame_rows(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """按块把 DataFrame 转为行列表，每次只转换 chunk_rows 行"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        yield from chunk.where(chunk.notna(), None).to_numpy().tolist()
+
+
+def write_frame_xlsx(df, path, header=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """流式写出 DataFrame，返回写出的行数"""
+    return write_xlsx(path, header or list(df.columns), iter_frame_rows(df, chunk_rows),
+                      total=len(df), progress=progress)
+
+
+def export_columns(columns):
+    """导出的列（按 EXPORT_HEADERS 的顺序，其他列附加在后面）及对应的Excel列名"""
+    known = [col for col in EXPORT_HEADERS if col in columns]
+    extra = [col for col in columns if col not in EXPORT_HEADERS and col not in INTERNAL_COLUMNS]
+    selected = known + extra
+    return selected, [EXPORT_HEADERS.get(col, col) for col in selected]
+
+
+def report_analysis(resolved):
+    """各已定位上报的分析结果，按 report_id 索引：
+
+    - cluster: 所属区域的编号，与地图上"区域 n"一致（按平均信号升序从 1 编号）
+    - anomaly: 是否为可疑上报（见 anomalies，不计入热力和插值）
+    未定位的上报不在结果中，导出时这两列为空。
+    """
+    from anomalies import detect_anomalies
+    from clustering import cluster_reports
+    from resolved_reports import located_reports
+
+    located = located_reports(resolved)
+    labels, summary = cluster_reports(located)
+    rank = np.zeros(int(summary['cluster'].max()) + 1 if len(summary) else 0, dtype=np.int64)
+    rank[summary['cluster'].to_numpy()] = np.arange(1, len(summary) + 1)
+    return pd.DataFrame({
+        'cluster': rank[labels],
+        'anomaly': np.where(detect_anomalies(located)['anomaly'].to_numpy(), '是', '否'),
+    }, index=located['report_id'].to_numpy())
+
+
+def _with_analysis(frame, analysis):
+    """按 report_id 附加分析结果列"""
+    joined = analysis.reindex(frame['report_id'].to_numpy())
+    return frame.assign(cluster=joined['cluster'].astype('Int64').to_numpy(),
+                        anomaly=joined['anomaly'].to_numpy())
+
+
+def export_reports(source, path, progress=None, analysis=True):
+    """把解析数据集（含坐标）导出为Excel，返回导出的行数
+
+    source 为 DataFrame 或解析数据集文件（.parquet）；
+    文件按记录批次读取，不会一次性载入内存（计算分析结果时只读取坐标、信号等几列）。
+    analysis=True 时附加所属区域和是否可疑两列（见 report_analysis）。
+    """
+    if not isinstance(source, str):
+        if analysis:
+            source = _with_analysis(source, report_analysis(source))
+        columns, header = export_columns(list(source.columns))
+        return write_frame_xlsx(source[columns], path, header, progress=progress)
+
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(source)
+    names = parquet_file.schema_arrow.names
+    results = None
+    if analysis:
+        results = report_analysis(pd.read_parquet(source, columns=ANALYSIS_SOURCE_COLUMNS))
+        names = names + ANALYSIS_COLUMNS
+    columns, header = export_columns(names)
+    stored = [col for col in columns if col not in ANALYSIS_COLUMNS]
+    if analysis:
+        stored.append('report_id')
+
+    def rows():
+        for batch in parquet_file.iter_batches(batch_size=DEFAULT_CHUNK_ROWS, columns=stored):
+            frame = batch.to_pandas()
+            if analysis:
+                frame = _with_analysis(frame, results)
+            yield from iter_frame_rows(frame[columns])
+
+    return write_xlsx(path, header, rows(), total=parquet_file.metadata.num_rows,
+                      progress=progress)
@@ -5,12 +5,19 @@
 读取Excel数据，生成高德地图HTML文件
 """
 
-import pandas as pd
-import requests
 import json
-import time
+import string
 from datetime import datetime
 
+from render_cache import (DEFAULT_MAP_CENTER, RenderCache, artifact_file, cache_key,
+                          config_fingerprint, hash_json, hash_rows, remove_stale_artifacts)
+from district_stats import district_stats, stats_table
+from map_layers import build_layers, write_layers_script
+from live_reload import file_digest
+from resolved_reports import RESOLVED_COLUMNS, STATUS_FAILED, load_reports, located_reports
+from rollups import TimeRollups
+from static_assets import write_compressed_siblings
+
 # 高德地图API配置 - 从配置文件读取
 import os
 try:
@@ -27,96 +34,26 @@ except ImportError:
         print("2. 在 config.py 中填入您的高德地图API密钥")
         print("3. 或设置环境变量 AMAP_API_KEY 和 AMAP_JS_KEY")
 
-def geocode_address(address):
-    """使用高德地图API进行地理编码"""
-    url = "https://restapi.amap.com/v3/geocode/geo"
-    params = {
-        'key': AMAP_API_KEY,
-        'address': address,
-        'output': 'json'
-    }
-    
-    try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data['status'] == '1' and data['geocodes']:
-            location = data['geocodes'][0]['location']
-            lng, lat = location.split(',')
-            return float(lng), float(lat)
-        else:
-            print(f"地理编码失败: {address} - {data.get('info', '未知错误')}")
-            return None, None
-    except Exception as e:
-        print(f"地理编码异常: {address} - {str(e)}")
-        return None, None
+# 页面数据记录包含的字段
+RECORD_FIELDS = ['name', 'address', 'lng', 'lat', 'signal', 'network', 'reporter', 'time', 'note']
 
-def generate_amap_html(excel_file, output_file):
-    """生成高德地图HTML文件"""
-    
-    # 读取Excel数据
-    print("正在读取Excel数据...")
-    try:
-        df = pd.read_excel(excel_file)
-        print(f"成功读取 {len(df)} 条记录")
-    except Exception as e:
-        print(f"读取Excel文件失败: {str(e)}")
-        return False
-    
-    # 验证必要的列
-    required_columns = ['位置描述', '详细地址', '网络类型', '信号强度', '上报时间', '上报人', '备注']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        print(f"Excel文件缺少必要的列: {missing_columns}")
-        return False
-    
-    # 处理数据并进行地理编码
-    signal_data = []
-    print("正在进行地理编码...")
-    
-    for index, row in df.iterrows():
-        print(f"处理第 {index + 1}/{len(df)} 条记录: {row['位置描述']}")
-        
-        # 地理编码
-        lng, lat = geocode_address(row['详细地址'])
-        if lng is None or lat is None:
-            print(f"跳过无法定位的地址: {row['详细地址']}")
-            continue
-        
-        # 构建数据记录
-        record = {
-            'name': str(row['位置描述']),
-            'address': str(row['详细地址']),
-            'lng': lng,
-            'lat': lat,
-            'signal': int(row['信号强度']),
-            'network': str(row['网络类型']),
-            'reporter': str(row['上报人']),
-            'time': str(row['上报时间']),
-            'note': str(row['备注'])
-        }
-        signal_data.append(record)
-        
-        # 避免API调用过快
-        time.sleep(0.1)
-    
-    if not signal_data:
-        print("没有成功处理的数据记录")
-        return False
-    
-    print(f"成功处理 {len(signal_data)} 条记录")
-    
-    # 计算统计信息
-    total_points = len(signal_data)
-    severe_blindspots = len([d for d in signal_data if d['signal'] <= 2])
-    avg_signal = sum(d['signal'] for d in signal_data) / total_points
-    g5_coverage = len([d for d in signal_data if d['network'] == '5G']) / total_points * 100
-    
-    # 生成JavaScript数据
-    js_data = json.dumps(signal_data, ensure_ascii=False, indent=12)
-    
-    # HTML模板
-    html_template = f"""<!DOCTYPE html>
+# 每次写入文件的记录条数
+WRITE_CHUNK_SIZE = 1000
+
+# 生成器版本，参与渲染缓存键的计算
+GENERATOR_VERSION = '3.3'
+
+# 数据文件模板（{signal_data} 为数据区，流式写出）
+_DATA_TEMPLATE = """// 信号盲区数据
+const signalData = {signal_data};
+
+// 统计信息（在数据写出过程中累计得到）
+const signalStats = {signal_stats};
+"""
+
+# 页面模板，数据通过 {data_file} 单独加载（或通过本地服务器接口按需查询），
+# 数据变化时页面本身无需重写
+_HTML_TEMPLATE = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -229,6 +166,28 @@ def generate_amap_html(excel_file, output_file):
             color: #666;
             font-size: 0.8em;
         }}
+        .district-table {{
+            max-height: 260px;
+            overflow: auto;
+            margin-top: 8px;
+            font-size: 0.8em;
+        }}
+        .district-table table {{
+            border-collapse: collapse;
+            width: 100%;
+        }}
+        .district-table th, .district-table td {{
+            padding: 2px 4px;
+            border-bottom: 1px solid #eee;
+            text-align: right;
+            white-space: nowrap;
+        }}
+        .district-table th:nth-child(-n+2), .district-table td:nth-child(-n+2) {{
+            text-align: left;
+        }}
+        .district-table tr.total {{
+            font-weight: bold;
+        }}
         .loading {{
             position: absolute;
             top: 50%;
@@ -240,6 +199,48 @@ def generate_amap_html(excel_file, output_file):
             text-align: center;
             z-index: 2000;
         }}
+        .layer-panel {{
+            position: absolute;
+            top: 20px;
+            left: 20px;
+            background: rgba(255,255,255,0.95);
+            padding: 12px 15px;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.2);
+            z-index: 1000;
+            font-size: 0.9em;
+            color: #333;
+        }}
+        .layer-panel h4 {{
+            margin: 0 0 8px 0;
+        }}
+        .layer-panel label {{
+            display: block;
+            margin: 4px 0;
+            cursor: pointer;
+        }}
+        .timeline-panel {{
+            position: absolute;
+            bottom: 20px;
+            left: 50%;
+            transform: translateX(-50%);
+            background: rgba(255,255,255,0.95);
+            padding: 10px 15px;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.2);
+            z-index: 1000;
+            font-size: 0.9em;
+            color: #333;
+            min-width: 340px;
+        }}
+        .timeline-panel button {{
+            margin-right: 6px;
+            cursor: pointer;
+        }}
+        .timeline-panel input[type=range] {{
+            width: 100%;
+            margin: 8px 0 4px 0;
+        }}
         .timestamp {{
             position: absolute;
             bottom: 20px;
@@ -289,33 +290,73 @@ def generate_amap_html(excel_file, output_file):
             <h4>📊 统计信息</h4>
             <div class="stats">
                 <div class="stat-item">
-                    <span class="stat-number">{total_points}</span>
+                    <span class="stat-number" id="stat-total">-</span>
                     <span class="stat-label">监测点位</span>
                 </div>
                 <div class="stat-item">
-                    <span class="stat-number">{severe_blindspots}</span>
+                    <span class="stat-number" id="stat-severe">-</span>
                     <span class="stat-label">严重盲区</span>
                 </div>
                 <div class="stat-item">
-                    <span class="stat-number">{g5_coverage:.0f}%</span>
+                    <span class="stat-number" id="stat-5g">-</span>
                     <span class="stat-label">5G覆盖</span>
                 </div>
                 <div class="stat-item">
-                    <span class="stat-number">{avg_signal:.1f}</span>
+                    <span class="stat-number" id="stat-avg">-</span>
                     <span class="stat-label">平均强度</span>
                 </div>
             </div>
+            <div id="district-stats" style="display: none; margin-top: 8px; font-size: 0.9em;">
+                <a href="#" id="district-stats-toggle">按区县、网络类型查看 ▸</a>
+                <div class="district-table" id="district-table" style="display: none;"></div>
+            </div>
         </div>
         
+        <div class="layer-panel" id="layer-panel" style="display: none;">
+            <h4>🧭 分析图层</h4>
+            <div id="layer-list"></div>
+        </div>
+        
+        <div class="timeline-panel" id="timeline-panel" style="display: none;">
+            <button id="timeline-recent">最近7天</button>
+            <button id="timeline-play">▶ 播放</button>
+            <label><input type="checkbox" id="timeline-show"> 在地图上按区县显示</label>
+            <input type="range" id="timeline-slider" min="0" max="0" value="0">
+            <div id="timeline-summary">-</div>
+        </div>
+
         <div class="timestamp">
-            生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            生成时间: <span id="generated-at">-</span>
         </div>
     </div>
 
-    <script src="https://webapi.amap.com/maps?v=2.0&key={AMAP_JS_KEY}"></script>
+    <script src="https://webapi.amap.com/maps?v=2.0&key={js_key}"></script>
     <script>
-        // 信号盲区数据
-        const signalData = {js_data};
+        // 数据文件（无法使用本地服务器接口时加载完整数据）
+        const DATA_FILE = '{data_file}';
+        // 分析图层文件（区域聚类、信号预测等）
+        const LAYERS_FILE = '{layers_file}';
+        // 按需加载时每次请求的点数
+        const API_PAGE_SIZE = 2000;
+        // 右键查询附近上报的半径（米）
+        const NEARBY_RADIUS = 200;
+        // 时间汇总：按天播放的间隔（毫秒）和"最近N天"的天数
+        const TIMELINE_INTERVAL = 800;
+        const RECENT_DAYS = 7;
+
+        let map = null;
+        let nearbyCircle = null;
+        let markers = [];
+        let loadSeq = 0;
+        // 当前显示的是单个点（points）还是聚合（clusters），以及按id索引的点标记
+        let currentMode = null;
+        let pointMarkers = {{}};
+        // 按天×区县×网络类型的汇总（图层文件中的 timelineRollups），当前显示的时间段范围
+        let timeline = null;
+        let timelineRange = [0, 0];
+        let timelineRecent = true;
+        let timelineTimer = null;
+        let timelineOverlays = [];
 
         // 获取信号强度对应的颜色
         function getSignalColor(signal) {{
@@ -333,67 +374,476 @@ def generate_amap_html(excel_file, output_file):
             return '信号良好';
         }}
 
-        // 初始化地图
-        function initMap() {{
-            // 创建地图实例
-            const map = new AMap.Map('map', {{
-                zoom: 10,
-                center: [signalData[0].lng, signalData[0].lat],
-                mapStyle: 'amap://styles/normal',
-                viewMode: '2D'
-            }});
-
-            // 隐藏加载提示
-            document.getElementById('loading').style.display = 'none';
-
-            // 添加标记点
-            signalData.forEach(point => {{
-                // 创建标记
-                const marker = new AMap.Marker({{
-                    position: [point.lng, point.lat],
-                    title: point.name,
-                    icon: new AMap.Icon({{
-                        size: new AMap.Size(30, 30),
-                        image: createMarkerIcon(point.signal),
-                        imageSize: new AMap.Size(30, 30)
-                    }})
-                }});
+        // 填充统计面板
+        function showStats(stats) {{
+            document.getElementById('stat-total').textContent = stats.total;
+            document.getElementById('stat-severe').textContent = stats.severe;
+            document.getElementById('stat-5g').textContent = stats.g5_coverage.toFixed(0) + '%';
+            document.getElementById('stat-avg').textContent = stats.avg_signal.toFixed(1);
+            if (stats.generated_at) {{
+                document.getElementById('generated-at').textContent = stats.generated_at;
+            }}
+        }}
 
-                // 创建信息窗体内容
-                const infoContent = `
-                    <div style="padding: 10px; max-width: 280px;">
-                        <h4 style="margin: 0 0 10px 0; color: #333; font-size: 1.1em;">${{point.name}}</h4>
-                        <div style="margin: 5px 0;"><strong>地址：</strong>${{point.address}}</div>
-                        <div style="margin: 5px 0;"><strong>信号强度：</strong>
-                            <span style="color: ${{getSignalColor(point.signal)}}; font-weight: bold;">
-                                ${{point.signal}}/10 (${{getSignalDesc(point.signal)}})
-                            </span>
-                        </div>
-                        <div style="margin: 5px 0;"><strong>网络类型：</strong>
-                            <span style="background: #e3f2fd; color: #1976d2; padding: 2px 6px; border-radius: 3px; font-size: 0.9em;">
-                                ${{point.network}}
-                            </span>
-                        </div>
-                        <div style="margin: 5px 0;"><strong>上报时间：</strong>${{point.time}}</div>
-                        <div style="margin: 5px 0;"><strong>上报人：</strong>${{point.reporter}}</div>
-                        <div style="margin: 5px 0;"><strong>问题描述：</strong>${{point.note}}</div>
+        // 创建信息窗体内容
+        function buildInfoContent(point) {{
+            return `
+                <div style="padding: 10px; max-width: 280px;">
+                    <h4 style="margin: 0 0 10px 0; color: #333; font-size: 1.1em;">${{point.name}}</h4>
+                    <div style="margin: 5px 0;"><strong>地址：</strong>${{point.address}}</div>
+                    <div style="margin: 5px 0;"><strong>信号强度：</strong>
+                        <span style="color: ${{getSignalColor(point.signal)}}; font-weight: bold;">
+                            ${{point.signal}}/10 (${{getSignalDesc(point.signal)}})
+                        </span>
+                    </div>
+                    <div style="margin: 5px 0;"><strong>网络类型：</strong>
+                        <span style="background: #e3f2fd; color: #1976d2; padding: 2px 6px; border-radius: 3px; font-size: 0.9em;">
+                            ${{point.network}}
+                        </span>
                     </div>
-                `;
+                    <div style="margin: 5px 0;"><strong>上报时间：</strong>${{point.time}}</div>
+                    <div style="margin: 5px 0;"><strong>上报人：</strong>${{point.reporter}}</div>
+                    <div style="margin: 5px 0;"><strong>问题描述：</strong>${{point.note}}</div>
+                </div>
+            `;
+        }}
 
-                // 创建信息窗体
+        // 创建监测点标记
+        function createPointMarker(point) {{
+            const marker = new AMap.Marker({{
+                position: [point.lng, point.lat],
+                title: point.name,
+                icon: new AMap.Icon({{
+                    size: new AMap.Size(30, 30),
+                    image: createMarkerIcon(point.signal),
+                    imageSize: new AMap.Size(30, 30)
+                }})
+            }});
+
+            // 点击标记时才创建信息窗体
+            marker.on('click', function() {{
                 const infoWindow = new AMap.InfoWindow({{
-                    content: infoContent,
+                    content: buildInfoContent(point),
                     offset: new AMap.Pixel(0, -30)
                 }});
+                infoWindow.open(map, marker.getPosition());
+            }});
+            return marker;
+        }}
+
+        // 创建聚合标记：圆的大小表示点数，颜色表示平均信号强度
+        function createClusterMarker(cluster) {{
+            const [lng, lat, count, avgSignal] = cluster;
+            const marker = new AMap.CircleMarker({{
+                center: [lng, lat],
+                radius: Math.min(40, 8 + Math.sqrt(count) * 2),
+                fillColor: getSignalColor(avgSignal),
+                fillOpacity: 0.75,
+                strokeColor: '#ffffff',
+                strokeWeight: 1
+            }});
+            marker.on('click', function() {{
+                map.setZoomAndCenter(map.getZoom() + 2, [lng, lat]);
+            }});
+            return marker;
+        }}
+
+        // 清除当前标记
+        function clearMarkers() {{
+            if (markers.length) {{
+                map.remove(markers);
+            }}
+            markers = [];
+            pointMarkers = {{}};
+        }}
 
-                // 点击标记显示信息窗体
-                marker.on('click', function() {{
-                    infoWindow.open(map, marker.getPosition());
+        // 将接口返回的数组行转换为对象
+        function toPoint(fields, row) {{
+            const point = {{}};
+            fields.forEach((field, i) => {{ point[field] = row[i]; }});
+            return point;
+        }}
+
+        function createIndexedMarker(point) {{
+            const marker = createPointMarker(point);
+            pointMarkers[point.id] = marker;
+            return marker;
+        }}
+
+        // 添加标记
+        function addMarkers(newMarkers) {{
+            markers = markers.concat(newMarkers);
+            if (newMarkers.length) {{
+                map.add(newMarkers);
+            }}
+        }}
+
+        // 从本地服务器按可视范围分页加载数据
+        function loadVisiblePoints() {{
+            const seq = ++loadSeq;
+            const bounds = map.getBounds();
+            const sw = bounds.getSouthWest();
+            const ne = bounds.getNorthEast();
+            const query = `bbox=${{sw.lng}},${{sw.lat}},${{ne.lng}},${{ne.lat}}` +
+                `&zoom=${{Math.round(map.getZoom())}}&page_size=${{API_PAGE_SIZE}}`;
+
+            function fetchPage(page) {{
+                return fetch(`/api/points?${{query}}&page=${{page}}`)
+                    .then(response => response.json())
+                    .then(result => {{
+                        // 地图已移动，放弃过期的结果
+                        if (seq !== loadSeq) return;
+                        if (page === 1) clearMarkers();
+                        currentMode = result.mode;
+                        if (result.mode === 'clusters') {{
+                            addMarkers(result.clusters.map(createClusterMarker));
+                            return;
+                        }}
+                        addMarkers(result.points.map(row => createIndexedMarker(toPoint(result.fields, row))));
+                        if (result.page < result.pages) {{
+                            return fetchPage(result.page + 1);
+                        }}
+                    }});
+            }}
+            fetchPage(1).catch(error => console.error('加载数据失败', error));
+        }}
+
+        // 应用服务器推送的数据变化：只替换有变化的点，不重新加载全部标记
+        function applyDelta(delta) {{
+            showStats(delta.stats);
+            if (delta.timeline) {{
+                initTimeline(delta.timeline);
+            }}
+            if (delta.districtStats) {{
+                showDistrictStats(delta.districtStats);
+            }}
+            if (currentMode !== 'points') {{
+                // 聚合结果需要重新计算
+                loadVisiblePoints();
+                return;
+            }}
+
+            const changed = delta.added.concat(delta.updated).map(row => toPoint(delta.fields, row));
+            const stale = new Set();
+            delta.removed.concat(changed.map(point => point.id)).forEach(id => {{
+                if (pointMarkers[id]) {{
+                    stale.add(pointMarkers[id]);
+                    delete pointMarkers[id];
+                }}
+            }});
+            if (stale.size) {{
+                map.remove(Array.from(stale));
+                markers = markers.filter(marker => !stale.has(marker));
+            }}
+
+            const bounds = map.getBounds();
+            addMarkers(changed
+                .filter(point => bounds.contains([point.lng, point.lat]))
+                .map(createIndexedMarker));
+        }}
+
+        // 订阅数据变化推送（实时更新模式）
+        function subscribeUpdates() {{
+            if (!window.EventSource) return;
+            const source = new EventSource('/api/events');
+            let connected = false;
+            source.addEventListener('delta', event => applyDelta(JSON.parse(event.data)));
+            source.onopen = function() {{
+                // 断线重连期间的变化无法补发，重新加载一次
+                if (connected) {{
+                    fetch('/api/stats').then(response => response.json()).then(showStats);
+                    loadVisiblePoints();
+                }}
+                connected = true;
+            }};
+        }}
+
+        function escapeHtml(text) {{
+            return String(text).replace(/[&<>"']/g, c => ({{
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+            }})[c]);
+        }}
+
+        function layerStyle(signal, fillOpacity, color) {{
+            color = color || getSignalColor(signal);
+            return {{
+                strokeColor: color,
+                strokeWeight: 2,
+                fillColor: color,
+                fillOpacity: fillOpacity,
+                bubble: true
+            }};
+        }}
+
+        // 创建分析图层的覆盖物，点击圆、多边形或折线时显示说明
+        function createLayerOverlays(layer) {{
+            if (layer.type === 'raster') {{
+                const [west, south, east, north] = layer.bounds;
+                return [new AMap.ImageLayer({{
+                    url: layer.image,
+                    bounds: new AMap.Bounds([west, south], [east, north]),
+                    opacity: layer.opacity || 0.7,
+                    zIndex: 5
+                }})];
+            }}
+
+            let overlays = [];
+            if (layer.type === 'circles') {{
+                overlays = layer.items.map(([lng, lat, radius, signal, label]) => new AMap.Circle(
+                    Object.assign({{center: [lng, lat], radius: radius, extData: label}},
+                                  layerStyle(signal, 0.25))));
+            }} else if (layer.type === 'polygons') {{
+                overlays = layer.items.map(item => new AMap.Polygon(
+                    Object.assign({{path: item.path, extData: item.label}},
+                                  layerStyle(item.signal, 0.3, item.color))));
+            }} else if (layer.type === 'lines') {{
+                overlays = layer.items.map(item => new AMap.Polyline({{
+                    path: item.path, extData: item.label, strokeColor: item.color,
+                    strokeWeight: 2, bubble: true
+                }}));
+            }}
+            overlays.forEach(overlay => overlay.on('click', event => {{
+                new AMap.InfoWindow({{
+                    content: `<div style="padding: 8px;">${{escapeHtml(overlay.getExtData())}}</div>`
+                }}).open(map, event.lnglat);
+            }}));
+            return overlays;
+        }}
+
+        // 显示分析图层，并在图层面板中提供开关
+        function initLayers(layers) {{
+            const list = document.getElementById('layer-list');
+            layers.forEach(layer => {{
+                const overlays = createLayerOverlays(layer);
+                const label = document.createElement('label');
+                const checkbox = document.createElement('input');
+                checkbox.type = 'checkbox';
+                checkbox.checked = layer.visible;
+                checkbox.onchange = function() {{
+                    if (checkbox.checked) {{
+                        map.add(overlays);
+                    }} else {{
+                        map.remove(overlays);
+                    }}
+                }};
+                label.appendChild(checkbox);
+                label.appendChild(document.createTextNode(' ' + layer.name));
+                list.appendChild(label);
+                if (layer.visible) {{
+                    map.add(overlays);
+                }}
+            }});
+            if (layers.length) {{
+                document.getElementById('layer-panel').style.display = 'block';
+            }}
+        }}
+
+        // 加载分析图层文件，文件不存在时只显示监测点
+        function loadLayers() {{
+            const script = document.createElement('script');
+            script.src = LAYERS_FILE;
+            script.onload = function() {{
+                initLayers(analysisLayers);
+                if (typeof timelineRollups !== 'undefined') {{
+                    initTimeline(timelineRollups);
+                }}
+                if (typeof districtStats !== 'undefined') {{
+                    showDistrictStats(districtStats);
+                }}
+            }};
+            document.head.appendChild(script);
+        }}
+
+        // 区县 × 网络类型统计表（图层文件中的 districtStats），"全部"为汇总行
+        function showDistrictStats(table) {{
+            if (!table.rows.length) return;
+            const column = name => table.fields.indexOf(name);
+            const [district, network, count, mean, median, p10, severe] =
+                ['district', 'network', 'count', 'mean_signal', 'median_signal', 'p10_signal',
+                 'severe_ratio'].map(column);
+            const rows = table.rows.map(row => {{
+                const total = row[district] === '全部' || row[network] === '全部';
+                return `<tr${{total ? ' class="total"' : ''}}>` +
+                    `<td>${{escapeHtml(row[district])}}</td><td>${{escapeHtml(row[network])}}</td>` +
+                    `<td>${{row[count]}}</td><td>${{row[mean].toFixed(1)}}</td>` +
+                    `<td>${{row[median]}}</td><td>${{row[p10]}}</td>` +
+                    `<td>${{(row[severe] * 100).toFixed(1)}}%</td></tr>`;
+            }});
+            document.getElementById('district-table').innerHTML =
+                '<table><tr><th>区县</th><th>网络</th><th>上报</th><th>平均</th>' +
+                '<th>中位数</th><th>P10</th><th>严重</th></tr>' + rows.join('') + '</table>';
+            const toggle = document.getElementById('district-stats-toggle');
+            toggle.onclick = function(event) {{
+                event.preventDefault();
+                const tableBox = document.getElementById('district-table');
+                const hidden = tableBox.style.display === 'none';
+                tableBox.style.display = hidden ? 'block' : 'none';
+                toggle.textContent = '按区县、网络类型查看 ' + (hidden ? '▾' : '▸');
+            }};
+            document.getElementById('district-stats').style.display = 'block';
+        }}
+
+        // 汇总 [first, last] 时间段内各区县（及其中各网络类型）的上报
+        function summarizeTimeline(first, last) {{
+            const districts = {{}};
+            timeline.rows.forEach(([bucket, district, network, count, signalSum, severe]) => {{
+                if (bucket < first || bucket > last) return;
+                const total = districts[district] = districts[district] ||
+                    {{count: 0, signalSum: 0, severe: 0, networks: {{}}}};
+                const part = total.networks[network] = total.networks[network] ||
+                    {{count: 0, signalSum: 0, severe: 0}};
+                [total, part].forEach(item => {{
+                    item.count += count;
+                    item.signalSum += signalSum;
+                    item.severe += severe;
                 }});
+            }});
+            return districts;
+        }}
+
+        // 显示时间段范围的汇总；勾选"在地图上按区县显示"时在各区县中心画圆，
+        // 大小表示上报数，颜色表示平均信号，点击查看各网络类型的情况
+        function showTimeline(first, last) {{
+            timelineRange = [first, last];
+            document.getElementById('timeline-slider').value = last;
+            const districts = summarizeTimeline(first, last);
+            const items = Object.values(districts);
+            const count = items.reduce((sum, item) => sum + item.count, 0);
+            const severe = items.reduce((sum, item) => sum + item.severe, 0);
+            const signalSum = items.reduce((sum, item) => sum + item.signalSum, 0);
+            const period = first === last ? timeline.buckets[first] :
+                `${{timeline.buckets[first]}} ~ ${{timeline.buckets[last]}}`;
+            document.getElementById('timeline-summary').textContent =
+                `${{period}}：上报 ${{count}} 条，严重盲区 ${{severe}} 条` +
+                (count ? `，平均信号 ${{(signalSum / count).toFixed(1)}}` : '');
 
-                // 添加标记到地图
-                map.add(marker);
+            map.remove(timelineOverlays);
+            timelineOverlays = [];
+            if (!document.getElementById('timeline-show').checked) return;
+            Object.entries(districts).forEach(([index, item]) => {{
+                const [name, lng, lat] = timeline.districts[index];
+                if (lng === null) return;
+                const mean = item.signalSum / item.count;
+                const lines = Object.entries(item.networks).map(([network, part]) =>
+                    `${{escapeHtml(timeline.networks[network])}}：${{part.count}} 条，` +
+                    `平均信号 ${{(part.signalSum / part.count).toFixed(1)}}，严重盲区 ${{part.severe}} 条`);
+                const marker = new AMap.CircleMarker(Object.assign({{
+                    center: [lng, lat],
+                    radius: Math.min(40, 6 + 2 * Math.sqrt(item.count)),
+                    zIndex: 20
+                }}, layerStyle(mean, 0.5)));
+                marker.on('click', () => new AMap.InfoWindow({{
+                    content: `<div style="padding: 8px;"><strong>${{escapeHtml(name)}}</strong> ${{period}}<br>` +
+                             `上报 ${{item.count}} 条，平均信号 ${{mean.toFixed(1)}}<br>${{lines.join('<br>')}}</div>`
+                }}).open(map, [lng, lat]));
+                timelineOverlays.push(marker);
             }});
+            map.add(timelineOverlays);
+        }}
+
+        function showRecentDays() {{
+            stopTimeline();
+            timelineRecent = true;
+            const last = timeline.buckets.length - 1;
+            const start = new Date(timeline.buckets[last]);
+            start.setUTCDate(start.getUTCDate() - (RECENT_DAYS - 1));
+            showTimeline(timeline.buckets.findIndex(bucket => new Date(bucket) >= start), last);
+        }}
+
+        function stopTimeline() {{
+            clearInterval(timelineTimer);
+            timelineTimer = null;
+            document.getElementById('timeline-play').textContent = '▶ 播放';
+        }}
+
+        // 逐天播放，从当前位置（已到最后一天时从头）开始
+        function toggleTimelinePlay() {{
+            if (timelineTimer) {{
+                stopTimeline();
+                return;
+            }}
+            timelineRecent = false;
+            document.getElementById('timeline-show').checked = true;
+            document.getElementById('timeline-play').textContent = '⏸ 暂停';
+            let index = timelineRange[1] < timeline.buckets.length - 1 ? timelineRange[1] : 0;
+            showTimeline(index, index);
+            timelineTimer = setInterval(() => {{
+                if (++index >= timeline.buckets.length) {{
+                    stopTimeline();
+                    return;
+                }}
+                showTimeline(index, index);
+            }}, TIMELINE_INTERVAL);
+        }}
+
+        // 加载（或服务器推送更新后替换）时间汇总
+        function initTimeline(data) {{
+            const firstLoad = timeline === null;
+            timeline = data;
+            if (!data.buckets.length) return;
+            const slider = document.getElementById('timeline-slider');
+            slider.max = data.buckets.length - 1;
+            document.getElementById('timeline-panel').style.display = 'block';
+            if (firstLoad) {{
+                slider.oninput = function() {{
+                    stopTimeline();
+                    timelineRecent = false;
+                    showTimeline(+slider.value, +slider.value);
+                }};
+                document.getElementById('timeline-recent').onclick = function() {{
+                    document.getElementById('timeline-show').checked = true;
+                    showRecentDays();
+                }};
+                document.getElementById('timeline-play').onclick = toggleTimelinePlay;
+                document.getElementById('timeline-show').onchange = () => showTimeline(...timelineRange);
+            }}
+            if (timelineRecent) {{
+                showRecentDays();
+            }} else if (!timelineTimer) {{
+                showTimeline(Math.min(timelineRange[0], slider.max), Math.min(timelineRange[1], slider.max));
+            }}
+        }}
+
+        // 按需加载模式：只请求可视范围内的数据
+        function initWithApi(stats) {{
+            showStats(stats);
+            subscribeUpdates();
+            map.on('moveend', loadVisiblePoints);
+            map.on('rightclick', event => showNearby(event.lnglat));
+            if (stats.bounds) {{
+                map.setBounds(new AMap.Bounds([stats.bounds[0], stats.bounds[1]],
+                                              [stats.bounds[2], stats.bounds[3]]),
+                              false, [50, 50, 50, 50]);
+            }}
+            loadVisiblePoints();
+        }}
+
+        // 查询某位置附近的上报（如基站周围），在地图上标出范围并显示统计
+        function showNearby(lnglat) {{
+            fetch(`/api/nearby?lng=${{lnglat.lng}}&lat=${{lnglat.lat}}&radius=${{NEARBY_RADIUS}}&page_size=1`)
+                .then(response => response.json())
+                .then(result => {{
+                    if (result.error) throw new Error(result.error);
+                    if (nearbyCircle) map.remove(nearbyCircle);
+                    nearbyCircle = new AMap.Circle({{
+                        center: [lnglat.lng, lnglat.lat], radius: NEARBY_RADIUS,
+                        strokeColor: '#3498db', fillColor: '#3498db', fillOpacity: 0.1
+                    }});
+                    map.add(nearbyCircle);
+                    const nearest = result.points.length ?
+                        `<br>最近的上报：${{result.points[0][result.fields.indexOf('distance')]}} 米` : '';
+                    new AMap.InfoWindow({{
+                        content: `<div style="padding: 8px;">周围 ${{NEARBY_RADIUS}} 米内上报 ${{result.total}} 条<br>` +
+                                 `严重盲区 ${{result.severe}} 条，平均信号 ${{result.avg_signal}}${{nearest}}</div>`
+                    }}).open(map, lnglat);
+                }})
+                .catch(error => console.error('附近查询失败', error));
+        }}
+
+        // 完整数据模式：加载数据文件并显示全部标记点
+        function initWithDataFile() {{
+            showStats(signalStats);
+            addMarkers(signalData.map(createPointMarker));
 
             // 自适应显示所有标记点
             if (signalData.length > 0) {{
@@ -405,6 +855,46 @@ def generate_amap_html(excel_file, output_file):
             }}
         }}
 
+        function loadDataFile() {{
+            const script = document.createElement('script');
+            script.src = DATA_FILE;
+            script.onload = initWithDataFile;
+            script.onerror = function() {{
+                const loading = document.getElementById('loading');
+                loading.style.display = 'block';
+                loading.innerHTML = '<div style="color: red;">数据文件加载失败</div>';
+            }};
+            document.head.appendChild(script);
+        }}
+
+        // 初始化地图
+        function initMap() {{
+            // 创建地图实例
+            map = new AMap.Map('map', {{
+                zoom: {map_zoom},
+                center: [{map_center_lng}, {map_center_lat}],
+                mapStyle: 'amap://styles/normal',
+                viewMode: '2D'
+            }});
+
+            // 隐藏加载提示
+            document.getElementById('loading').style.display = 'none';
+            loadLayers();
+
+            // 通过本地服务器访问时使用查询接口按需加载，否则加载完整数据文件
+            if (location.protocol.indexOf('http') === 0) {{
+                fetch('/api/stats')
+                    .then(response => {{
+                        if (!response.ok) throw new Error(response.status);
+                        return response.json();
+                    }})
+                    .then(initWithApi)
+                    .catch(loadDataFile);
+            }} else {{
+                loadDataFile();
+            }}
+        }}
+
         // 创建标记图标
         function createMarkerIcon(signal) {{
             const canvas = document.createElement('canvas');
@@ -450,16 +940,223 @@ def generate_amap_html(excel_file, output_file):
     </script>
 </body>
 </html>"""
+
+
+def _compile_template(template):
+    """预编译模板：拆分为 (静态文本, 字段名) 序列，静态部分的转义只处理一次"""
+    compiled = []
+    pending = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        pending.append(literal)
+        if field is not None:
+            compiled.append((''.join(pending), field))
+            pending = []
+    compiled.append((''.join(pending), None))
+    return compiled
+
+
+_COMPILED_DATA_TEMPLATE = _compile_template(_DATA_TEMPLATE)
+_COMPILED_HTML_TEMPLATE = _compile_template(_HTML_TEMPLATE)
+
+def iter_signal_records(resolved, chunk_size=WRITE_CHUNK_SIZE):
+    """由解析数据集生成地图数据记录（只包含成功定位的记录）
+
+    每次只把 chunk_size 行转换为Python对象，内存占用不随数据量增长。
+    """
+    located = located_reports(resolved)[RECORD_FIELDS]
+    for start in range(0, len(located), chunk_size):
+        chunk = located.iloc[start:start + chunk_size]
+        # tolist() 转换为Python原生类型，便于JSON序列化
+        for row in zip(*(chunk[field].tolist() for field in RECORD_FIELDS)):
+            yield dict(zip(RECORD_FIELDS, row))
+
+def _render(compiled_template, output_file, fields, stream_field=None, stream=None):
+    """按预编译模板写出文件：先写临时文件，完成后替换目标文件"""
+    tmp_file = output_file + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for literal, field in compiled_template:
+                f.write(literal)
+                if field is None:
+                    continue
+                if field == stream_field:
+                    stream(f)
+                else:
+                    f.write(str(fields[field]()))
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    return tmp_file
+
+def write_amap_data(records, data_file):
+    """将数据记录流式写入数据文件，返回写入的记录数
+
+    模板的静态部分在模块加载时预编译，数据部分按块写出，
+    写出过程中只保留当前块和累计统计量，内存占用与数据量无关。
+    没有记录时不生成文件。
+    """
+    stats = {'total': 0, 'severe': 0, 'signal_sum': 0, 'g5': 0}
+    
+    def stream_data(f):
+        f.write('[')
+        separator = '\n'
+        chunk = []
+        for record in records:
+            stats['total'] += 1
+            stats['signal_sum'] += record['signal']
+            if record['signal'] <= 2:
+                stats['severe'] += 1
+            if record['network'] == '5G':
+                stats['g5'] += 1
+            
+            # 转义 '</' 防止数据中的文本提前结束 <script> 标签
+            chunk.append(json.dumps(record, ensure_ascii=False).replace('</', '<\\/'))
+            if len(chunk) >= WRITE_CHUNK_SIZE:
+                f.write(separator + ',\n'.join(chunk))
+                separator = ',\n'
+                chunk = []
+        if chunk:
+            f.write(separator + ',\n'.join(chunk))
+        f.write('\n]')
+    
+    def signal_stats():
+        total = stats['total']
+        return json.dumps({
+            'total': total,
+            'severe': stats['severe'],
+            'avg_signal': stats['signal_sum'] / total if total else 0,
+            'g5_coverage': stats['g5'] / total * 100 if total else 0,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }, ensure_ascii=False)
+    
+    fields = {'signal_stats': signal_stats}
+    tmp_file = _render(_COMPILED_DATA_TEMPLATE, data_file, fields,
+                       stream_field='signal_data', stream=stream_data)
+    if stats['total'] == 0:
+        os.remove(tmp_file)
+    else:
+        os.replace(tmp_file, data_file)
+        write_compressed_siblings(data_file)
+    return stats['total']
+
+def write_amap_layers(resolved, layers_file):
+    """计算分析图层（区域聚类、信号预测等）、按天的时间汇总和区县统计，写出图层文件"""
+    located = located_reports(resolved)
+    write_layers_script(build_layers(located), layers_file,
+                        {'timelineRollups': TimeRollups.from_reports(located).to_page(),
+                         'districtStats': stats_table(district_stats(located))})
+    write_compressed_siblings(layers_file)
+
+def write_amap_shell(output_file, data_file, layers_file):
+    """写出页面文件，data_file、layers_file 为页面引用的数据文件和图层文件路径（相对页面）"""
+    fields = {
+        'js_key': lambda: AMAP_JS_KEY,
+        'data_file': lambda: data_file,
+        'layers_file': lambda: layers_file,
+        'map_center_lng': lambda: DEFAULT_MAP_CENTER['longitude'],
+        'map_center_lat': lambda: DEFAULT_MAP_CENTER['latitude'],
+        'map_zoom': lambda: DEFAULT_MAP_CENTER.get('zoom', 11)
+    }
+    os.replace(_render(_COMPILED_HTML_TEMPLATE, output_file, fields), output_file)
+    write_compressed_siblings(output_file)
+
+def generate_amap_html(excel_file, output_file, use_cache=True, progress=None, resolved_file=None):
+    """生成高德地图HTML文件
+
+    excel_file 可以是Excel文件、解析数据集文件（.parquet）或解析后的DataFrame；
+    Excel输入会先地理编码，指定 resolved_file 时把解析数据集保存到该路径，供其他命令和接口复用。
+    输出为页面文件、数据文件（页面名.data.<缓存键>.js）和分析图层文件（页面名.layers.<缓存键>.js），
+    页面更新后不再引用的旧数据文件和图层文件随之删除。use_cache=True 时，
+    输入数据、地理编码结果、相关配置和生成器版本均未变化则直接复用已有文件；
+    只有数据变化时仅重写数据文件。输入为文件时先按文件内容的摘要检查缓存，
+    命中时不读取和解析输入；摘要不同时再按解析后的数据行检查。
+    progress(已完成, 总数, 说明) 用于报告地理编码进度。
+    """
+    render_cache = RenderCache(os.path.dirname(output_file)) if use_cache else None
+    input_digest = None
+    if render_cache is not None and isinstance(excel_file, str):
+        input_digest = file_digest(excel_file)
+    
+    def input_key():
+        # 要保存的解析数据集被改写（如生成其他输入的地图）或删除后不再复用
+        saved = None
+        if resolved_file:
+            stat = os.stat(resolved_file) if os.path.exists(resolved_file) else None
+            saved = [os.path.abspath(resolved_file), stat and stat.st_mtime_ns, stat and stat.st_size]
+        return cache_key('amap-input', GENERATOR_VERSION, input_digest, config_fingerprint(),
+                         hash_json(AMAP_JS_KEY), saved)
     
-    # 写入HTML文件
+    if input_digest is not None and render_cache.is_fresh_input(output_file, input_key()):
+        print(f"输入文件未变化，复用已生成的地图: {output_file}")
+        return True
+    
+    # 读取并解析数据
+    print("正在读取数据...")
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_template)
-        print(f"成功生成高德地图HTML文件: {output_file}")
+        resolved = load_reports(excel_file, AMAP_API_KEY, progress=progress,
+                                resolved_file=resolved_file)
+    except Exception as e:
+        print(f"读取数据失败: {str(e)}")
+        return False
+    
+    # 计算缓存键（解析数据集同时包含输入行和地理编码结果）
+    data_hash = hash_rows(resolved[RESOLVED_COLUMNS])
+    data_key = cache_key('amap-data', GENERATOR_VERSION, data_hash)
+    layers_key = cache_key('amap-layers', GENERATOR_VERSION, config_fingerprint(), data_hash)
+    data_file = artifact_file(output_file, 'data', data_key)
+    data_name = os.path.basename(data_file)
+    layers_file = artifact_file(output_file, 'layers', layers_key)
+    layers_name = os.path.basename(layers_file)
+    shell_key = cache_key('amap-shell', GENERATOR_VERSION, config_fingerprint(),
+                          hash_json(AMAP_JS_KEY), data_name, layers_name)
+    
+    def is_fresh(artifact, key):
+        return render_cache is not None and render_cache.is_fresh(artifact, key)
+    
+    def record_input():
+        # 有地址解析失败时不记录：下次生成时可能解析成功
+        if input_digest is not None and not (resolved['geocode_status'] == STATUS_FAILED).any():
+            render_cache.record_input(output_file, input_key(), [data_file, layers_file])
+    
+    if is_fresh(data_file, data_key) and is_fresh(layers_file, layers_key) \
+            and is_fresh(output_file, shell_key):
+        print(f"输入未变化，复用已生成的地图: {output_file}")
+        record_input()
         return True
+    
+    try:
+        if not is_fresh(data_file, data_key):
+            # 流式写出数据文件
+            count = write_amap_data(iter_signal_records(resolved), data_file)
+            if count == 0:
+                print("没有成功处理的数据记录")
+                return False
+            print(f"成功处理 {count} 条记录")
+            if render_cache:
+                render_cache.record(data_file, data_key)
+        
+        if not is_fresh(layers_file, layers_key):
+            if progress:
+                progress(None, None, '生成分析图层')
+            write_amap_layers(resolved, layers_file)
+            if render_cache:
+                render_cache.record(layers_file, layers_key)
+        
+        if not is_fresh(output_file, shell_key):
+            write_amap_shell(output_file, data_name, layers_name)
+            if render_cache:
+                render_cache.record(output_file, shell_key)
+            removed = remove_stale_artifacts(output_file, [data_file, layers_file])
+            if render_cache:
+                render_cache.forget(removed)
     except Exception as e:
         print(f"写入HTML文件失败: {str(e)}")
         return False
+    
+    record_input()
+    print(f"成功生成高德地图HTML文件: {output_file}")
+    return True
 
 def main():
     """主函数"""
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复上报合并
+同一地下室、电梯往往在一周内被多人反复上报，每条上报各占一个标记并叠加热度，
+会夸大该处的问题并增加渲染量。本模块把距离和时间都相近的上报合并为一个"事件"：
+- 上报按 (米制网格, 时间段) 分桶，只在相邻的桶之间比较，不做两两比较
+- 网格边长取合并距离的 1/√2，同一格内的上报必然相距不超过合并距离，
+  只需按时间排序后连接相邻的上报；不同格之间才逐对计算距离
+- 可合并的上报之间连边，连通的上报属于同一事件（单链接）；
+  在上报密集的区域连成一大片的，再按网格和时间段切分
+"""
+
+import numpy as np
+import pandas as pd
+
+from blind_spots import connected_components
+from resolved_reports import parse_report_times
+from spatial_index import meter_scales
+
+# 默认合并距离（米）和时间窗口（小时）
+DEFAULT_DISTANCE_METERS = 100
+DEFAULT_WINDOW_HOURS = 24 * 7
+# 事件的空间范围（米）或时间跨度超过合并距离或时间窗口的该倍数时，按网格切分
+MAX_SPREAD = 2
+# 每批展开的候选配对数上限，控制临时数组的大小
+PAIR_CHUNK = 1 << 20
+
+INCIDENT_COLUMNS = ['incident_id', 'lng', 'lat', 'reports', 'worst_signal', 'mean_signal',
+                    'severe', 'first_time', 'last_time', 'reporters', 'reporter_count',
+                    'name', 'address', 'network']
+
+# 相距至多 2 格的相邻网格中"向前"的一半，每对网格只比较一次
+_FORWARD_OFFSETS = [(1, 0), (2, 0)] + [(dx, dy) for dy in (1, 2) for dx in range(-2, 3)]
+
+
+def _expand(starts, counts):
+    """把若干段连续下标 [start, start + count) 展开，返回 (段序号, 下标)"""
+    owner = np.repeat(np.arange(len(starts)), counts)
+    first = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return owner, first + np.arange(int(counts.sum()))
+
+
+def link_reports(x, y, t, distance, window):
+    """返回距离不超过 distance 且时间相差不超过 window 的上报之间的边 (u, v)
+
+    x、y 为米制坐标，t 为时间（与 window 同单位）。
+    """
+    cell = distance / np.sqrt(2)
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    ct = np.floor(t / window).astype(np.int64)
+    cx, cy, ct = cx - cx.min() + 2, cy - cy.min(), ct - ct.min() + 1
+    width, periods = int(cx.max()) + 3, int(ct.max()) + 2
+    keys = (cy * width + cx) * periods + ct
+
+    # 按 (网格, 时间) 排序；同一网格的上报连续存放
+    order = np.lexsort((t, keys))
+    keys, xs, ys, ts = keys[order], x[order], y[order], t[order]
+    cells = keys // periods
+
+    # 同一格内：时间上相邻且间隔不超过窗口的上报连边
+    same = (cells[1:] == cells[:-1]) & (ts[1:] - ts[:-1] <= window)
+    u = [np.nonzero(same)[0]]
+    v = [u[0] + 1]
+
+    # 相邻格之间：候选为目标格中前后各一个时间段内的上报，再逐对检查
+    for dx, dy in _FORWARD_OFFSETS:
+        target = (cells + dy * width + dx) * periods + ct[order]
+        starts = np.searchsorted(keys, target - 1, side='left')
+        counts = np.searchsorted(keys, target + 1, side='right') - starts
+        total = np.cumsum(counts)
+        begin = 0
+        while begin < len(keys):
+            offset = total[begin - 1] if begin else 0
+            end = max(int(np.searchsorted(total, offset + PAIR_CHUNK, side='right')), begin + 1)
+            owner, other = _expand(starts[begin:end], counts[begin:end])
+            owner += begin
+            close = ((np.hypot(xs[owner] - xs[other], ys[owner] - ys[other]) <= distance)
+                     & (np.abs(ts[owner] - ts[other]) <= window))
+            u.append(owner[close])
+            v.append(other[close])
+            begin = end
+
+    return order[np.concatenate(u)], order[np.concatenate(v)]
+
+
+def _split_spread(component, x, y, hours, distance, window):
+    """单链接可能沿密集区域连成一大片，范围超过 MAX_SPREAD 倍合并距离或时间窗口的
+    事件按 (合并距离网格, 时间窗口) 切分，返回新的事件编号（从 0 连续编号）"""
+    frame = pd.DataFrame({'component': component, 'x': x, 'y': y, 't': hours})
+    groups = frame.groupby('component')
+    extent = groups.max() - groups.min()
+    spread = ((extent['x'] > MAX_SPREAD * distance) | (extent['y'] > MAX_SPREAD * distance)
+              | (extent['t'] > MAX_SPREAD * window)).to_numpy()[component]
+    if not spread.any():
+        return component
+
+    frame['bx'] = np.where(spread, np.floor(x / distance), 0).astype(np.int64)
+    frame['by'] = np.where(spread, np.floor(y / distance), 0).astype(np.int64)
+    frame['bt'] = np.where(spread, np.floor(hours / window), 0).astype(np.int64)
+    return frame.groupby(['component', 'bx', 'by', 'bt']).ngroup().to_numpy()
+
+
+def representative_rows(labels, signal):
+    """每个事件（labels 从 0 连续编号）中信号最差的一条上报的位置，同等时取最早的一条"""
+    order = np.lexsort((signal, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    return order[first]
+
+
+def merge_incidents(located, distance=DEFAULT_DISTANCE_METERS, window_hours=DEFAULT_WINDOW_HOURS):
+    """把已定位的上报合并为事件
+
+    返回 (labels, incidents)：labels 为每条上报所属事件的 incident_id；
+    incidents 每行一个事件，按最差信号升序、上报数降序排列，incident_id 从 1 开始。
+    上报时间无法解析的上报不与其他上报合并。
+    """
+    lng = located['lng'].to_numpy(dtype=float)
+    lat = located['lat'].to_numpy(dtype=float)
+    if not len(lng):
+        return np.empty(0, dtype=np.int64), pd.DataFrame(columns=INCIDENT_COLUMNS)
+
+    times = parse_report_times(located['time'].to_numpy()).reset_index(drop=True)
+    timed = np.nonzero(times.notna().to_numpy())[0]
+    lng_scale, lat_scale = meter_scales(lat)
+    x, y = lng * lng_scale, lat * lat_scale
+    hours = ((times - pd.Timestamp(0)) / pd.Timedelta(hours=1)).fillna(0).to_numpy(dtype=float)
+    u = v = np.empty(0, dtype=np.int64)
+    if len(timed) > 1:
+        u, v = link_reports(x[timed], y[timed], hours[timed], distance, window_hours)
+        u, v = timed[u], timed[v]
+    _, component = np.unique(connected_components(len(lng), u, v), return_inverse=True)
+    component = _split_spread(component, x, y, hours, distance, window_hours)
+
+    signal = located['signal'].to_numpy(dtype=int)
+    frame = pd.DataFrame({'incident': component, 'lng': lng, 'lat': lat, 'signal': signal,
+                          'severe': signal <= 2, 'time': times})
+    incidents = frame.groupby('incident').agg(
+        lng=('lng', 'mean'), lat=('lat', 'mean'), reports=('signal', 'size'),
+        worst_signal=('signal', 'min'), mean_signal=('signal', 'mean'), severe=('severe', 'sum'),
+        first_time=('time', 'min'), last_time=('time', 'max'))
+
+    # 位置描述等取该事件中信号最差的一条上报
+    representative = representative_rows(component, signal)
+    for column in ('name', 'address', 'network'):
+        incidents[column] = located[column].iloc[representative].to_numpy()
+
+    # 上报人去重后按出现顺序列出
+    reporters = pd.DataFrame({'incident': component,
+                              'reporter': located['reporter'].to_numpy(dtype=object)})
+    reporters = reporters[reporters['reporter'].notna()]
+    reporters = reporters.assign(reporter=reporters['reporter'].astype(str).str.strip())
+    reporters = reporters[reporters['reporter'] != ''].drop_duplicates()
+    reporters = reporters.sort_values('incident', kind='stable')
+    owner = reporters['incident'].to_numpy()
+    names = reporters['reporter'].to_numpy(dtype=object)
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]]) if len(owner) else owner
+    ends = np.r_[starts[1:], len(owner)]
+    # 大多数事件只有一个上报人，只对多人的事件拼接文本
+    joined = names[starts]
+    for i in np.flatnonzero(ends - starts > 1):
+        joined[i] = '、'.join(names[starts[i]:ends[i]])
+    incidents['reporters'] = pd.Series(joined, index=owner[starts], dtype=object).reindex(
+        incidents.index, fill_value='')
+    incidents['reporter_count'] = pd.Series(ends - starts, index=owner[starts]).reindex(
+        incidents.index, fill_value=0)
+
+    incidents = incidents.sort_values(['worst_signal', 'reports'], ascending=[True, False],
+                                      kind='stable')
+    incident_id = np.empty(len(incidents), dtype=np.int64)
+    incident_id[incidents.index.to_numpy()] = np.arange(1, len(incidents) + 1)
+    incidents = incidents.reset_index(drop=True)
+    incidents.insert(0, 'incident_id', np.arange(1, len(incidents) + 1))
+    return incident_id[component], incidents[INCIDENT_COLUMNS]
+
+
+def incident_reports(located, **options):
+    """合并后的上报：每个事件一行，列与 located 相同，可直接交给各地图生成器
+
+    位置为事件内上报的平均位置，信号取最差值，合并了多条上报的事件在
+    上报时间、上报人、备注中注明时间范围、全部上报人和上报数。
+    """
+    labels, incidents = merge_incidents(located, **options)
+    if not len(incidents):
+        return located.assign(reports=pd.Series(dtype=int))
+
+    # 以信号最差的上报为代表
+    representative = representative_rows(labels - 1, located['signal'].to_numpy())
+    merged = located.iloc[representative].reset_index(drop=True)
+    details = incidents.iloc[labels[representative] - 1].reset_index(drop=True)
+
+    merged['lng'] = details['lng'].to_numpy()
+    merged['lat'] = details['lat'].to_numpy()
+    merged['reports'] = details['reports'].to_numpy()
+    multiple = (details['reports'] > 1).to_numpy()
+    if multiple.any():
+        span = (details['first_time'].dt.strftime('%Y-%m-%d %H:%M') + ' ~ '
+                + details['last_time'].dt.strftime('%Y-%m-%d %H:%M'))
+        note = ('合并 ' + details['reports'].astype(str) + ' 条上报，平均信号 '
+                + details['mean_signal'].round(1).astype(str))
+        merged['time'] = merged['time'].astype(object)
+        merged['reporter'] = merged['reporter'].astype(object)
+        merged['note'] = merged['note'].astype(object)
+        merged.loc[multiple, 'time'] = span[multiple].to_numpy()
+        merged.loc[multiple, 'reporter'] = details.loc[multiple, 'reporters'].to_numpy()
+        merged.loc[multiple, 'note'] = note[multiple].to_numpy()
+    return merged
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+信号插值
+用反距离加权（IDW）由上报点估计规则网格上各位置的信号强度，预测没有上报的区域：
+- 距离在当地的米制平面坐标中计算（经度按纬度缩放），各方向一致
+- 同一小格内的上报先合并为一个加权点，邻近点由网格索引的 kNN 查询得到，
+  计算量约为 网格数 × k，而不是 网格数 × 上报数
+- 输出网格分块计算，临时数组的大小只与块大小有关
+"""
+
+import numpy as np
+
+from raster import colorize, png_data_uri
+from spatial_index import GridIndex, meter_scales
+
+# 默认网格边长（米）、邻近点数、距离幂次
+DEFAULT_CELL_METERS = 250
+DEFAULT_NEIGHBORS = 8
+DEFAULT_POWER = 2
+# 超过该距离（米）的上报不参与插值，周围都没有上报的格子为 NaN
+DEFAULT_MAX_DISTANCE = 2000
+# 距离下限（米），避免格子中心恰好落在上报点上时除以零
+MIN_DISTANCE = 1.0
+
+# 每块的格子数（边长）和整个网格的格子数上限
+TILE_CELLS = 64
+MAX_GRID_CELLS = 16 * 1024 * 1024
+
+# 信号强度范围，用于着色
+SIGNAL_RANGE = (1, 8)
+
+
+class SignalSurface:
+    """插值结果：经纬度规则网格上的信号强度
+
+    values[行, 列] 为格子中心的值，第 0 行在最南边，没有数据的格子为 NaN。
+    """
+
+    def __init__(self, west, south, lng_step, lat_step, values):
+        self.west = float(west)
+        self.south = float(south)
+        self.lng_step = float(lng_step)
+        self.lat_step = float(lat_step)
+        self.values = values
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def east(self):
+        return self.west + self.shape[1] * self.lng_step
+
+    @property
+    def north(self):
+        return self.south + self.shape[0] * self.lat_step
+
+    @property
+    def bounds(self):
+        """[[南, 西], [北, 东]]，与 folium 图层的 bounds 格式一致"""
+        return [[self.south, self.west], [self.north, self.east]]
+
+    def cell_centers(self):
+        """各列中心的经度、各行中心的纬度"""
+        lng = self.west + (np.arange(self.shape[1]) + 0.5) * self.lng_step
+        lat = self.south + (np.arange(self.shape[0]) + 0.5) * self.lat_step
+        return lng, lat
+
+    def sample(self, lng, lat):
+        """查询任意位置所在格子的值，网格范围外为 NaN"""
+        lng = np.asarray(lng, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        col = np.floor((lng - self.west) / self.lng_step).astype(np.int64)
+        row = np.floor((lat - self.south) / self.lat_step).astype(np.int64)
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        result = np.full(np.shape(lng), np.nan)
+        result[inside] = self.values[row[inside], col[inside]]
+        return result
+
+    def to_rgba(self, vmin=SIGNAL_RANGE[0], vmax=SIGNAL_RANGE[1]):
+        # 图像第 0 行在顶部（最北边）
+        return colorize(np.flipud(self.values), vmin, vmax)
+
+    def to_data_uri(self):
+        """着色后的PNG图像（data URI），可直接作为地图的图片图层"""
+        return png_data_uri(self.to_rgba())
+
+    def save(self, path):
+        np.savez_compressed(path, values=self.values,
+                            origin=[self.west, self.south, self.lng_step, self.lat_step])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*data['origin'], data['values'])
+
+
+def _support_points(x, y, values, bin_size):
+    """同一小格内的上报合并为一个点：位置和信号取平均，权重为上报数"""
+    bx = np.floor(x / bin_size).astype(np.int64)
+    by = np.floor(y / bin_size).astype(np.int64)
+    keys = (bx - bx.min()) * (int(by.max() - by.min()) + 1) + (by - by.min())
+    _, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse).astype(float)
+    return (np.bincount(inverse, x) / counts, np.bincount(inverse, y) / counts,
+            np.bincount(inverse, values) / counts, counts)
+
+
+def idw_surface(lng, lat, values, cell_meters=DEFAULT_CELL_METERS, bounds=None,
+                neighbors=DEFAULT_NEIGHBORS, power=DEFAULT_POWER,
+                max_distance=DEFAULT_MAX_DISTANCE, progress=None):
+    """计算信号强度的 IDW 插值网格，返回 SignalSurface
+
+    bounds 为 (西, 南, 东, 北)，默认取上报范围并向外扩展 max_distance；
+    progress(已完成块数, 总块数, 说明) 每算完一块调用一次。
+    """
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(lng) & np.isfinite(lat) & np.isfinite(values)
+    lng, lat, values = lng[valid], lat[valid], values[valid]
+    if not len(lng):
+        raise ValueError("没有可用于插值的上报点")
+
+    # 当地米制平面坐标
+    lng_scale, lat_scale = meter_scales(lat)
+    lng_step, lat_step = cell_meters / lng_scale, cell_meters / lat_scale
+
+    if bounds is None:
+        pad = max_distance or cell_meters
+        bounds = (lng.min() - pad / lng_scale, lat.min() - pad / lat_scale,
+                  lng.max() + pad / lng_scale, lat.max() + pad / lat_scale)
+    west, south, east, north = bounds
+    nx = max(1, int(np.ceil((east - west) / lng_step)))
+    ny = max(1, int(np.ceil((north - south) / lat_step)))
+    if nx * ny > MAX_GRID_CELLS:
+        raise ValueError(f"插值网格过大（{nx}×{ny}），请增大格子边长或缩小范围")
+
+    sx, sy, sv, weight = _support_points(lng * lng_scale, lat * lat_scale, values,
+                                         cell_meters / 2)
+    index = GridIndex(sx, sy, cell_size=cell_meters * 2)
+
+    result = np.full((ny, nx), np.nan)
+    tiles = [(r, c) for r in range(0, ny, TILE_CELLS) for c in range(0, nx, TILE_CELLS)]
+    for done, (r0, c0) in enumerate(tiles):
+        rows = np.arange(r0, min(r0 + TILE_CELLS, ny))
+        cols = np.arange(c0, min(c0 + TILE_CELLS, nx))
+        qx = (west + (cols + 0.5) * lng_step) * lng_scale
+        qy = (south + (rows + 0.5) * lat_step) * lat_scale
+        qx, qy = np.meshgrid(qx, qy)
+
+        dist, idx = index.query_knn(qx.ravel(), qy.ravel(), neighbors, max_distance or None)
+        usable = idx >= 0
+        w = np.where(usable, weight[idx] / np.maximum(dist, MIN_DISTANCE) ** power, 0.0)
+        total = w.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = (w * sv[idx]).sum(axis=1) / total
+        estimate[total == 0] = np.nan
+        result[r0:r0 + len(rows), c0:c0 + len(cols)] = estimate.reshape(len(rows), len(cols))
+        if progress:
+            progress(done + 1, len(tiles), 'IDW插值')
+
+    return SignalSurface(west, south, lng_step, lat_step, result)
+
+
+def signal_surface(located, **options):
+    """对已定位的上报（解析数据集中定位成功的记录）计算信号强度插值网格"""
+    return idw_surface(located['lng'], located['lat'], located['signal'], **options)
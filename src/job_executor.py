@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务执行器
+耗时任务（生成地图、读取Excel、地理编码等）在工作线程中执行，
+进度、结果和异常放入结果队列，由界面线程定期调用 poll() 取出并回调，
+界面线程之外不直接操作任何界面组件。任务通过检查取消标记协作式地取消。
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 工作线程数
+DEFAULT_MAX_WORKERS = 2
+
+
+class JobCancelled(BaseException):
+    """任务已被取消
+
+    与 asyncio.CancelledError 一样继承 BaseException，
+    不会被数据处理代码中的 except Exception 拦截。
+    """
+
+
+class Job:
+    """传给任务函数的句柄：报告进度、记录日志、检查是否已被取消"""
+
+    def __init__(self, job_id, name, results):
+        self.id = job_id
+        self.name = name
+        self._results = results
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """任务函数在循环中调用，已取消时抛出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def progress(self, done=None, total=None, message=None):
+        """报告进度（同时检查是否已取消），可直接作为 progress 回调传给数据处理函数"""
+        self.check_cancelled()
+        self._results.put(('progress', self, (done, total, message)))
+
+    def log(self, message, level='info'):
+        """日志交给界面线程输出"""
+        self._results.put(('log', self, (message, level)))
+
+
+class JobExecutor:
+    """线程池 + 结果队列；回调只在调用 poll() 的线程中执行"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._results = queue.Queue()
+        self._ids = itertools.count(1)
+        self._callbacks = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, name='', on_done=None, on_error=None, on_progress=None,
+               on_log=None, on_cancelled=None, **kwargs):
+        """提交任务，fn 的第一个参数为 Job，返回 Job"""
+        job = Job(next(self._ids), name or getattr(fn, '__name__', 'job'), self._results)
+        with self._lock:
+            self._active[job.id] = job
+            self._callbacks[job.id] = {
+                'done': on_done, 'error': on_error, 'progress': on_progress,
+                'log': on_log, 'cancelled': on_cancelled
+            }
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        kind, payload = 'error', None
+        try:
+            job.check_cancelled()
+            payload = fn(job, *args, **kwargs)
+            kind = 'done'
+        except JobCancelled:
+            kind = 'cancelled'
+        except BaseException as e:
+            # KeyboardInterrupt、SystemExit 等同样报告为失败，之后继续向上抛出
+            payload = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            # 无论任务如何结束都移出活动任务，避免 is_busy() 一直为真
+            with self._lock:
+                self._active.pop(job.id, None)
+            self._results.put((kind, job, payload))
+
+    @property
+    def active_jobs(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def is_busy(self):
+        return bool(self.active_jobs)
+
+    def cancel_all(self):
+        for job in self.active_jobs:
+            job.cancel()
+
+    def call_soon(self, fn, *args):
+        """可在任意线程调用：安排 fn(*args) 在调用 poll() 的线程中执行"""
+        self._results.put(('call', None, (fn, args)))
+
+    def poll(self, max_events=200):
+        """取出已完成的事件并调用对应回调，返回处理的事件数"""
+        handled = 0
+        while handled < max_events:
+            try:
+                kind, job, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            if kind == 'call':
+                fn, args = payload
+                fn(*args)
+                continue
+
+            with self._lock:
+                callbacks = self._callbacks.get(job.id, {})
+                if kind in ('done', 'error', 'cancelled'):
+                    self._callbacks.pop(job.id, None)
+
+            callback = callbacks.get(kind)
+            if callback is None:
+                continue
+            if kind == 'progress':
+                callback(job, *payload)
+            elif kind == 'log':
+                message, level = payload
+                callback(message, level=level)
+            elif kind == 'cancelled':
+                callback(job)
+            else:
+                callback(payload)
+        return handled
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel_all()
+        # 已取消的任务在开始执行时立即结束
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时更新
+监视Excel数据文件，文件内容变化时只重新处理有变化的行，
+更新解析数据集和按时间的汇总（只加减有变化的行），
+并把新增/删除/修改的点及最新的统计推送给已打开的地图页面。
+"""
+
+import hashlib
+import os
+import threading
+
+from district_stats import district_stats, stats_table
+from render_cache import GeocodeCache
+from resolved_reports import (DEFAULT_RESOLVED_FILE, amap_geocode, load_resolved_reports,
+                              located_reports, read_reports, resolve_reports,
+                              save_resolved_reports, update_resolved)
+from rollups import TimeRollups, rollups_file_for
+
+# 检查文件变化的间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileWatcher:
+    """轮询文件的修改时间和大小，变化后再比较内容哈希，内容确实改变时调用 callback"""
+
+    def __init__(self, path, callback, interval=DEFAULT_POLL_INTERVAL, on_error=None):
+        self.path = path
+        self.callback = callback
+        self.on_error = on_error
+        self.interval = interval
+        self._signature = None
+        self._digest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def prime(self):
+        """记录文件的当前状态，之后只有再次变化才会触发 callback"""
+        self._signature = self._stat_signature()
+        self._digest = file_digest(self.path) if self._signature else None
+
+    def check(self):
+        """检查一次，文件内容变化并处理成功后返回 True"""
+        signature = self._stat_signature()
+        if signature is None or signature == self._signature:
+            return False
+        digest = file_digest(self.path)
+        if digest == self._digest:
+            # 只是修改时间变化（如重新保存了相同内容）
+            self._signature = signature
+            return False
+        # callback 出错（如文件仍在写入）时不记录新状态，下次轮询重试
+        self.callback(self.path)
+        self._signature, self._digest = signature, digest
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def start(self, prime=True):
+        if prime:
+            self.prime()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+class LiveReloader:
+    """Excel文件变化时增量更新解析数据集，并通过 publish(event, data) 推送变化"""
+
+    def __init__(self, excel_file, api_key, publish, resolved_file=DEFAULT_RESOLVED_FILE,
+                 interval=DEFAULT_POLL_INTERVAL, log=print):
+        self.excel_file = excel_file
+        self.resolved_file = resolved_file
+        self.publish = publish
+        self.log = log
+        self.geocode_cache = GeocodeCache()
+        self.geocoder = lambda address: amap_geocode(address, api_key)
+        self.watcher = FileWatcher(excel_file, self._on_change, interval,
+                                   on_error=lambda e: log(f"处理数据文件变化失败，稍后重试: {e}"))
+        self.resolved = None
+        self.rollups = None
+        self.rollups_file = rollups_file_for(resolved_file)
+
+    def _load_initial(self):
+        """读取已有的解析数据集；不存在时完整解析一次"""
+        if os.path.exists(self.resolved_file):
+            return load_resolved_reports(self.resolved_file)
+        resolved = resolve_reports(read_reports(self.excel_file), self.geocoder,
+                                   self.geocode_cache)
+        save_resolved_reports(resolved, self.resolved_file)
+        return resolved
+
+    def _on_change(self, path):
+        df = read_reports(path)
+        resolved, delta = update_resolved(self.resolved, df, self.geocoder, self.geocode_cache)
+        if not any(delta.values()):
+            return
+        save_resolved_reports(resolved, self.resolved_file)
+        self.rollups.apply_delta(self.resolved, resolved, delta).save(self.rollups_file)
+        self.resolved = resolved
+
+        from report_api import build_delta
+        message = build_delta(resolved, delta)
+        message['timeline'] = self.rollups.to_page()
+        # 中位数、分位数不能增量更新，区县统计按当前数据集重新计算（一次分组）
+        message['districtStats'] = stats_table(district_stats(located_reports(resolved)))
+        self.publish('delta', message)
+        self.log(f"数据已更新: 新增 {len(delta['added'])} 条，"
+                 f"修改 {len(delta['updated'])} 条，删除 {len(delta['removed'])} 条")
+
+    def start(self):
+        self.resolved = self._load_initial()
+        self.watcher.prime()
+        # 数据集可能早于当前的Excel文件，先同步一次再开始监视
+        resolved, delta = update_resolved(self.resolved, read_reports(self.excel_file),
+                                          self.geocoder, self.geocode_cache)
+        if any(delta.values()):
+            save_resolved_reports(resolved, self.resolved_file)
+            self.resolved = resolved
+        # 启动时完整汇总一次，之后只按变化增量更新
+        self.rollups = TimeRollups.from_resolved(self.resolved)
+        self.rollups.save(self.rollups_file)
+        self.watcher.start(prime=False)
+
+    def stop(self):
+        self.watcher.stop()
+
+    @property
+    def running(self):
+        return self.watcher.running
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置
+应用日志记录器（SignalMapper 及其子记录器）只把日志记录放入队列，
+由后台线程中的 QueueListener 格式化并写入文件；日志文件按大小和时间轮转。
+消息使用 %-格式的参数，级别未启用时不会进行任何格式化。
+"""
+
+import atexit
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from project_paths import PROJECT_ROOT
+
+LOGGER_NAME = 'SignalMapper'
+DEFAULT_LOG_FILE = os.path.join(PROJECT_ROOT, 'data', 'signal_mapper.log')
+
+# 单个日志文件最大 5MB，或每天轮转一次，最多保留 5 个旧文件
+MAX_LOG_BYTES = 5 * 1024 * 1024
+ROTATE_INTERVAL = 24 * 60 * 60
+BACKUP_COUNT = 5
+
+LOG_FORMAT = '%(asctime)s | %(levelname)-8s | %(name)s | %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener = None
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """文件超过 max_bytes 或距上次轮转超过 interval 秒时轮转"""
+
+    def __init__(self, filename, max_bytes=MAX_LOG_BYTES, interval=ROTATE_INTERVAL,
+                 backup_count=BACKUP_COUNT, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.interval = interval
+        try:
+            started = os.path.getmtime(filename)
+        except OSError:
+            started = time.time()
+        self.rollover_at = started + interval
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class DeferredQueueHandler(QueueHandler):
+    """放入队列前不格式化消息，格式化工作全部在写日志的后台线程中完成
+
+    记录只在本进程内传递，无需像默认实现那样预先格式化以便序列化。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(log_file=DEFAULT_LOG_FILE, level=logging.INFO):
+    """配置应用日志记录器，返回该记录器；重复调用时直接返回"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+    file_handler = SizeAndTimeRotatingFileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    logger.setLevel(level)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    # 不再传给根记录器，避免第三方配置的处理器重复输出
+    logger.propagate = False
+    return logger
+
+
+def stop_logging():
+    """写完队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if isinstance(handler, DeferredQueueHandler):
+            logger.removeHandler(handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
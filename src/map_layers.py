@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地图分析图层
+把区域聚类、盲区识别、热点分析、信号插值、弱信号密度、可疑上报等分析结果整理为与渲染方式无关的图层描述
+（可直接序列化为JSON），folium 热力图和高德地图页面按同一份描述绘制。图层类型：
+- raster: 图片图层，image 为图片地址，bounds 为 [西, 南, 东, 北]
+- circles: 圆，items 为 [[经度, 纬度, 半径(米), 信号强度, 说明], ...]
+- polygons: 多边形，items 为 [{'path': [[经度, 纬度], ...], 'signal': 信号强度, 'label': 说明}, ...]，
+  可选的 'color' 指定颜色，否则按信号强度着色
+- lines: 折线，items 为 [{'path': [[经度, 纬度], ...], 'color': 颜色, 'label': 说明}, ...]
+数据量大时 folium 页面不内嵌图层，而是引用单独的图层文件（见 FoliumLayersLoader），由浏览器绘制。
+"""
+
+import json
+import os
+
+import folium
+from branca.element import MacroElement
+from jinja2 import Template
+
+from anomalies import detect_anomalies
+from blind_spots import detect_blind_spots
+from clustering import cluster_reports
+from density import density_contours, signal_density
+from hotspots import hotspot_cells
+from interpolation import signal_surface
+
+
+def signal_color(signal):
+    """信号强度对应的颜色，与地图页面的 getSignalColor 一致"""
+    if signal <= 2:
+        return '#dc3545'
+    if signal <= 4:
+        return '#fd7e14'
+    if signal <= 6:
+        return '#ffc107'
+    return '#28a745'
+
+
+def cluster_layer(summary):
+    """区域聚类结果（见 clustering.cluster_reports）对应的圆图层"""
+    items = []
+    for rank, row in enumerate(summary.itertuples(index=False), 1):
+        label = (f"区域 {rank}：{row.size} 个监测点，平均信号 {row.mean_signal:.1f}，"
+                 f"严重盲区 {row.severe} 个")
+        # 转为Python原生类型，便于JSON序列化
+        items.append([round(float(row.lng), 6), round(float(row.lat), 6),
+                      round(max(float(row.radius), 100.0)), round(float(row.mean_signal), 2), label])
+    return {'id': 'clusters', 'name': '区域信号强度分布', 'type': 'circles',
+            'visible': True, 'items': items}
+
+
+def blind_spot_layer(spots):
+    """盲区识别结果（见 blind_spots.detect_blind_spots）对应的多边形图层"""
+    items = []
+    for row in spots.itertuples(index=False):
+        label = (f"盲区 {row.area_id}：弱信号上报 {row.weak} 条（占 {row.weak_share:.0%}），"
+                 f"平均信号 {row.mean_signal:.1f}，面积约 {row.area_km2:.2f} km²")
+        items.append({'path': row.path, 'signal': round(float(row.mean_signal), 2), 'label': label})
+    return {'id': 'blind_spots', 'name': '信号盲区范围', 'type': 'polygons',
+            'visible': True, 'items': items}
+
+
+# 热点图层最多显示的格子数（按 |z| 取最显著的）
+MAX_HOTSPOT_CELLS = 2000
+# 热点颜色：(偏弱/偏强, 置信水平) -> 颜色
+HOTSPOT_COLORS = {(True, 0.99): '#922b21', (True, 0.95): '#e74c3c',
+                  (False, 0.99): '#1e8449', (False, 0.95): '#58d68d'}
+
+
+def hotspot_layer(cells):
+    """热点分析结果（见 hotspots.hotspot_cells）中显著的格子对应的多边形图层"""
+    significant = cells[cells['confidence'] > 0]
+    significant = significant.loc[significant['z'].abs().sort_values(ascending=False).index]
+    items = []
+    for row in significant.head(MAX_HOTSPOT_CELLS).itertuples(index=False):
+        weak = row.z < 0
+        label = (f"信号显著{'偏弱' if weak else '偏强'}（Gi* z = {row.z:.2f}，"
+                 f"{row.confidence:.0%} 置信）：{row.reports} 条上报，平均信号 {row.mean_signal:.1f}")
+        items.append({'path': row.path, 'signal': round(float(row.mean_signal), 2),
+                      'color': HOTSPOT_COLORS[(weak, row.confidence)], 'label': label})
+    return {'id': 'hotspots', 'name': '信号冷热点（Gi*）', 'type': 'polygons',
+            'visible': False, 'items': items}
+
+
+# 可疑上报图层最多显示的点数
+MAX_ANOMALY_POINTS = 2000
+
+
+def anomaly_layer(located, flags):
+    """可疑上报（见 anomalies.detect_anomalies）对应的圆图层"""
+    suspect = located[flags['anomaly'].to_numpy()].join(flags)
+    items = []
+    for row in suspect.head(MAX_ANOMALY_POINTS).itertuples(index=False):
+        if row.outside_area:
+            reason = '坐标不在服务区域内，可能是地理编码错误'
+        else:
+            reason = (f"附近 {row.neighbors} 条上报的信号中位数为 {row.local_median:g}"
+                      f"（稳健 z = {row.z:.1f}）")
+        label = f"可疑上报：{row.name}，信号强度 {row.signal}。{reason}，未计入热力和插值"
+        items.append([round(float(row.lng), 6), round(float(row.lat), 6), 30,
+                      int(row.signal), label])
+    return {'id': 'anomalies', 'name': f'可疑上报（{len(suspect)} 条）', 'type': 'circles',
+            'visible': False, 'items': items}
+
+
+def surface_layer(surface):
+    """信号插值结果（见 interpolation.SignalSurface）对应的图片图层"""
+    return {'id': 'idw', 'name': '信号预测（IDW插值）', 'type': 'raster', 'visible': False,
+            'image': surface.to_data_uri(), 'opacity': 0.7,
+            'bounds': [surface.west, surface.south, surface.east, surface.north]}
+
+
+def density_layer(surface):
+    """弱信号核密度（见 density.signal_density）对应的图片图层"""
+    return {'id': 'kde', 'name': '弱信号密度（KDE）', 'type': 'raster', 'visible': False,
+            'image': surface.to_data_uri(), 'opacity': 0.7,
+            'bounds': [surface.west, surface.south, surface.east, surface.north]}
+
+
+# 等值线颜色，由低到高
+CONTOUR_COLORS = ['#fd8d3c', '#e31a1c', '#800026']
+
+
+def contour_layer(contours):
+    """密度等值线（见 density.density_contours）对应的折线图层"""
+    items = []
+    for rank, (level, paths) in enumerate(contours):
+        color = CONTOUR_COLORS[min(rank, len(CONTOUR_COLORS) - 1)]
+        label = f"弱信号密度 {level:.0f}（加权上报数/平方公里）"
+        items.extend({'path': path, 'color': color, 'label': label} for path in paths)
+    return {'id': 'kde_contours', 'name': '弱信号密度等值线', 'type': 'lines',
+            'visible': False, 'items': items}
+
+
+def build_layers(located, exclude_anomalies=True, flags=None):
+    """由已定位的上报生成全部分析图层
+
+    exclude_anomalies=True 时可疑上报不参与信号插值和弱信号密度（全部可疑时仍使用全部上报）；
+    flags 为已算好的 detect_anomalies 结果，省略时在此计算。
+    """
+    if not len(located):
+        return []
+    _, summary = cluster_reports(located)
+    if flags is None:
+        flags = detect_anomalies(located)
+    clean = located
+    if exclude_anomalies and not flags['anomaly'].all():
+        clean = located[~flags['anomaly'].to_numpy()]
+    density = signal_density(clean)
+    return [cluster_layer(summary), blind_spot_layer(detect_blind_spots(located)),
+            hotspot_layer(hotspot_cells(located)), surface_layer(signal_surface(clean)),
+            density_layer(density), contour_layer(density_contours(density)),
+            anomaly_layer(located, flags)]
+
+
+def add_folium_layers(folium_map, layers):
+    """在 folium 地图上绘制图层，每个图层可在图层控件中开关"""
+    for layer in layers:
+        if layer['type'] == 'raster':
+            west, south, east, north = layer['bounds']
+            folium.raster_layers.ImageOverlay(
+                layer['image'], bounds=[[south, west], [north, east]], name=layer['name'],
+                opacity=layer.get('opacity', 0.7), show=layer['visible']).add_to(folium_map)
+            continue
+
+        group = folium.FeatureGroup(name=layer['name'], show=layer['visible'])
+        if layer['type'] == 'circles':
+            for lng, lat, radius, signal, label in layer['items']:
+                color = signal_color(signal)
+                folium.Circle([lat, lng], radius=radius, color=color, weight=2, fill=True,
+                              fill_color=color, fill_opacity=0.25, tooltip=label).add_to(group)
+        elif layer['type'] == 'polygons':
+            for item in layer['items']:
+                color = item.get('color') or signal_color(item['signal'])
+                folium.Polygon([[lat, lng] for lng, lat in item['path']], color=color, weight=2,
+                               fill=True, fill_color=color, fill_opacity=0.3,
+                               tooltip=item['label']).add_to(group)
+        elif layer['type'] == 'lines':
+            for item in layer['items']:
+                folium.PolyLine([[lat, lng] for lng, lat in item['path']], color=item['color'],
+                                weight=2, tooltip=item['label']).add_to(group)
+        group.add_to(folium_map)
+
+
+class FoliumLayersLoader(MacroElement):
+    """folium 页面加载后读取图层文件（write_layers_script 写出），按 add_folium_layers 的样式
+    绘制各图层并加入图层控件。图层不内嵌在页面中，页面保持轻量，图层文件可单独缓存。"""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            function signalColor(signal) {
+                return signal <= 2 ? '#dc3545' : signal <= 4 ? '#fd7e14' :
+                    signal <= 6 ? '#ffc107' : '#28a745';
+            }
+            function escapeHtml(text) {
+                return String(text).replace(/[&<>"']/g, function(c) {
+                    return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                });
+            }
+            function latLngs(path) {
+                return path.map(function(point) { return [point[1], point[0]]; });
+            }
+            function drawLayer(layer) {
+                if (layer.type === 'raster') {
+                    var b = layer.bounds;
+                    return L.imageOverlay(layer.image, [[b[1], b[0]], [b[3], b[2]]],
+                                          {opacity: layer.opacity || 0.7});
+                }
+                var group = L.featureGroup();
+                layer.items.forEach(function(item) {
+                    var shape, label, color;
+                    if (layer.type === 'circles') {
+                        color = signalColor(item[3]);
+                        label = item[4];
+                        shape = L.circle([item[1], item[0]], {radius: item[2], color: color,
+                            weight: 2, fillColor: color, fillOpacity: 0.25});
+                    } else if (layer.type === 'polygons') {
+                        color = item.color || signalColor(item.signal);
+                        label = item.label;
+                        shape = L.polygon(latLngs(item.path), {color: color, weight: 2,
+                            fillColor: color, fillOpacity: 0.3});
+                    } else {
+                        label = item.label;
+                        shape = L.polyline(latLngs(item.path), {color: item.color, weight: 2});
+                    }
+                    group.addLayer(shape.bindTooltip(escapeHtml(label)));
+                });
+                return group;
+            }
+            var script = document.createElement('script');
+            script.src = {{ this.layers_file|tojson }};
+            script.onload = function() {
+                analysisLayers.forEach(function(layer) {
+                    var drawn = drawLayer(layer);
+                    {{ this.control }}.addOverlay(drawn, layer.name);
+                    if (layer.visible) {
+                        drawn.addTo({{ this._parent.get_name() }});
+                    }
+                });
+            };
+            document.head.appendChild(script);
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, layers_file, control):
+        """layers_file 为图层文件相对页面的地址，control 为页面上的 folium.LayerControl"""
+        super().__init__()
+        self._name = 'FoliumLayersLoader'
+        self.layers_file = layers_file
+        self.control = control.get_name()
+
+
+def write_layers_script(layers, path, extra=None):
+    """写出定义 analysisLayers 的脚本文件，供地图页面加载（先写临时文件再替换）
+
+    extra 为 {变量名: 值}，每项另外定义为一个常量（如时间汇总 timelineRollups）。
+    """
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('// 分析图层\n')
+        for name, value in [('analysisLayers', layers), *(extra or {}).items()]:
+            # 转义 '</' 防止文本提前结束 <script> 标签
+            f.write(f'const {name} = ')
+            f.write(json.dumps(value, ensure_ascii=False).replace('</', '<\\/'))
+            f.write(';\n')
+    os.replace(tmp_file, path)
+    return path
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地图HTTP服务器
+多线程、支持HTTP/1.1长连接的静态文件服务器：
+- 根据 ETag / Last-Modified 处理条件请求，未变化的文件返回 304
+- 根据 Accept-Encoding 返回生成时写出的预压缩副本
+- 文件名带内容哈希的产物使用长期缓存
+- /api/ 下提供基于空间索引的上报数据查询接口（范围查询、附近查询）
+- /api/events 以 Server-Sent Events 推送数据变化
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+from email.utils import parsedate_to_datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from static_assets import COMPRESSIBLE_EXTENSIONS, choose_encoded_variant
+
+# 文件名中带内容哈希（如 map.3f2a9c1d7e4b.js）的产物内容不会变化，可长期缓存
+HASHED_NAME_PATTERN = re.compile(r'\.[0-9a-f]{12,}\.')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 其余文件每次使用前向服务器验证，未变化时只返回 304
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# 即使站点根目录设置不当也不对外提供的文件：隐藏文件和目录（.git、config 备份等）、
+# Python 源码（config.py 含API密钥）和 data 目录（原始数据、解析数据集）
+FORBIDDEN_SUFFIXES = ('.py', '.pyc')
+FORBIDDEN_DIRS = ('data',)
+
+# 事件流空闲时发送心跳的间隔（秒），及时发现已断开的连接
+SSE_HEARTBEAT_INTERVAL = 15
+# 每个订阅者最多积压的事件数，处理过慢的连接会被断开
+SSE_QUEUE_SIZE = 100
+
+
+def cache_control_for(path):
+    if HASHED_NAME_PATTERN.search(os.path.basename(path)):
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+def is_forbidden_path(url_path):
+    """请求路径是否指向不对外提供的文件"""
+    parts = [part for part in unquote(url_path).replace('\\', '/').split('/') if part]
+    if not parts:
+        return False
+    return (parts[0].lower() in FORBIDDEN_DIRS
+            or any(part.startswith('.') for part in parts)
+            or parts[-1].lower().endswith(FORBIDDEN_SUFFIXES))
+
+
+def make_etag(stat_result, encoding=None):
+    """由修改时间和大小生成强校验ETag，不同编码的副本使用不同的ETag"""
+    tag = f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+    if encoding:
+        tag += f"-{encoding}"
+    return f'"{tag}"'
+
+
+class EventBroker:
+    """事件广播：每个订阅者一个队列，publish 时发送给所有订阅者"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # 积压过多的连接直接断开，页面重连后会重新加载数据
+                self.unsubscribe(subscriber)
+                self._terminate(subscriber)
+
+    def close(self):
+        """通知所有订阅者结束"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            self._terminate(subscriber)
+
+    @staticmethod
+    def _terminate(subscriber):
+        """丢弃未发送的事件并放入结束标记"""
+        with subscriber.mutex:
+            subscriber.queue.clear()
+        subscriber.put_nowait(None)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+class MapRequestHandler(SimpleHTTPRequestHandler):
+    """静态文件请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # 访问日志交给服务器的日志回调处理（未设置时不输出）
+        log = getattr(self.server, 'log_callback', None)
+        if log:
+            log(f"{self.address_string()} - {format % args}")
+
+    def end_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        super().end_headers()
+
+    def do_GET(self):
+        try:
+            url = urlsplit(self.path)
+            if url.path == '/api/events':
+                self.stream_events()
+                return
+            if url.path.startswith('/api/'):
+                self.handle_api(url.path[len('/api/'):], dict(parse_qsl(url.query)))
+                return
+            super().do_GET()
+        except (ConnectionError, TimeoutError):
+            self.close_connection = True
+        except Exception as e:
+            self.send_error(500, f"Internal Server Error: {str(e)}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self):
+        """Server-Sent Events：保持连接，把 MapServer.events 上发布的事件推送给页面"""
+        broker = self.server.map_server.events
+        subscriber = broker.subscribe()
+        # 响应没有长度，结束后必须关闭连接
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(b'retry: 3000\n\n')
+            self.wfile.flush()
+
+            while True:
+                try:
+                    message = subscriber.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    self.wfile.write(b': ping\n\n')
+                    self.wfile.flush()
+                    continue
+                if message is None:
+                    break
+                event, data = message
+                payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+                self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (ConnectionError, TimeoutError):
+            pass
+        finally:
+            broker.unsubscribe(subscriber)
+
+    def handle_api(self, route, params):
+        """处理 /api/ 请求，数据源由 MapServer 的 reports_file 提供"""
+        source = getattr(self.server, 'report_source', None)
+        if source is None:
+            self.send_json(404, {'error': '服务器未加载上报数据'})
+            return
+        # 延迟导入，只提供静态文件时不加载数据处理模块
+        from report_api import handle_api
+        status, payload = handle_api(source, route, params)
+        self.send_json(status, payload)
+
+    def _not_modified(self, etag, mtime):
+        """根据条件请求头判断客户端缓存是否仍然有效"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match 优先于 If-Modified-Since
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError):
+                return False
+            if since is None:
+                return False
+            return int(mtime) <= since.timestamp()
+        return False
+
+    def send_head(self):
+        if is_forbidden_path(urlsplit(self.path).path):
+            self.send_error(404, "File not found")
+            return None
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path) or self.path.split('?', 1)[0].endswith('/'):
+            # 目录和不存在的文件交给默认实现处理
+            return super().send_head()
+
+        # 优先返回生成时写出的预压缩副本
+        variant, encoding = choose_encoded_variant(path, self.headers.get('Accept-Encoding'))
+        try:
+            f = open(variant, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            source_mtime = os.path.getmtime(path)
+            etag = make_etag(fs, encoding)
+            cache_control = cache_control_for(path)
+
+            if self._not_modified(etag, source_mtime):
+                f.close()
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', cache_control)
+                if path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                    self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return None
+
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Length', str(fs.st_size))
+            self.send_header('Last-Modified', self.date_time_string(source_mtime))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            if path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+
+class MapServer:
+    """在后台线程中运行的多线程HTTP服务器"""
+
+    def __init__(self, root, host='localhost', port=8888, handler_class=MapRequestHandler,
+                 log_callback=None, reports_file=None):
+        """reports_file 为解析数据集路径，提供后启用 /api/ 查询接口"""
+        self.root = os.path.abspath(root)
+        self.reports_file = reports_file
+        self.host = host
+        self.port = port
+        self.handler_class = handler_class
+        self.log_callback = log_callback
+        # 数据变化事件，通过 /api/events 推送给页面
+        self.events = EventBroker()
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _create_server(self):
+        handler = partial(self.handler_class, directory=self.root)
+        httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        # 请求线程不阻止进程退出
+        httpd.daemon_threads = True
+        httpd.log_callback = self.log_callback
+        httpd.map_server = self
+        httpd.report_source = None
+        if self.reports_file:
+            from report_api import ReportSource
+            httpd.report_source = ReportSource(self.reports_file)
+        return httpd
+
+    def start(self):
+        """启动服务器（非阻塞），端口被占用时抛出 OSError"""
+        self.httpd = self._create_server()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def serve_forever(self):
+        """在当前线程运行服务器，直到 stop() 或 KeyboardInterrupt"""
+        self.httpd = self._create_server()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def stop(self):
+        # 先结束事件流连接，否则这些请求线程会一直等待
+        self.events.close()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        self.thread = None
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目路径
+图形界面和命令行共用的默认文件位置（绝对路径，不受工作目录影响），
+本模块不导入任何第三方库。
+"""
+
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_EXCEL_FILE = os.path.join(PROJECT_ROOT, 'data', 'example_data.xlsx')
+# 站点根目录：HTTP服务器只提供该目录下的文件（地图网页及其数据文件）
+STATIC_DIR = os.path.join(PROJECT_ROOT, 'static')
+MAP_HTML_FILE = os.path.join(STATIC_DIR, 'signal_coverage_map.html')
+RESOLVED_REPORTS_FILE = os.path.join(PROJECT_ROOT, 'data', 'resolved_reports.parquet')
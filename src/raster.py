@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+栅格图像
+把规则网格上的数值着色并编码为PNG（只用标准库 zlib，不依赖图像处理库），
+供地图页面作为图片图层叠加显示。
+"""
+
+import base64
+import struct
+import zlib
+
+import numpy as np
+
+# 信号强度色带：差（红）→ 一般（黄）→ 好（绿）
+SIGNAL_COLOR_STOPS = [
+    (0.0, (231, 76, 60)),
+    (0.5, (241, 196, 15)),
+    (1.0, (39, 174, 96)),
+]
+
+# 密度色带：低（浅黄）→ 高（深红）
+DENSITY_COLOR_STOPS = [
+    (0.0, (255, 237, 160)),
+    (0.5, (253, 141, 60)),
+    (1.0, (189, 0, 38)),
+]
+
+
+def colorize(values, vmin, vmax, stops=SIGNAL_COLOR_STOPS, alpha=180):
+    """按色带把二维数组转为 RGBA 图像（uint8），NaN 为透明"""
+    values = np.asarray(values, dtype=float)
+    t = np.nan_to_num(np.clip((values - vmin) / (vmax - vmin), 0.0, 1.0))
+    positions = [stop[0] for stop in stops]
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.interp(t, positions, [stop[1][channel] for stop in stops])
+    rgba[..., 3] = np.where(np.isnan(values), 0, alpha)
+    return rgba
+
+
+def encode_png(rgba):
+    """把 (高, 宽, 4) 的 uint8 数组编码为 PNG，第 0 行在图像顶部"""
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    height, width = rgba.shape[:2]
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    # 每行前加过滤类型 0（不过滤）
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)])
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def png_data_uri(rgba):
+    return 'data:image/png;base64,' + base64.b64encode(encode_png(rgba)).decode('ascii')
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染缓存
+按内容寻址的输出缓存：以输入数据、地理编码结果、相关配置和生成器版本的哈希作为键，
+键未变化时直接复用已生成的文件；同时缓存地理编码结果，避免重复调用API。
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+try:
+    from config import DEFAULT_MAP_CENTER, MAP_CONFIG
+except ImportError:
+    DEFAULT_MAP_CENTER = {"latitude": 32.0307, "longitude": 120.8664, "zoom": 11}
+    MAP_CONFIG = {"style": "normal", "show_traffic": True, "show_buildings": True}
+try:
+    # 可疑上报的判断范围（见 anomalies），影响热力图、插值和可疑上报图层
+    from config import SERVICE_AREA
+except ImportError:
+    SERVICE_AREA = None
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+GEOCODE_CACHE_FILE = os.path.join(DATA_DIR, 'geocode_cache.json')
+MANIFEST_NAME = '.render_cache.json'
+# 数据文件和图层文件名中缓存键的长度（如 map.data.3f2a9c1d7e4b.js），
+# 内容变化时文件名随之变化，服务器对这类文件使用长期缓存
+ARTIFACT_HASH_LENGTH = 12
+# 清单中记录产物输入键的条目前缀（见 RenderCache.record_input）
+INPUT_ENTRY_PREFIX = 'input:'
+
+
+def hash_rows(df):
+    """计算DataFrame内容的哈希（包含列名，不包含索引）"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns], ensure_ascii=False).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def hash_json(value):
+    """计算可JSON序列化对象的稳定哈希"""
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def config_fingerprint():
+    """与渲染结果相关的配置项"""
+    return {'DEFAULT_MAP_CENTER': DEFAULT_MAP_CENTER, 'MAP_CONFIG': MAP_CONFIG,
+            'SERVICE_AREA': SERVICE_AREA}
+
+
+def cache_key(*parts):
+    """将多个哈希/取值组合为一个缓存键"""
+    return hash_json(list(parts))
+
+
+def artifact_file(output_file, kind, key):
+    """页面引用的数据文件（kind='data'）或图层文件（kind='layers'）路径，文件名带缓存键"""
+    return f"{os.path.splitext(output_file)[0]}.{kind}.{key[:ARTIFACT_HASH_LENGTH]}.js"
+
+
+def remove_stale_artifacts(output_file, keep):
+    """删除页面以前引用的数据文件和图层文件（含压缩副本和不带哈希的旧文件名），
+    返回删除的产物文件名（不含压缩副本的后缀）"""
+    stem = os.path.basename(os.path.splitext(output_file)[0])
+    pattern = re.compile(re.escape(stem) + r'\.(?:data|layers)(?:\.[0-9a-f]{%d})?\.js'
+                         % ARTIFACT_HASH_LENGTH)
+    directory = os.path.dirname(output_file) or '.'
+    keep = {os.path.basename(path) for path in keep}
+    removed = set()
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match and match.group(0) not in keep and name[match.end():] in ('', '.gz', '.br'):
+            os.remove(os.path.join(directory, name))
+            removed.add(match.group(0))
+    return sorted(removed)
+
+
+class GeocodeCache:
+    """地址 -> [经度, 纬度, 精度级别] 的持久化缓存，只缓存成功的结果"""
+
+    def __init__(self, cache_file=GEOCODE_CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, address):
+        """返回 (经度, 纬度)，未缓存时返回 None"""
+        detail = self.get_detail(address)
+        return detail[:2] if detail else None
+
+    def get_detail(self, address):
+        """返回 (经度, 纬度, 精度级别)，未缓存时返回 None"""
+        entry = self.entries.get(str(address))
+        if not entry:
+            return None
+        return entry[0], entry[1], entry[2] if len(entry) > 2 else None
+
+    def set(self, address, lng, lat, level=None):
+        self.entries[str(address)] = [lng, lat, level]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_file = self.cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+        self.dirty = False
+
+
+class RenderCache:
+    """记录输出目录中每个产物对应的缓存键"""
+
+    def __init__(self, output_dir):
+        self.manifest_file = os.path.join(output_dir or '.', MANIFEST_NAME)
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def is_fresh(self, artifact, key):
+        """产物存在且缓存键一致时返回 True"""
+        return (os.path.exists(artifact)
+                and self.manifest.get(os.path.basename(artifact)) == key)
+
+    def is_fresh_input(self, artifact, input_key):
+        """artifact 及其引用的产物都存在，且上次由同样的输入生成时返回 True
+
+        用于在读取和解析输入之前判断能否直接复用，input_key 通常由输入文件的摘要得到。
+        """
+        entry = self.manifest.get(INPUT_ENTRY_PREFIX + os.path.basename(artifact))
+        if not entry or entry[0] != input_key or not os.path.exists(artifact):
+            return False
+        directory = os.path.dirname(self.manifest_file)
+        return all(os.path.exists(os.path.join(directory, name)) for name in entry[1])
+
+    def record_input(self, artifact, input_key, dependencies=()):
+        """记录 artifact 由 input_key 对应的输入生成，dependencies 为它引用的其他产物"""
+        self.manifest[INPUT_ENTRY_PREFIX + os.path.basename(artifact)] = [
+            input_key, [os.path.basename(path) for path in dependencies]]
+        self._save()
+
+    def record(self, artifact, key):
+        self.manifest[os.path.basename(artifact)] = key
+        self._save()
+
+    def forget(self, artifacts):
+        """移除已删除产物的记录"""
+        names = {os.path.basename(artifact) for artifact in artifacts} & self.manifest.keys()
+        for name in names:
+            del self.manifest[name]
+        if names:
+            self._save()
+
+    def _save(self):
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.manifest_file)
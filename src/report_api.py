@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上报数据查询接口
+在内存中加载解析数据集并建立空间索引，为本地服务器的 /api/ 接口
+提供按可视范围、网络类型、信号强度筛选的分页查询，以及按距离的附近查询
+（如"某基站周围 200 米内的上报"）。
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from spatial_index import GeoIndex
+
+# 每页默认/最大返回的点数
+DEFAULT_PAGE_SIZE = 2000
+MAX_PAGE_SIZE = 10000
+
+# 缩放级别低于该值且点数超过一页时，按网格聚合返回
+DETAIL_ZOOM = 13
+
+# /api/nearby 默认/最大查询半径（米）
+DEFAULT_RADIUS = 200
+MAX_RADIUS = 5000
+
+# /api/points 返回的点字段
+POINT_FIELDS = ['id', 'lng', 'lat', 'signal', 'network', 'name', 'address', 'time',
+                'reporter', 'note']
+
+
+class ApiError(Exception):
+    """接口参数错误，status 为HTTP状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_bbox(value):
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(','))
+    except (AttributeError, ValueError):
+        raise ApiError("bbox 格式应为 min_lng,min_lat,max_lng,max_lat")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ApiError("bbox 范围无效")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _parse_float(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ApiError(f"缺少参数 {name}")
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ApiError(f"参数 {name} 应为数字")
+    if not np.isfinite(value):
+        raise ApiError(f"参数 {name} 无效")
+    return value
+
+
+def _parse_int(params, name, default, minimum=None, maximum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(float(value))
+    except (ValueError, OverflowError):
+        raise ApiError(f"参数 {name} 应为数字")
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+class ReportStore:
+    """内存中的上报数据及其空间索引"""
+
+    def __init__(self, located):
+        """located 为只包含成功定位记录的解析数据集"""
+        located = located.reset_index(drop=True)
+        self.columns = {
+            'id': np.asarray(located['report_id'].astype(str)),
+            'lng': located['lng'].to_numpy(dtype=float),
+            'lat': located['lat'].to_numpy(dtype=float),
+            'signal': located['signal'].to_numpy(dtype=int),
+            'network': np.asarray(located['network'].astype(str)),
+            'name': np.asarray(located['name'].astype(str)),
+            'address': np.asarray(located['address'].astype(str)),
+            'time': np.asarray(located['time'].astype(str)),
+            'reporter': np.asarray(located['reporter'].astype(str)),
+            'note': np.asarray(located['note'].astype(str)),
+        }
+        self.index = GeoIndex(self.columns['lng'], self.columns['lat'])
+        self.row_by_id = {report_id: i for i, report_id in enumerate(self.columns['id'])}
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    @classmethod
+    def from_file(cls, path):
+        from resolved_reports import load_resolved_reports, located_reports
+        return cls(located_reports(load_resolved_reports(path)))
+
+    def stats(self):
+        """整体统计信息和数据范围"""
+        total = len(self)
+        signal = self.columns['signal']
+        stats = {
+            'total': total,
+            'severe': int((signal <= 2).sum()),
+            'avg_signal': float(signal.mean()) if total else 0,
+            'g5_coverage': float((self.columns['network'] == '5G').mean() * 100) if total else 0,
+            'networks': sorted(set(self.columns['network'].tolist())),
+            'bounds': None
+        }
+        if total:
+            stats['bounds'] = [float(self.columns['lng'].min()), float(self.columns['lat'].min()),
+                               float(self.columns['lng'].max()), float(self.columns['lat'].max())]
+        return stats
+
+    def _filter(self, params):
+        if params.get('bbox'):
+            idx = self.index.query_bbox(*_parse_bbox(params['bbox']))
+        else:
+            idx = np.arange(len(self))
+        return idx[self._match(idx, params)]
+
+    def _match(self, idx, params):
+        """idx 中满足网络类型、信号强度条件的点"""
+        match = np.ones(len(idx), dtype=bool)
+        networks = [n for n in (params.get('network') or '').split(',') if n]
+        if networks:
+            match &= np.isin(self.columns['network'][idx], networks)
+        max_signal = _parse_int(params, 'max_signal', None)
+        if max_signal is not None:
+            match &= self.columns['signal'][idx] <= max_signal
+        min_signal = _parse_int(params, 'min_signal', None)
+        if min_signal is not None:
+            match &= self.columns['signal'][idx] >= min_signal
+        return match
+
+    def _clusters(self, idx, zoom):
+        """按与缩放级别相适应的网格聚合：[经度, 纬度, 点数, 平均信号, 最低信号]"""
+        cell = 360.0 / (2 ** zoom) / 4
+        lng, lat, signal = (self.columns[c][idx] for c in ('lng', 'lat', 'signal'))
+        keys = np.floor(lng / cell).astype(np.int64) * 1000003 + np.floor(lat / cell).astype(np.int64)
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+        def sums(values):
+            return np.bincount(inverse, weights=values)
+
+        min_signal = np.full(len(counts), np.iinfo(np.int64).max)
+        np.minimum.at(min_signal, inverse, signal)
+        return [list(row) for row in zip(
+            np.round(sums(lng) / counts, 6).tolist(), np.round(sums(lat) / counts, 6).tolist(),
+            counts.tolist(), np.round(sums(signal) / counts, 2).tolist(), min_signal.tolist()
+        )]
+
+    def query_points(self, params):
+        """按范围和条件查询点，返回可JSON序列化的结果"""
+        idx = self._filter(params)
+        total = len(idx)
+        page_size = _parse_int(params, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        zoom = _parse_int(params, 'zoom', None, 0, 22)
+
+        if zoom is not None and zoom < DETAIL_ZOOM and total > page_size:
+            return {
+                'mode': 'clusters',
+                'total': total,
+                'fields': ['lng', 'lat', 'count', 'avg_signal', 'min_signal'],
+                'clusters': self._clusters(idx, zoom)
+            }
+
+        pages = max(1, -(-total // page_size))
+        page = _parse_int(params, 'page', 1, 1, pages)
+        selected = idx[(page - 1) * page_size:page * page_size]
+        return {
+            'mode': 'points',
+            'total': total,
+            'page': page,
+            'pages': pages,
+            'page_size': page_size,
+            'fields': POINT_FIELDS,
+            'points': [list(row) for row in zip(*(self.columns[f][selected].tolist()
+                                                  for f in POINT_FIELDS))]
+        }
+
+    def query_nearby(self, params):
+        """查询 (lng, lat) 附近的点，按距离升序
+
+        默认返回 radius 米内满足条件的全部点（最多一页），指定 k 时只取其中最近的 k 个，
+        同时给出这些点的点数、严重盲区数和平均信号。
+        """
+        lng = _parse_float(params, 'lng')
+        lat = _parse_float(params, 'lat')
+        radius = _parse_float(params, 'radius', DEFAULT_RADIUS)
+        if not 0 < radius <= MAX_RADIUS:
+            raise ApiError(f"radius 应在 0 到 {MAX_RADIUS} 米之间")
+        k = _parse_int(params, 'k', None, 1, MAX_PAGE_SIZE)
+
+        dist, idx = self.index.query_radius(lng, lat, radius)
+        match = self._match(idx, params)
+        # 先筛选再取最近的 k 个，保证返回的是满足条件的最近点
+        dist, idx = dist[match][:k], idx[match][:k]
+
+        signal = self.columns['signal'][idx]
+        page_size = _parse_int(params, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        selected = slice(0, page_size)
+        columns = [self.columns[f][idx[selected]].tolist() for f in POINT_FIELDS]
+        columns.append(np.round(dist[selected], 1).tolist())
+        return {
+            'mode': 'nearby',
+            'center': [lng, lat],
+            'radius': radius,
+            'total': len(idx),
+            'severe': int((signal <= 2).sum()),
+            'avg_signal': round(float(signal.mean()), 2) if len(idx) else 0,
+            'fields': POINT_FIELDS + ['distance'],
+            'points': [list(row) for row in zip(*columns)]
+        }
+
+    def get_report(self, report_id):
+        row = self.row_by_id.get(report_id)
+        if row is None:
+            raise ApiError("未找到该上报记录", status=404)
+        return {f: self.columns[f][row:row + 1].tolist()[0] for f in POINT_FIELDS}
+
+
+class ReportSource:
+    """按需加载解析数据集，文件更新后自动重新加载"""
+
+    def __init__(self, path):
+        self.path = path
+        self._store = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            raise ApiError("解析数据集不存在，请先生成地图", status=404)
+        with self._lock:
+            if self._store is None or mtime != self._mtime:
+                self._store = ReportStore.from_file(self.path)
+                self._mtime = mtime
+            return self._store
+
+
+def build_delta(resolved, delta):
+    """将数据集的变化转换为推送给页面的消息
+
+    delta 为 update_resolved 返回的 report_id 列表；修改后无法定位的记录按删除处理。
+    """
+    from resolved_reports import located_reports
+    located = located_reports(resolved)
+    changed = located[located['report_id'].isin(delta['added'] + delta['updated'])]
+    columns = ReportStore(changed).columns
+    points = {row[0]: list(row) for row in zip(*(columns[f].tolist() for f in POINT_FIELDS))}
+
+    return {
+        'fields': POINT_FIELDS,
+        'added': [points[i] for i in delta['added'] if i in points],
+        'updated': [points[i] for i in delta['updated'] if i in points],
+        'removed': delta['removed'] + [i for i in delta['updated'] if i not in points],
+        'stats': ReportStore(located).stats()
+    }
+
+
+def handle_api(source, route, params):
+    """处理 /api/ 请求，返回 (状态码, 结果)"""
+    try:
+        store = source.get()
+        if route == 'points':
+            return 200, store.query_points(params)
+        if route == 'nearby':
+            return 200, store.query_nearby(params)
+        if route == 'stats':
+            return 200, store.stats()
+        if route == 'report':
+            return 200, store.get_report(params.get('id', ''))
+        raise ApiError("未知的接口", status=404)
+    except ApiError as e:
+        return e.status, {'error': str(e)}
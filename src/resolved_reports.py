@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已解析上报数据集
+读取Excel、规范化字段并完成地理编码，结果保存为列式文件（Parquet），
+各地图生成器直接读取该数据集，新增输出格式无需再次调用地理编码API。
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+import pandas as pd
+import requests
+
+from render_cache import DATA_DIR, GeocodeCache
+
+logger = logging.getLogger('SignalMapper.geocode')
+
+DEFAULT_RESOLVED_FILE = os.path.join(DATA_DIR, 'resolved_reports.parquet')
+
+# Excel列名 -> 数据集列名
+COLUMN_MAP = {
+    '位置描述': 'name',
+    '详细地址': 'address',
+    '网络类型': 'network',
+    '信号强度': 'signal',
+    '上报时间': 'time',
+    '上报人': 'reporter',
+    '备注': 'note'
+}
+REQUIRED_COLUMNS = ['位置描述', '详细地址', '网络类型', '信号强度']
+# 可选的坐标列：数据自带坐标（如模拟数据）时直接使用，不再地理编码
+COORDINATE_COLUMNS = {'经度': 'lng', '纬度': 'lat'}
+TEXT_FIELDS = ['name', 'address', 'network', 'time', 'reporter', 'note']
+
+# 数据集的列：report_id 标识同一条上报，row_hash 标识上报内容
+RESOLVED_COLUMNS = ['report_id', 'row_hash'] + list(COLUMN_MAP.values()) + \
+    ['lng', 'lat', 'geocode_status', 'geocode_level']
+
+# 地理编码状态
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_NO_ADDRESS = 'no_address'
+STATUS_INVALID = 'invalid_signal'
+# 使用数据自带坐标时的精度级别
+LEVEL_PROVIDED = 'provided'
+
+
+def amap_geocode(address, api_key, timeout=10):
+    """调用高德地理编码API，返回 (经度, 纬度, 精度级别)，失败时返回 None"""
+    params = {'key': api_key, 'address': address, 'output': 'json'}
+    try:
+        response = requests.get("https://restapi.amap.com/v3/geocode/geo",
+                                params=params, timeout=timeout)
+        data = response.json()
+        if data.get('status') == '1' and data.get('geocodes'):
+            geocode = data['geocodes'][0]
+            lng, lat = map(float, geocode['location'].split(','))
+            level = geocode.get('level')
+            return lng, lat, level if isinstance(level, str) else None
+        print(f"地理编码失败: {address} - {data.get('info', '未知错误')}")
+    except Exception as e:
+        print(f"地理编码异常: {address} - {str(e)}")
+    return None
+
+
+def _row_digest(frame, columns):
+    joined = frame[columns].astype(str).fillna('').agg('\x1f'.join, axis=1)
+    return joined.map(lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest()[:16])
+
+
+def normalize_reports(df):
+    """将Excel数据规范化为数据集的字段（尚未地理编码）"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Excel文件缺少必要的列: {missing}")
+
+    frame = pd.DataFrame(index=df.index)
+    for source, target in COLUMN_MAP.items():
+        frame[target] = df[source] if source in df.columns else None
+
+    for field in TEXT_FIELDS:
+        values = frame[field].astype(object)
+        frame[field] = values.where(values.notna(), '').astype(str).str.strip()
+    frame['signal'] = pd.to_numeric(frame['signal'], errors='coerce')
+
+    has_coordinates = all(col in df.columns for col in COORDINATE_COLUMNS)
+    for source, target in COORDINATE_COLUMNS.items():
+        frame[target] = pd.to_numeric(df[source], errors='coerce') if has_coordinates else float('nan')
+
+    report_id = _row_digest(frame, ['name', 'address', 'time', 'reporter'])
+    # 完全相同的重复上报按出现顺序编号，保证 report_id 唯一
+    occurrence = report_id.groupby(report_id).cumcount()
+    frame['report_id'] = report_id.where(occurrence == 0,
+                                         report_id + '-' + occurrence.astype(str))
+    hash_fields = TEXT_FIELDS + ['signal'] + (['lng', 'lat'] if has_coordinates else [])
+    frame['row_hash'] = _row_digest(frame, hash_fields)
+    return frame.reset_index(drop=True)
+
+
+def resolve_reports(df, geocoder, geocode_cache=None, delay=0.1, progress=None):
+    """规范化并地理编码，返回包含 RESOLVED_COLUMNS 的数据集
+
+    自带坐标（经度、纬度列）的行直接使用该坐标；
+    其余每个不同的地址只解析一次，优先使用 geocode_cache；
+    geocoder(address) 返回 (经度, 纬度, 精度级别) 或 None。
+    progress(已完成, 总数, 说明) 在每个地址处理后调用，可抛出异常以中止处理。
+    """
+    return geocode_reports(normalize_reports(df), geocoder, geocode_cache, delay, progress)
+
+
+def geocode_reports(frame, geocoder, geocode_cache=None, delay=0.1, progress=None):
+    """对规范化后的记录进行地理编码"""
+    frame = frame.copy()
+    provided = frame['lng'].notna() & frame['lat'].notna()
+    # 优先使用详细地址，没有时使用位置描述
+    query = frame['address'].where(frame['address'] != '', frame['name'])
+    unique_addresses = [a for a in dict.fromkeys(query[~provided]) if a]
+    print(f"正在进行地理编码（{len(unique_addresses)} 个地址）...")
+
+    resolved = {}
+    try:
+        for index, address in enumerate(unique_addresses):
+            if progress:
+                progress(index, len(unique_addresses), '地理编码')
+            cached = geocode_cache.get_detail(address) if geocode_cache else None
+            if cached:
+                resolved[address] = cached
+                continue
+
+            logger.debug("处理第 %d/%d 个地址: %s", index + 1, len(unique_addresses), address)
+            result = geocoder(address)
+            if result is None:
+                continue
+            resolved[address] = result
+            if geocode_cache:
+                geocode_cache.set(address, *result)
+
+            # 避免API调用过快
+            time.sleep(delay)
+    finally:
+        # 中途取消时也保留已经解析的地址
+        if geocode_cache:
+            geocode_cache.save()
+
+    located = query[~provided].map(resolved)
+    frame.loc[~provided, 'lng'] = located.map(lambda r: r[0] if isinstance(r, tuple) else None).astype(float)
+    frame.loc[~provided, 'lat'] = located.map(lambda r: r[1] if isinstance(r, tuple) else None).astype(float)
+    level = located.map(lambda r: r[2] if isinstance(r, tuple) else None).reindex(frame.index)
+    frame['geocode_level'] = level.astype(object).where(~provided, LEVEL_PROVIDED)
+
+    frame['geocode_status'] = STATUS_OK
+    frame.loc[frame['lng'].isna(), 'geocode_status'] = STATUS_FAILED
+    frame.loc[(query == '') & ~provided, 'geocode_status'] = STATUS_NO_ADDRESS
+    frame.loc[frame['signal'].isna(), 'geocode_status'] = STATUS_INVALID
+    return frame[RESOLVED_COLUMNS]
+
+
+def update_resolved(previous, df, geocoder, geocode_cache=None, progress=None):
+    """增量更新解析数据集，只对新增和内容有变化的行进行地理编码
+
+    返回 (新数据集, 变化)，变化为 {'added': [...], 'updated': [...], 'removed': [...]}，
+    其中是各类变化对应的 report_id。
+    """
+    frame = normalize_reports(df)
+    previous_hash = dict(zip(previous['report_id'], previous['row_hash']))
+    changed_mask = frame['report_id'].map(previous_hash) != frame['row_hash']
+    changed = frame[changed_mask]
+
+    if len(changed):
+        changed = geocode_reports(changed, geocoder, geocode_cache, progress=progress)
+    kept = previous[previous['report_id'].isin(frame.loc[~changed_mask, 'report_id'])]
+    updated = pd.concat([kept, changed], ignore_index=True)
+    updated = updated.set_index('report_id').loc[frame['report_id']].reset_index()
+
+    changed_ids = changed['report_id'].tolist()
+    new_ids = set(frame['report_id'])
+    delta = {
+        'added': [i for i in changed_ids if i not in previous_hash],
+        'updated': [i for i in changed_ids if i in previous_hash],
+        'removed': [i for i in previous['report_id'] if i not in new_ids]
+    }
+    return updated[RESOLVED_COLUMNS], delta
+
+
+def is_resolved(df):
+    """判断 df 是否已是解析后的数据集"""
+    return all(col in df.columns for col in ('lng', 'lat', 'geocode_status'))
+
+
+def located_reports(resolved):
+    """只保留成功定位的记录"""
+    located = resolved[resolved['geocode_status'] == STATUS_OK].copy()
+    located['signal'] = located['signal'].astype(int)
+    return located
+
+
+def parse_report_times(values):
+    """把上报时间文本解析为时间，无法解析或为空的记录为 NaT
+
+    常见的 ISO 格式（2024-01-26 03:25、2024/1/5 3:05 等）一次向量化解析，
+    其余非空文本再逐条按各种格式尝试。
+    """
+    text = pd.Series(values).astype(object)
+    times = pd.to_datetime(text, errors='coerce', format='ISO8601')
+    retry = times.isna() & text.notna() & (text.astype(str).str.strip() != '')
+    if retry.any():
+        times[retry] = pd.to_datetime(text[retry], errors='coerce', format='mixed')
+    return times
+
+
+def save_resolved_reports(resolved, path=DEFAULT_RESOLVED_FILE):
+    """保存为Parquet文件（先写临时文件再替换）"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_file = path + '.tmp'
+    resolved.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, path)
+    return path
+
+
+def load_resolved_reports(path=DEFAULT_RESOLVED_FILE):
+    return pd.read_parquet(path)
+
+
+def read_reports(path):
+    """按扩展名读取原始上报数据（.xlsx / .csv / .parquet）"""
+    lower = str(path).lower()
+    if lower.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if lower.endswith('.csv'):
+        return pd.read_csv(path, encoding='utf-8-sig')
+    return pd.read_excel(path)
+
+
+def resolve_excel(excel_file, api_key, output_file=None, progress=None):
+    """读取Excel（或CSV、未解析的Parquet）并解析后返回，指定 output_file 时同时保存数据集"""
+    df = read_reports(excel_file)
+    print(f"成功读取 {len(df)} 条记录")
+    resolved = resolve_reports(df, lambda address: amap_geocode(address, api_key),
+                               GeocodeCache(), progress=progress)
+    if output_file:
+        save_resolved_reports(resolved, output_file)
+        print(f"已保存解析数据集: {output_file}")
+    return resolved
+
+
+def load_reports(source, api_key, progress=None, resolved_file=None):
+    """加载数据源：解析数据集（.parquet）直接读取，Excel文件则解析
+
+    只有指定 resolved_file 时才保存Excel的解析结果：DEFAULT_RESOLVED_FILE 是
+    /api/ 接口和实时更新使用的数据集，生成一次性的地图不应覆盖它。
+    """
+    if isinstance(source, pd.DataFrame):
+        if is_resolved(source):
+            return source
+        return resolve_reports(source, lambda address: amap_geocode(address, api_key),
+                               GeocodeCache(), progress=progress)
+    if str(source).lower().endswith('.parquet'):
+        resolved = load_resolved_reports(source)
+        if is_resolved(resolved):
+            return resolved
+    return resolve_excel(source, api_key, output_file=resolved_file, progress=progress)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按时间汇总
+把上报按 (时间段, 区县, 网络类型) 汇总为上报数、信号总和、严重盲区数，
+时间段分小时、天、周（周一开始）三种粒度。
+汇总量都是可加的：新增上报只需把它们的汇总加上去，删除（或修改前）的上报减掉，
+不必重新处理全部历史数据；"最近7天"、按天播放等视图直接由汇总表得到。
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from districts import assign_districts, district_center
+from resolved_reports import located_reports, parse_report_times
+
+# 时间粒度
+GRANULARITIES = ('hour', 'day', 'week')
+# 严重盲区：信号强度不高于该值
+SEVERE_SIGNAL = 2
+# 没有填写网络类型时的名称
+UNKNOWN_NETWORK = '未知'
+
+ROLLUP_KEYS = ['granularity', 'bucket', 'district', 'network']
+ROLLUP_VALUES = ['count', 'signal_sum', 'severe']
+ROLLUP_COLUMNS = ROLLUP_KEYS + ROLLUP_VALUES
+
+# 页面显示各时间段时的格式
+BUCKET_FORMATS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'week': '%Y-%m-%d'}
+
+
+def rollups_file_for(resolved_file):
+    """解析数据集对应的汇总文件路径"""
+    return os.path.splitext(resolved_file)[0] + '.rollups.parquet'
+
+
+def bucket_starts(times, granularity):
+    """各时间所在时间段的起点"""
+    if granularity == 'hour':
+        return times.dt.floor('h')
+    day = times.dt.floor('D')
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - pd.to_timedelta(day.dt.weekday, unit='D')
+    raise ValueError(f"不支持的时间粒度: {granularity}")
+
+
+def report_networks(reports):
+    """各上报的网络类型，未填写的为 UNKNOWN_NETWORK"""
+    network = reports['network'].to_numpy(dtype=object)
+    network[pd.isna(network) | (network == '')] = UNKNOWN_NETWORK
+    return network
+
+
+def _empty_rollups():
+    frame = pd.DataFrame({column: pd.Series(dtype=object) for column in ROLLUP_KEYS})
+    frame['bucket'] = pd.Series(dtype='datetime64[ns]')
+    for column in ROLLUP_VALUES:
+        frame[column] = pd.Series(dtype=np.int64)
+    return frame
+
+
+def report_rollups(located):
+    """一批已定位上报的各粒度汇总，上报时间无法解析的上报不计入"""
+    if not len(located):
+        return _empty_rollups()
+    times = parse_report_times(located['time'].to_numpy()).reset_index(drop=True)
+    signal = located['signal'].to_numpy(dtype=np.int64)
+    base = pd.DataFrame({
+        'time': times,
+        'district': assign_districts(located),
+        'network': report_networks(located),
+        'signal': signal,
+        'severe': (signal <= SEVERE_SIGNAL).astype(np.int64),
+    })
+    base = base[base['time'].notna()]
+    if not len(base):
+        return _empty_rollups()
+
+    parts = []
+    for granularity in GRANULARITIES:
+        grouped = base.assign(bucket=bucket_starts(base['time'], granularity)).groupby(
+            ['bucket', 'district', 'network']).agg(
+            count=('signal', 'size'), signal_sum=('signal', 'sum'), severe=('severe', 'sum'))
+        parts.append(grouped.reset_index().assign(granularity=granularity))
+    return pd.concat(parts, ignore_index=True)[ROLLUP_COLUMNS]
+
+
+class TimeRollups:
+    """(粒度, 时间段, 区县, 网络类型) → (上报数, 信号总和, 严重盲区数) 的汇总表"""
+
+    def __init__(self, frame=None):
+        self.frame = _empty_rollups() if frame is None else frame
+
+    @classmethod
+    def from_reports(cls, located):
+        return cls(report_rollups(located))
+
+    @classmethod
+    def from_resolved(cls, resolved):
+        return cls.from_reports(located_reports(resolved))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def apply(self, added=None, removed=None):
+        """加上 added、减去 removed 两批已定位上报的汇总，只处理这两批上报"""
+        parts = [self.frame]
+        if added is not None and len(added):
+            parts.append(report_rollups(added))
+        if removed is not None and len(removed):
+            negated = report_rollups(removed)
+            negated[ROLLUP_VALUES] = -negated[ROLLUP_VALUES]
+            parts.append(negated)
+        if len(parts) == 1:
+            return self
+        merged = pd.concat(parts, ignore_index=True).groupby(ROLLUP_KEYS, as_index=False)[
+            ROLLUP_VALUES].sum()
+        self.frame = merged[merged['count'] > 0].reset_index(drop=True)[ROLLUP_COLUMNS]
+        return self
+
+    def apply_delta(self, previous, current, delta):
+        """按 update_resolved 返回的变化更新：修改前和已删除的记录减掉，新增和修改后的记录加上"""
+        stale = delta['updated'] + delta['removed']
+        fresh = delta['added'] + delta['updated']
+        before = located_reports(previous) if previous is not None else None
+        after = located_reports(current)
+        return self.apply(
+            added=after[after['report_id'].isin(fresh)],
+            removed=before[before['report_id'].isin(stale)] if before is not None else None)
+
+    def query(self, granularity='day', start=None, end=None, by=('district', 'network')):
+        """[start, end) 内各时间段按 by 汇总，增加平均信号和严重盲区占比"""
+        rows = self.frame[self.frame['granularity'] == granularity]
+        if start is not None:
+            rows = rows[rows['bucket'] >= pd.Timestamp(start)]
+        if end is not None:
+            rows = rows[rows['bucket'] < pd.Timestamp(end)]
+        return _summarize(rows, ['bucket', *by])
+
+    def last_days(self, days=7, by=('district', 'network'), end=None):
+        """最近 days 天的汇总（不分时间段），截至 end 所在的一天，默认截至数据中最晚的一天"""
+        rows = self.frame[self.frame['granularity'] == 'day']
+        if not len(rows):
+            return _summarize(rows, list(by))
+        last = rows['bucket'].max() if end is None else pd.Timestamp(end).floor('D')
+        first = last - pd.Timedelta(days=days - 1)
+        rows = rows[(rows['bucket'] >= first) & (rows['bucket'] <= last)]
+        return _summarize(rows, list(by))
+
+    def to_page(self, granularity='day'):
+        """页面使用的紧凑格式：时间段、区县、网络类型各列一次，rows 中以下标引用
+
+        rows 每行为 [时间段下标, 区县下标, 网络类型下标, 上报数, 信号总和, 严重盲区数]，
+        districts 每项为 [名称, 中心经度, 中心纬度]（未知区县的中心为 null）。
+        """
+        rows = self.frame[self.frame['granularity'] == granularity]
+        bucket_codes, buckets = pd.factorize(rows['bucket'], sort=True)
+        district_codes, districts = pd.factorize(rows['district'], sort=True)
+        network_codes, networks = pd.factorize(rows['network'], sort=True)
+        table = np.column_stack([bucket_codes, district_codes, network_codes,
+                                 rows[ROLLUP_VALUES].to_numpy(dtype=np.int64)])
+        return {
+            'granularity': granularity,
+            'buckets': [b.strftime(BUCKET_FORMATS[granularity]) for b in buckets],
+            'districts': [[name, *(district_center(name) or (None, None))] for name in districts],
+            'networks': [str(name) for name in networks],
+            'fields': ['bucket', 'district', 'network'] + ROLLUP_VALUES,
+            'rows': table.tolist(),
+        }
+
+    def save(self, path):
+        """保存汇总表（先写临时文件再替换）"""
+        tmp_file = path + '.tmp'
+        self.frame.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def _summarize(rows, keys):
+    if not len(rows):
+        return pd.DataFrame(columns=keys + ROLLUP_VALUES + ['mean_signal', 'severe_ratio'])
+    summary = rows.groupby(keys, as_index=False)[ROLLUP_VALUES].sum()
+    summary['mean_signal'] = summary['signal_sum'] / summary['count']
+    summary['severe_ratio'] = summary['severe'] / summary['count']
+    return summary
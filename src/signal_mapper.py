@@ -1,9 +1,50 @@
-import pandas as pd
-import requests
 import folium
-from folium.plugins import HeatMap
+from folium.plugins import HeatMap, FastMarkerCluster
 import os
 
+from render_cache import (DEFAULT_MAP_CENTER, GeocodeCache, RenderCache, artifact_file,
+                          cache_key, config_fingerprint, hash_rows, remove_stale_artifacts)
+from static_assets import write_compressed_siblings
+from anomalies import detect_anomalies
+from incidents import incident_reports
+from map_layers import FoliumLayersLoader, add_folium_layers, build_layers, write_layers_script
+from live_reload import file_digest
+from resolved_reports import (RESOLVED_COLUMNS, STATUS_FAILED, STATUS_OK, amap_geocode,
+                              is_resolved, load_resolved_reports, located_reports,
+                              read_reports, resolve_reports)
+
+# 生成器版本，参与渲染缓存键的计算
+GENERATOR_VERSION = '3.0'
+
+# 数据量达到该阈值时自动启用轻量输出模式
+LIGHTWEIGHT_THRESHOLD = 2000
+
+# 轻量模式下的标记回调：row = [纬度, 经度, 信号强度, 位置描述, 详细地址, 网络类型, 上报时间, 上报人, 备注]
+LIGHTWEIGHT_MARKER_CALLBACK = """function (row) {
+    function esc(s) {
+        return String(s).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    var signal = row[2];
+    var color = signal <= 2 ? 'red' : signal <= 4 ? 'orange' : signal <= 6 ? 'yellow' : 'green';
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 7, color: 'white', weight: 1, fillColor: color, fillOpacity: 0.9
+    });
+    marker.bindTooltip(esc(row[3]) + ' (信号强度: ' + signal + '/10)');
+    marker.bindPopup(function () {
+        return '<b>' + esc(row[3]) + '</b><br>' +
+            '详细地址：' + esc(row[4]) + '<br>' +
+            '网络类型：' + esc(row[5]) + '<br>' +
+            '信号强度：' + signal + '/10<br>' +
+            '上报时间：' + esc(row[6]) + '<br>' +
+            '上报人：' + esc(row[7]) + '<br>' +
+            '备注：' + esc(row[8]);
+    }, {maxWidth: 300});
+    return marker;
+}"""
+
+
 class SignalMapper:
     def __init__(self):
         # 从配置文件或环境变量读取API密钥
@@ -17,11 +58,14 @@ class SignalMapper:
         
         if not self.amap_key:
             raise ValueError("API密钥未设置，请配置config.py或环境变量AMAP_API_KEY")
+        
+        # 地理编码结果缓存
+        self.geocode_cache = GeocodeCache()
 
     def read_excel_data(self, file_path):
-        """读取Excel文件中的信号盲区数据"""
+        """读取Excel文件（或CSV）中的信号盲区数据"""
         try:
-            df = pd.read_excel(file_path)
+            df = read_reports(file_path)
             required_columns = ['位置描述', '详细地址', '网络类型', '信号强度']
             if not all(col in df.columns for col in required_columns):
                 print(f"Excel文件列名：{list(df.columns)}")
@@ -31,102 +75,178 @@ class SignalMapper:
             print(f"读取Excel文件时出错：{str(e)}")
             return None
 
-    def get_location_coordinates(self, location, detailed_address=None):
-        """使用高德地图API获取位置坐标"""
-        # 优先使用详细地址，如果没有则使用位置描述
-        address = detailed_address if detailed_address and str(detailed_address) != 'nan' else location
+    def generate_heatmap(self, df, output_file="signal_heatmap.html", lightweight=None,
+                         use_cache=True, dedup=False, keep_anomalies=False):
+        """生成信号盲区热力图
+
+        df 可以是原始Excel数据，也可以是解析数据集（见 resolved_reports），
+        后者直接使用其中的坐标，不再调用地理编码API；df 也可以是这两种数据的文件路径，
+        此时先按文件内容的摘要检查缓存，命中时不读取和解析文件。
+        lightweight=True 时使用轻量输出模式：热力图层 + 浏览器端快速聚合图层，
+        每个点只保存紧凑数组，弹窗内容由浏览器在点击时生成，分析图层写入单独的图层文件
+        （页面名.layers.<缓存键>.js）由浏览器加载后绘制，适合大数据量；
+        lightweight=None 时根据数据量自动选择。
+        use_cache=True 时，输入数据、地理编码结果、相关配置和生成器版本均未变化
+        则直接复用已生成的文件。
+        dedup=True 时先把距离和时间相近的重复上报合并为事件（见 incidents），
+        每个事件只生成一个标记和一份热度。
+        可疑上报（见 anomalies）仍显示标记，但默认不计入热力图、插值和密度，
+        keep_anomalies=True 时全部计入。
+        成功（或复用已有文件）时返回 True，读取文件失败时返回 False。
+        """
+        render_cache = RenderCache(os.path.dirname(output_file)) if use_cache else None
+        input_key = None
+        if isinstance(df, str):
+            if render_cache:
+                input_key = cache_key('folium-input', GENERATOR_VERSION, lightweight, dedup,
+                                      keep_anomalies, config_fingerprint(), file_digest(df))
+                if render_cache.is_fresh_input(output_file, input_key):
+                    print(f"输入文件未变化，复用已生成的热力图：{output_file}")
+                    return True
+            df = load_resolved_reports(df) if df.lower().endswith('.parquet') \
+                else self.read_excel_data(df)
+            if df is None:
+                return False
         
-        url = f"https://restapi.amap.com/v3/geocode/geo"
-        params = {
-            "key": self.amap_key,
-            "address": address,
-            "output": "json"
-        }
+        # 解析数据集直接使用，原始Excel数据先地理编码（优先使用缓存）
+        if is_resolved(df):
+            resolved = df
+        else:
+            resolved = resolve_reports(df, lambda address: amap_geocode(address, self.amap_key),
+                                       self.geocode_cache)
+        
+        if lightweight is None:
+            lightweight = len(resolved) >= LIGHTWEIGHT_THRESHOLD
+        
+        data_hash = hash_rows(resolved[RESOLVED_COLUMNS])
+        key = cache_key('folium', GENERATOR_VERSION, lightweight, dedup, keep_anomalies,
+                        config_fingerprint(), data_hash)
+        # 轻量模式下分析图层写入单独的图层文件（文件名带缓存键），页面加载后由浏览器绘制
+        layers_file = None
+        if lightweight:
+            layers_key = cache_key('folium-layers', GENERATOR_VERSION, dedup, keep_anomalies,
+                                   config_fingerprint(), data_hash)
+            layers_file = artifact_file(output_file, 'layers', layers_key)
+        dependencies = [layers_file] if layers_file else []
+        # 有地址解析失败时不记录输入键：下次生成时可能解析成功
+        record_input = (input_key is not None
+                        and not (resolved['geocode_status'] == STATUS_FAILED).any())
+        if render_cache and render_cache.is_fresh(output_file, key) \
+                and all(os.path.exists(path) for path in dependencies):
+            print(f"输入未变化，复用已生成的热力图：{output_file}")
+            if record_input:
+                render_cache.record_input(output_file, input_key, dependencies)
+            return True
         
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            print(f"地名: {address}, 返回: {data}")  # 调试信息
-            
-            if data["status"] == "1" and data["geocodes"]:
-                location_coords = data["geocodes"][0]["location"]
-                lng, lat = map(float, location_coords.split(","))
-                return lat, lng
-            else:
-                print(f"无法获取坐标：{address}, 错误信息：{data.get('info', '未知错误')}")
-                return None
-        except Exception as e:
-            print(f"获取坐标时出错：{str(e)}")
-            return None
-
-    def generate_heatmap(self, df, output_file="signal_heatmap.html"):
-        """生成信号盲区热力图"""
         # 创建地图对象，以南通市为中心
-        nantong_center = [32.0307, 120.8664]  # 南通市中心坐标
-        m = folium.Map(location=nantong_center, zoom_start=11)
+        nantong_center = [DEFAULT_MAP_CENTER['latitude'], DEFAULT_MAP_CENTER['longitude']]
+        m = folium.Map(location=nantong_center, zoom_start=DEFAULT_MAP_CENTER.get('zoom', 11))
+        
+        for name in resolved.loc[resolved['geocode_status'] != STATUS_OK, 'name']:
+            print(f"跳过无法获取坐标的位置：{name}")
+        located = located_reports(resolved)
+        if dedup and len(located):
+            located = incident_reports(located)
+            print(f"重复上报合并后共 {len(located)} 个事件")
+        
+        # 可疑上报不计入热度
+        flags = detect_anomalies(located)
+        suspect = [False] * len(located) if keep_anomalies else flags['anomaly'].tolist()
+        if any(suspect):
+            print(f"发现 {sum(suspect)} 条可疑上报，不计入热力图和插值")
         
         # 准备热力图数据
         heat_data = []
+        compact_rows = []
         success_count = 0
         
-        for index, row in df.iterrows():
-            print(f"处理第{index+1}条数据：{row['位置描述']}")
+        columns = ['lat', 'lng', 'signal', 'name', 'address', 'network', 'time', 'reporter', 'note']
+        for (lat, lng, signal_strength, name, address, network, report_time, reporter, note), \
+                is_suspect in zip(zip(*(located[col].tolist() for col in columns)), suspect):
+            coords = [lat, lng]
+            
+            # 根据信号强度设置权重（信号越弱，权重越大，在热力图中越红）
+            weight = max(1, 11 - signal_strength)  # 信号强度1对应权重10，信号强度10对应权重1
             
-            # 获取坐标
-            coords = self.get_location_coordinates(
-                row['位置描述'], 
-                row.get('详细地址', None)
-            )
+            if not is_suspect:
+                heat_data.append([lat, lng, weight])
             
-            if coords:
-                # 根据信号强度设置权重（信号越弱，权重越大，在热力图中越红）
-                signal_strength = row.get('信号强度', 5)
-                weight = max(1, 11 - signal_strength)  # 信号强度1对应权重10，信号强度10对应权重1
-                
-                heat_data.append([coords[0], coords[1], weight])
-                
-                # 在地图上添加标记点，显示详细信息
-                popup_text = f"""
-                <b>{row['位置描述']}</b><br>
-                详细地址：{row.get('详细地址', '未提供')}<br>
-                网络类型：{row['网络类型']}<br>
-                信号强度：{signal_strength}/10<br>
-                上报时间：{row.get('上报时间', '未知')}<br>
-                上报人：{row.get('上报人', '匿名')}<br>
-                备注：{row.get('备注', '无')}
-                """
-                
-                # 根据信号强度选择标记颜色
-                if signal_strength <= 2:
-                    color = 'red'  # 信号很差
-                elif signal_strength <= 4:
-                    color = 'orange'  # 信号较差
-                elif signal_strength <= 6:
-                    color = 'yellow'  # 信号一般
-                else:
-                    color = 'green'  # 信号较好
-                
-                folium.Marker(
-                    coords,
-                    popup=folium.Popup(popup_text, max_width=300),
-                    tooltip=f"{row['位置描述']} (信号强度: {signal_strength}/10)",
-                    icon=folium.Icon(color=color, icon='signal')
-                ).add_to(m)
-                
+            if lightweight:
+                # 轻量模式：只保存紧凑数组，标记和弹窗在浏览器端生成
+                compact_rows.append([
+                    round(lat, 6), round(lng, 6), signal_strength,
+                    name, address or '未提供', network,
+                    report_time or '未知', reporter or '匿名', note or '无'
+                ])
                 success_count += 1
+                continue
+            
+            # 在地图上添加标记点，显示详细信息
+            popup_text = f"""
+            <b>{name}</b><br>
+            详细地址：{address or '未提供'}<br>
+            网络类型：{network}<br>
+            信号强度：{signal_strength}/10<br>
+            上报时间：{report_time or '未知'}<br>
+            上报人：{reporter or '匿名'}<br>
+            备注：{note or '无'}
+            """
+            
+            # 根据信号强度选择标记颜色
+            if signal_strength <= 2:
+                color = 'red'  # 信号很差
+            elif signal_strength <= 4:
+                color = 'orange'  # 信号较差
+            elif signal_strength <= 6:
+                color = 'yellow'  # 信号一般
             else:
-                print(f"跳过无法获取坐标的位置：{row['位置描述']}")
+                color = 'green'  # 信号较好
+            
+            folium.Marker(
+                coords,
+                popup=folium.Popup(popup_text, max_width=300),
+                tooltip=f"{name} (信号强度: {signal_strength}/10)",
+                icon=folium.Icon(color=color, icon='signal')
+            ).add_to(m)
+            
+            success_count += 1
         
-        if heat_data:
+        if success_count:
             # 添加热力图层
-            HeatMap(heat_data, radius=20, blur=15, max_zoom=1).add_to(m)
+            HeatMap(heat_data, radius=20, blur=15, max_zoom=1, name='信号盲区热力图').add_to(m)
+            if compact_rows:
+                # 添加浏览器端聚合图层
+                FastMarkerCluster(compact_rows, callback=LIGHTWEIGHT_MARKER_CALLBACK,
+                                  name='监测点位').add_to(m)
+            # 添加分析图层（区域聚类、信号预测等），可在图层控件中开关
+            if layers_file:
+                if not (render_cache and render_cache.is_fresh(layers_file, layers_key)):
+                    write_layers_script(build_layers(located, exclude_anomalies=not keep_anomalies,
+                                                     flags=flags), layers_file)
+                    write_compressed_siblings(layers_file)
+                    if render_cache:
+                        render_cache.record(layers_file, layers_key)
+                control = folium.LayerControl().add_to(m)
+                FoliumLayersLoader(os.path.basename(layers_file), control).add_to(m)
+            else:
+                add_folium_layers(m, build_layers(located, exclude_anomalies=not keep_anomalies,
+                                                 flags=flags))
+                folium.LayerControl().add_to(m)
             print(f"成功处理 {success_count} 个位置点")
         else:
             print("警告：没有成功获取到任何位置的坐标，热力图将为空")
         
         # 保存地图
         m.save(output_file)
+        write_compressed_siblings(output_file)
+        removed = remove_stale_artifacts(output_file, dependencies)
+        if render_cache:
+            render_cache.forget(removed)
+            render_cache.record(output_file, key)
+            if record_input:
+                render_cache.record_input(output_file, input_key, dependencies)
         print(f"热力图已生成：{output_file}")
+        return True
 
 def main():
     # 创建SignalMapper实例
@@ -136,15 +256,9 @@ def main():
         print(f"初始化失败：{str(e)}")
         return
     
-    # 读取Excel文件
+    # 读取Excel文件（也可以直接使用已解析的数据集 .parquet）并生成热力图
     excel_file = input("请输入Excel文件路径：")
-    df = mapper.read_excel_data(excel_file)
-    
-    if df is not None:
-        print(f"成功读取 {len(df)} 条数据")
-        # 生成热力图
-        mapper.generate_heatmap(df)
-    else:
+    if not mapper.generate_heatmap(excel_file):
         print("无法处理Excel文件，请检查文件格式和内容。")
 
 if __name__ == "__main__":
@@ -72,143 +72,218 @@ API说明
 - 网页文件: signal_coverage_map.html
 """
 
+import time
+
+# 启动计时起点：用于统计到首个可交互画面的耗时
+STARTUP_STARTED_AT = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import webbrowser
 import os
 import sys
-import time
 import socket
 import platform
-import psutil
 import logging
 import traceback
-import importlib
+from collections import deque
 from datetime import datetime
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-import pandas as pd
+from importlib.util import find_spec
+
+# pandas、psutil 等较重的模块在首次使用时才导入，不拖慢窗口显示
 
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+# 项目路径（使用绝对路径，不受工作目录切换影响）
+from project_paths import (DEFAULT_EXCEL_FILE, MAP_HTML_FILE,
+                           RESOLVED_REPORTS_FILE, STATIC_DIR)
+from job_executor import JobExecutor
+from log_setup import DEFAULT_LOG_FILE, setup_logging
+
+# 启动耗时预算（毫秒），超出时在日志中给出警告，便于发现启动变慢
+STARTUP_BUDGET_MS = 1000
+
+# 界面线程取出后台任务结果的间隔（毫秒）
+JOB_POLL_INTERVAL_MS = 50
+
+# 日志面板：刷新间隔（毫秒，约10帧/秒）和最多保留的行数
+LOG_FLUSH_INTERVAL_MS = 100
+MAX_LOG_LINES = 1000
+
+# "生成示例数据"生成的记录数
+SAMPLE_DATA_SIZE = 100
+
+# 日志级别对应的颜色
+LOG_LEVEL_COLORS = {
+    'DEBUG': 'gray',
+    'INFO': 'blue',
+    'WARNING': 'orange',
+    'ERROR': 'red',
+    'CRITICAL': 'purple'
+}
+
+class GuiLogSink:
+    """日志面板的写入队列
+    
+    任意线程都可以调用 emit()，记录先放入有上限的队列，
+    由界面线程按固定间隔批量写入文本框；连续重复的消息合并为一行并显示次数，
+    文本框只保留最近 MAX_LOG_LINES 行。
+    """
+    
+    def __init__(self, text_widget, max_lines=MAX_LOG_LINES, interval_ms=LOG_FLUSH_INTERVAL_MS):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.pending = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        # 最后一行显示的 [级别, 消息, 次数]，用于合并重复消息
+        self.last_entry = None
+        
+        self.text.tag_config('timestamp', foreground='gray')
+        self.text.tag_config('message', foreground='black')
+        for level, color in LOG_LEVEL_COLORS.items():
+            self.text.tag_config(level.lower(), foreground=color, font=('Consolas', 9, 'bold'))
+        self.text.after(self.interval_ms, self.flush)
+    
+    def emit(self, level, message):
+        """添加一条日志（可在任意线程调用）"""
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((timestamp, level, str(message)))
+    
+    def flush(self):
+        """把队列中的日志一次性写入文本框（界面线程）"""
+        with self.lock:
+            records = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        try:
+            if records:
+                self._write(records, dropped)
+            self.text.after(self.interval_ms, self.flush)
+        except tk.TclError:
+            pass  # GUI组件已被销毁，停止刷新
+    
+    @staticmethod
+    def _line_chunks(timestamp, level, message, count):
+        suffix = f" (×{count})" if count > 1 else ""
+        return [f"[{timestamp}] ", 'timestamp', f"{level:<8} ", level.lower(),
+                f"{message}{suffix}\n", 'message']
+    
+    def _write(self, records, dropped):
+        # 合并连续重复的消息：[时间, 级别, 消息, 次数]
+        entries = []
+        for timestamp, level, message in records:
+            if entries and entries[-1][1:3] == [level, message]:
+                entries[-1][0] = timestamp
+                entries[-1][3] += 1
+            else:
+                entries.append([timestamp, level, message, 1])
+        
+        # 用户向上翻看时不自动滚动
+        at_bottom = self.text.yview()[1] >= 0.999
+        
+        if dropped:
+            self.text.insert(tk.END, f"... 日志过多，省略 {dropped} 条 ...\n", 'message')
+            self.last_entry = None
+        elif self.last_entry and entries[0][1:3] == self.last_entry[:2]:
+            # 与上一批最后一行重复：重写该行并累加次数
+            entries[0][3] += self.last_entry[2]
+            self.text.delete('last_log_entry', 'end-1c')
+        
+        chunks = []
+        for entry in entries[:-1]:
+            chunks += self._line_chunks(*entry)
+        if chunks:
+            self.text.insert(tk.END, *chunks)
+        # 标记最后一行的起点，下一批有重复消息时从这里重写
+        self.text.mark_set('last_log_entry', 'end-1c')
+        self.text.mark_gravity('last_log_entry', 'left')
+        self.text.insert(tk.END, *self._line_chunks(*entries[-1]))
+        self.last_entry = entries[-1][1:]
+        
+        # 只保留最近的行
+        lines = int(self.text.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.text.delete('1.0', f"{lines - self.max_lines + 1}.0")
+        
+        if at_bottom:
+            self.text.see(tk.END)
+
 class EnhancedLogger:
     """增强的日志系统"""
     
-    def __init__(self, name="SignalMapper", log_file="../data/signal_mapper.log"):
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 避免重复添加处理器
-        if not self.logger.handlers:
-            # 文件处理器
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(logging.DEBUG)
-            
-            # 格式化器
-            formatter = logging.Formatter(
-                '%(asctime)s | %(levelname)-8s | %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            file_handler.setFormatter(formatter)
-            self.logger.addHandler(file_handler)
-        
-        self.gui_text_widget = None
+    def __init__(self, log_file=DEFAULT_LOG_FILE):
+        # 文件日志由后台线程写入并自动轮转；默认INFO级别，调试模式下开启DEBUG
+        self.logger = setup_logging(log_file, logging.INFO)
+        self.gui_sink = None
     
     def set_gui_widget(self, text_widget):
-        """设置GUI文本组件用于实时显示日志"""
-        self.gui_text_widget = text_widget
+        """设置GUI文本组件用于实时显示日志（批量刷新）"""
+        self.gui_sink = GuiLogSink(text_widget)
     
     def _log_to_gui(self, level, message):
-        """将日志输出到GUI"""
-        if self.gui_text_widget:
-            try:
-                timestamp = datetime.now().strftime('%H:%M:%S')
-                
-                # 根据日志级别设置颜色
-                colors = {
-                    'DEBUG': 'gray',
-                    'INFO': 'blue',
-                    'WARNING': 'orange',
-                    'ERROR': 'red',
-                    'CRITICAL': 'purple'
-                }
-                color = colors.get(level, 'black')
-                
-                # 插入彩色日志
-                self.gui_text_widget.insert(tk.END, f"[{timestamp}] ", 'timestamp')
-                self.gui_text_widget.insert(tk.END, f"{level:<8} ", level.lower())
-                self.gui_text_widget.insert(tk.END, f"{message}\n", 'message')
-                
-                # 配置标签颜色
-                self.gui_text_widget.tag_config('timestamp', foreground='gray')
-                self.gui_text_widget.tag_config(level.lower(), foreground=color, font=('Consolas', 9, 'bold'))
-                self.gui_text_widget.tag_config('message', foreground='black')
-                
-                # 自动滚动到底部
-                self.gui_text_widget.see(tk.END)
-                
-                # 限制显示行数，避免内存占用过多
-                lines = int(self.gui_text_widget.index('end-1c').split('.')[0])
-                if lines > 1000:
-                    self.gui_text_widget.delete('1.0', '500.0')
-                    
-            except Exception:
-                pass  # GUI组件可能已被销毁
+        """将日志输出到GUI（放入队列，由界面线程批量写入）"""
+        if self.gui_sink:
+            self.gui_sink.emit(level, message)
+    
+    def log(self, level, message, *args):
+        """message 可以是 %-格式字符串，级别未启用时既不格式化也不写入"""
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(level, message, *args)
+        self._log_to_gui(logging.getLevelName(level), message % args if args else message)
     
-    def debug(self, message):
-        self.logger.debug(message)
-        self._log_to_gui('DEBUG', message)
+    def debug(self, message, *args):
+        self.log(logging.DEBUG, message, *args)
     
-    def info(self, message):
-        self.logger.info(message)
-        self._log_to_gui('INFO', message)
+    def info(self, message, *args):
+        self.log(logging.INFO, message, *args)
     
-    def warning(self, message):
-        self.logger.warning(message)
-        self._log_to_gui('WARNING', message)
+    def warning(self, message, *args):
+        self.log(logging.WARNING, message, *args)
     
-    def error(self, message):
-        self.logger.error(message)
-        self._log_to_gui('ERROR', message)
+    def error(self, message, *args):
+        self.log(logging.ERROR, message, *args)
     
-    def critical(self, message):
-        self.logger.critical(message)
-        self._log_to_gui('CRITICAL', message)
+    def critical(self, message, *args):
+        self.log(logging.CRITICAL, message, *args)
 
 class SystemDiagnostics:
     """系统环境检测工具"""
     
     @staticmethod
     def check_system_info():
-        """检查系统信息"""
+        """检查系统信息（未安装psutil时只返回基本信息）"""
         info = {
             'platform': platform.platform(),
             'python_version': sys.version,
-            'cpu_count': psutil.cpu_count(),
-            'memory_total': f"{psutil.virtual_memory().total / (1024**3):.1f}GB",
-            'memory_available': f"{psutil.virtual_memory().available / (1024**3):.1f}GB",
-            'disk_free': f"{psutil.disk_usage('/').free / (1024**3):.1f}GB" if os.name != 'nt' else f"{psutil.disk_usage('C:').free / (1024**3):.1f}GB"
+            'cpu_count': os.cpu_count(),
+            'memory_total': '未知',
+            'memory_available': '未知',
+            'disk_free': '未知'
         }
+        try:
+            import psutil
+        except ImportError:
+            return info
+        
+        memory = psutil.virtual_memory()
+        info['memory_total'] = f"{memory.total / (1024**3):.1f}GB"
+        info['memory_available'] = f"{memory.available / (1024**3):.1f}GB"
+        info['disk_free'] = f"{psutil.disk_usage('/' if os.name != 'nt' else 'C:').free / (1024**3):.1f}GB"
         return info
     
     @staticmethod
     def check_dependencies():
-        """检查依赖包"""
-        dependencies = {
-            'pandas': False,
-            'openpyxl': False,
-            'psutil': False
-        }
-        
-        for package in dependencies:
-            try:
-                importlib.import_module(package)
-                dependencies[package] = True
-            except ImportError:
-                dependencies[package] = False
-        
-        return dependencies
+        """检查依赖包（只查找模块，不实际导入）"""
+        return {package: find_spec(package) is not None
+                for package in ('pandas', 'openpyxl', 'psutil')}
     
     @staticmethod
     def check_ports(start_port=8888, end_port=8999, max_check=5):
@@ -271,7 +346,9 @@ class ErrorDiagnostics:
             'type': error_type,
             'message': error_msg,
             'solution': solution,
-            'traceback': traceback.format_exc()
+            # 异常可能来自后台任务线程，使用异常自身携带的调用栈
+            'traceback': ''.join(traceback.format_exception(type(exception), exception,
+                                                            exception.__traceback__))
         }
 
 class SignalMapperGUI:
@@ -283,13 +360,18 @@ class SignalMapperGUI:
         
         # 服务器相关
         self.server = None
-        self.server_thread = None
         self.server_port = 8888
         self.server_running = False
         
+        # 实时更新（监视Excel文件变化并推送到已打开的页面）
+        self.live_reloader = None
+        
         # 调试模式
         self.debug_mode = False
         
+        # 当前使用的Excel数据文件
+        self.excel_file = None
+        
         # 初始化诊断工具（不依赖GUI）
         self.diagnostics = SystemDiagnostics()
         self.error_diagnostics = ErrorDiagnostics()
@@ -301,8 +383,24 @@ class SignalMapperGUI:
         self.logger = EnhancedLogger()
         self.logger.set_gui_widget(self.status_text)
         
-        # 初始化时进行系统检查
+        # 后台任务执行器：耗时操作在工作线程执行，结果由界面线程定期取出
+        self.jobs = JobExecutor()
+        self.ui_jobs = set()
+        self.root.after(JOB_POLL_INTERVAL_MS, self.poll_jobs)
+        
+        # 系统检查等耗时操作在窗口首次绘制完成后再执行
+        self.root.after_idle(lambda: self.root.after(0, self.on_first_frame))
+        
+    def on_first_frame(self):
+        """窗口首次绘制完成：记录启动耗时，然后开始后台诊断"""
+        elapsed_ms = (time.perf_counter() - STARTUP_STARTED_AT) * 1000
+        if elapsed_ms > STARTUP_BUDGET_MS:
+            self.logger.warning("启动耗时 %.0f ms，超出预算 %d ms", elapsed_ms, STARTUP_BUDGET_MS)
+        else:
+            self.logger.info("启动耗时 %.0f ms（首个可交互画面）", elapsed_ms)
+        
         self.perform_startup_diagnostics()
+        self.update_system_info()
         
     def perform_startup_diagnostics(self):
         """启动时的快速诊断 - 避免阻塞"""
@@ -310,37 +408,32 @@ class SignalMapperGUI:
             if hasattr(self, 'logger'):
                 self.logger.info("系统检查完成，程序就绪")
                 
-                # 使用线程执行耗时的诊断，避免阻塞UI
-                def background_check():
-                    try:
-                        # 系统信息检查
-                        sys_info = self.diagnostics.check_system_info()
-                        self.logger.debug(f"平台: {sys_info['platform']}")
+                # 在后台任务中执行耗时的诊断，避免阻塞UI
+                def background_check(job):
+                    # 系统信息检查
+                    sys_info = self.diagnostics.check_system_info()
+                    job.log(f"平台: {sys_info['platform']}", 'debug')
+                    
+                    # 依赖检查
+                    deps = self.diagnostics.check_dependencies()
+                    missing_deps = [dep for dep, available in deps.items() if not available]
+                    if missing_deps:
+                        job.log(f"缺少依赖包: {', '.join(missing_deps)}", 'warning')
+                    else:
+                        job.log("所有依赖包检查通过", 'debug')
                         
-                        # 依赖检查
-                        deps = self.diagnostics.check_dependencies()
-                        missing_deps = [dep for dep, available in deps.items() if not available]
-                        if missing_deps:
-                            self.logger.warning(f"缺少依赖包: {', '.join(missing_deps)}")
-                        else:
-                            self.logger.debug("所有依赖包检查通过")
-                            
-                        # 权限检查
-                        if not self.diagnostics.check_file_permissions():
-                            self.logger.warning("文件读写权限可能受限")
-                        else:
-                            self.logger.debug("文件权限检查通过")
-                            
-                    except Exception as e:
-                        self.logger.debug(f"后台诊断异常: {str(e)}")
+                    # 权限检查
+                    if not self.diagnostics.check_file_permissions():
+                        job.log("文件读写权限可能受限", 'warning')
+                    else:
+                        job.log("文件权限检查通过", 'debug')
                 
-                # 启动后台检查线程
-                check_thread = threading.Thread(target=background_check, daemon=True)
-                check_thread.start()
+                self.jobs.submit(background_check, name="启动诊断", on_log=self.log_message,
+                                 on_error=lambda e: self.logger.debug("后台诊断异常: %s", e))
                 
         except Exception as e:
             if hasattr(self, 'logger'):
-                self.logger.error(f"诊断启动失败: {str(e)}")
+                self.logger.error("诊断启动失败: %s", e)
             else:
                 print(f"诊断启动失败: {str(e)}")
         
@@ -389,7 +482,14 @@ class SignalMapperGUI:
                                         bg='#e67e22', fg='white', 
                                         font=('微软雅黑', 14, 'bold'),
                                         height=2, width=20)
-        self.quick_start_btn.pack(pady=20, padx=20)
+        self.quick_start_btn.pack(pady=(20, 5), padx=20)
+        
+        # 后台任务进度和取消
+        self.progress_bar = ttk.Progressbar(parent, length=220, mode='determinate')
+        self.progress_bar.pack(pady=2, padx=20)
+        self.cancel_btn = tk.Button(parent, text="取消当前任务", command=self.cancel_jobs,
+                                   bg='#95a5a6', fg='white', width=15, state='disabled')
+        self.cancel_btn.pack(pady=(2, 10))
         
         # 分割线
         tk.Frame(parent, height=2, bg='#bdc3c7').pack(fill='x', padx=20, pady=10)
@@ -415,6 +515,11 @@ class SignalMapperGUI:
                                  bg='#3498db', fg='white', width=15, state='disabled')
         self.open_btn.pack(pady=2)
         
+        self.live_btn = tk.Button(server_frame, text="开启实时更新", 
+                                 command=self.toggle_live_reload,
+                                 bg='#16a085', fg='white', width=15, state='disabled')
+        self.live_btn.pack(pady=2)
+        
         # 数据管理组
         data_frame = tk.LabelFrame(parent, text="📊 数据管理", 
                                   font=('微软雅黑', 11, 'bold'),
@@ -431,6 +536,16 @@ class SignalMapperGUI:
                                         bg='#9b59b6', fg='white', width=15)
         self.select_file_btn.pack(pady=2)
         
+        self.generate_map_btn = tk.Button(data_frame, text="生成地图", 
+                                         command=self.generate_map,
+                                         bg='#2980b9', fg='white', width=15)
+        self.generate_map_btn.pack(pady=2)
+        
+        self.export_btn = tk.Button(data_frame, text="导出结果", 
+                                   command=self.export_results,
+                                   bg='#1abc9c', fg='white', width=15)
+        self.export_btn.pack(pady=2)
+        
         # 文件路径显示
         self.file_path = tk.StringVar(value="未选择文件")
         file_label = tk.Label(data_frame, textvariable=self.file_path, 
@@ -529,16 +644,25 @@ class SignalMapperGUI:
         help_text.insert('1.0', help_content)
         help_text.config(state='disabled')
         
-        # 初始化系统信息显示
-        self.update_system_info()
+        # 系统信息在窗口显示后由后台线程检测
+        self.system_text.insert('1.0', "正在检测系统信息...")
         
     def update_system_info(self):
-        """更新系统信息显示"""
-        try:
-            sys_info = self.diagnostics.check_system_info()
-            deps = self.diagnostics.check_dependencies()
-            
-            info_text = f"""系统信息
+        """在后台任务中检测系统信息，完成后在界面线程中更新显示"""
+        self.jobs.submit(lambda job: self.collect_system_info(), name="系统信息",
+                         on_done=self.show_system_info,
+                         on_error=lambda e: self.logger.error("更新系统信息失败: %s", e))
+    
+    def show_system_info(self, info_text):
+        self.system_text.delete('1.0', 'end')
+        self.system_text.insert('1.0', info_text)
+        
+    def collect_system_info(self):
+        """检测系统信息，返回显示的文本（后台线程）"""
+        sys_info = self.diagnostics.check_system_info()
+        deps = self.diagnostics.check_dependencies()
+        
+        info_text = f"""系统信息
 ==================
 操作系统: {sys_info['platform']}
 Python版本: {sys_info['python_version'].split()[0]}
@@ -557,21 +681,17 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
 ==================
 可用端口范围: 8888-8999
 """
-            
-            try:
-                available_ports = self.diagnostics.check_ports(max_check=3)  # 只检查前3个端口
-                if available_ports:
-                    info_text += f"可用端口: {', '.join(map(str, available_ports))}\n"
-                else:
-                    info_text += "端口检查中...\n"
-            except:
-                info_text += "端口检查跳过\n"
-                
-            self.system_text.delete('1.0', 'end')
-            self.system_text.insert('1.0', info_text)
-            
-        except Exception as e:
-            self.logger.error(f"更新系统信息失败: {str(e)}")
+        
+        try:
+            available_ports = self.diagnostics.check_ports(max_check=3)  # 只检查前3个端口
+            if available_ports:
+                info_text += f"可用端口: {', '.join(map(str, available_ports))}\n"
+            else:
+                info_text += "端口检查中...\n"
+        except:
+            info_text += "端口检查跳过\n"
+        
+        return info_text
         
     def log_message(self, message, level='info'):
         """兼容性日志记录功能 - 重定向到增强日志系统"""
@@ -588,47 +708,110 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             else:
                 self.logger.info(message)
         
-        # 更新状态栏
+        # 更新状态栏（由事件循环重绘，不在这里强制刷新界面）
         self.status_bar.config(text=f"📍 {message}")
-        self.root.update()
-        
-    def system_check(self):
-        """执行系统检查"""
-        self.logger.info("开始执行系统检查...")
-        
+    
+    def poll_jobs(self):
+        """取出后台任务的日志、进度和结果，回调在界面线程中执行"""
         try:
-            # 更新系统信息
-            self.update_system_info()
-            
-            # 检查关键文件
-            required_files = ['../static/signal_coverage_map.html']
-            missing_files = [f for f in required_files if not os.path.exists(f)]
-            
-            if missing_files:
-                self.logger.warning(f"缺少关键文件: {', '.join(missing_files)}")
-            else:
-                self.logger.info("关键文件检查通过")
-            
-            # 检查端口可用性
-            available_ports = self.diagnostics.check_ports()
-            if available_ports:
-                self.logger.info(f"找到 {len(available_ports)} 个可用端口")
-            else:
-                self.logger.warning("没有找到可用端口，可能需要管理员权限")
-            
-            # 检查文件权限
-            if self.diagnostics.check_file_permissions():
-                self.logger.info("文件权限检查通过")
-            else:
-                self.logger.warning("文件权限受限，可能影响数据保存")
-            
-            self.logger.info("✅ 系统检查完成")
-            
+            self.jobs.poll()
         except Exception as e:
+            self.logger.error("处理任务结果失败: %s", e)
+        finally:
+            self.root.after(JOB_POLL_INTERVAL_MS, self.poll_jobs)
+    
+    def run_job(self, fn, *args, name, on_done=None, error_title=None, on_finished=None):
+        """在后台执行 fn(job, *args)，期间禁用相关按钮并显示进度"""
+        def finished(job):
+            self.ui_jobs.discard(job)
+            self.update_job_state()
+            if on_finished:
+                on_finished()
+        
+        def done(result):
+            finished(job)
+            if on_done:
+                on_done(result)
+        
+        def failed(e):
+            finished(job)
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"系统检查失败: {error_info['solution']}")
+            self.logger.error("%s失败: %s", name, error_info['message'] or error_info['solution'])
             if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
+                self.logger.debug("详细错误: %s", error_info['traceback'])
+            if error_title:
+                messagebox.showerror(error_title, f"错误类型: {error_info['type']}\n解决方案: {error_info['solution']}")
+        
+        def cancelled(job):
+            finished(job)
+            self.logger.warning("%s已取消", name)
+        
+        job = self.jobs.submit(fn, *args, name=name, on_done=done, on_error=failed,
+                               on_cancelled=cancelled, on_progress=self.show_job_progress,
+                               on_log=self.log_message)
+        self.ui_jobs.add(job)
+        self.update_job_state()
+        return job
+    
+    def show_job_progress(self, job, done, total, message):
+        if total:
+            self.progress_bar.config(mode='determinate', maximum=total, value=done)
+            self.status_bar.config(text=f"📍 {job.name}: {message or ''} {done}/{total}")
+        elif message:
+            self.status_bar.config(text=f"📍 {job.name}: {message}")
+    
+    def update_job_state(self):
+        """根据是否有任务在执行，切换按钮状态和进度条"""
+        busy = bool(self.ui_jobs)
+        state = 'disabled' if busy else 'normal'
+        for button in (self.quick_start_btn, self.create_data_btn, self.generate_map_btn,
+                       self.select_file_btn, self.export_btn):
+            button.config(state=state)
+        self.cancel_btn.config(state='normal' if busy else 'disabled')
+        if busy:
+            self.progress_bar.config(mode='indeterminate')
+            self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', value=0)
+    
+    def cancel_jobs(self):
+        """请求取消正在执行的任务（任务在下一个检查点结束）"""
+        for job in self.ui_jobs:
+            job.cancel()
+        self.logger.info("正在取消任务...")
+        
+    def system_check(self):
+        """执行系统检查（在后台执行）"""
+        self.logger.info("开始执行系统检查...")
+        self.update_system_info()
+        self.run_job(self.run_system_checks, name="系统检查")
+    
+    def run_system_checks(self, job):
+        """检查关键文件、端口和文件权限（后台线程）"""
+        # 检查关键文件
+        required_files = [MAP_HTML_FILE]
+        missing_files = [f for f in required_files if not os.path.exists(f)]
+        
+        if missing_files:
+            job.log(f"缺少关键文件: {', '.join(missing_files)}", 'warning')
+        else:
+            job.log("关键文件检查通过")
+        
+        # 检查端口可用性
+        available_ports = self.diagnostics.check_ports()
+        if available_ports:
+            job.log(f"找到 {len(available_ports)} 个可用端口")
+        else:
+            job.log("没有找到可用端口，可能需要管理员权限", 'warning')
+        
+        # 检查文件权限
+        if self.diagnostics.check_file_permissions():
+            job.log("文件权限检查通过")
+        else:
+            job.log("文件权限受限，可能影响数据保存", 'warning')
+        
+        job.log("✅ 系统检查完成")
     
     def toggle_debug_mode(self):
         """切换调试模式"""
@@ -672,18 +855,18 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
                 current_log = self.status_text.get('1.0', 'end')
                 f.write(current_log)
             
-            self.logger.info(f"✅ 日志已导出到: {log_file}")
+            self.logger.info("✅ 日志已导出到: %s", log_file)
             messagebox.showinfo("导出成功", f"日志文件已保存到:\n{log_file}")
             
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"导出日志失败: {error_info['solution']}")
+            self.logger.error("导出日志失败: %s", error_info['solution'])
     
     def find_free_port(self):
         """查找可用端口 - 增强版"""
         available_ports = self.diagnostics.check_ports()
         if available_ports:
-            self.logger.debug(f"找到可用端口: {available_ports[:3]}")
+            self.logger.debug("找到可用端口: %s", available_ports[:3])
             return available_ports[0]
         else:
             self.logger.warning("未找到可用端口，使用默认端口8888")
@@ -697,70 +880,39 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             
         try:
             # 检查关键文件
-            if not os.path.exists('../static/signal_coverage_map.html'):
+            if not os.path.exists(MAP_HTML_FILE):
                 self.logger.error("缺少关键文件: signal_coverage_map.html")
                 messagebox.showerror("错误", "缺少关键文件 signal_coverage_map.html\n请确保文件存在")
                 return
             
-            self.server_port = self.find_free_port()
-            self.logger.info(f"正在启动HTTP服务器，端口: {self.server_port}")
-            
-            # 切换到项目根目录以便访问static文件
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            os.chdir(project_root)
-            self.logger.debug(f"工作目录: {project_root}")
+            from map_server import MapServer
             
-            class CustomHandler(SimpleHTTPRequestHandler):
-                def __init__(self, *args, **kwargs):
-                    super().__init__(*args, **kwargs)
-                
-                def log_message(self, format, *args):
-                    # 重定向到我们的日志系统
-                    pass
-                    
-                def end_headers(self):
-                    self.send_header('Cache-Control', 'no-cache')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    super().end_headers()
-                
-                def do_GET(self):
-                    try:
-                        super().do_GET()
-                    except Exception as e:
-                        self.send_error(500, f"Internal Server Error: {str(e)}")
-            
-            self.server = HTTPServer(('localhost', self.server_port), CustomHandler)
-            
-            def run_server():
-                try:
-                    self.logger.debug("HTTP服务器线程开始运行")
-                    self.server.serve_forever()
-                except Exception as e:
-                    if self.server_running:
-                        error_info = self.error_diagnostics.analyze_exception(e)
-                        self.logger.error(f"服务器运行错误: {error_info['solution']}")
-                        if self.debug_mode:
-                            self.logger.debug(f"详细错误: {error_info['traceback']}")
+            self.server_port = self.find_free_port()
+            self.logger.info("正在启动HTTP服务器，端口: %s", self.server_port)
             
-            self.server_thread = threading.Thread(target=run_server, daemon=True)
-            self.server_thread.start()
+            # 只以 static 目录为站点根目录，不对外提供配置文件、源码和数据
+            self.logger.debug("站点目录: %s", STATIC_DIR)
             
-            # 等待服务器启动
-            time.sleep(0.5)
+            # 多线程服务器，支持长连接和条件请求（304），并提供 /api/ 数据查询接口
+            self.server = MapServer(STATIC_DIR, port=self.server_port,
+                                    reports_file=RESOLVED_REPORTS_FILE)
+            self.server.start()
+            self.logger.debug("HTTP服务器线程开始运行")
             
             self.server_running = True
-            self.logger.info(f"✅ HTTP服务器启动成功！地址: http://localhost:{self.server_port}")
+            self.logger.info("✅ HTTP服务器启动成功！地址: http://localhost:%s", self.server_port)
             
             # 更新按钮状态
             self.start_btn.config(state='disabled')
             self.stop_btn.config(state='normal')
             self.open_btn.config(state='normal')
+            self.live_btn.config(state='normal')
             
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"服务器启动失败: {error_info['solution']}")
+            self.logger.error("服务器启动失败: %s", error_info['solution'])
             if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
+                self.logger.debug("详细错误: %s", error_info['traceback'])
             messagebox.showerror("服务器启动失败", f"错误类型: {error_info['type']}\n解决方案: {error_info['solution']}")
     
     def stop_server(self):
@@ -772,10 +924,11 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
         try:
             self.logger.info("正在停止HTTP服务器...")
             self.server_running = False
+            self.stop_live_reload()
             
             if self.server:
-                self.server.shutdown()
-                self.server.server_close()
+                self.server.stop()
+                self.server = None
                 self.logger.debug("服务器套接字已关闭")
                 
             self.logger.info("✅ HTTP服务器已停止")
@@ -784,12 +937,63 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             self.start_btn.config(state='normal')
             self.stop_btn.config(state='disabled')
             self.open_btn.config(state='disabled')
+            self.live_btn.config(state='disabled')
             
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"停止服务器失败: {error_info['solution']}")
+            self.logger.error("停止服务器失败: %s", error_info['solution'])
             if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
+                self.logger.debug("详细错误: %s", error_info['traceback'])
+    
+    def toggle_live_reload(self):
+        """开启/关闭实时更新：Excel文件保存后只处理有变化的行，并推送到已打开的页面"""
+        if self.live_reloader:
+            self.stop_live_reload()
+            return
+        if not self.server_running:
+            messagebox.showwarning("警告", "请先启动服务器")
+            return
+        excel_file = self.excel_file or DEFAULT_EXCEL_FILE
+        if not os.path.exists(excel_file):
+            self.logger.error("数据文件不存在: %s", excel_file)
+            return
+        
+        publish = self.server.events.publish
+        
+        def start_reloader(job):
+            from generate_amap_html import AMAP_API_KEY
+            from live_reload import LiveReloader
+            
+            # 监视线程中的日志交给界面线程输出
+            def log(message):
+                self.jobs.call_soon(self.logger.info, message)
+            
+            reloader = LiveReloader(excel_file, AMAP_API_KEY, publish,
+                                    resolved_file=RESOLVED_REPORTS_FILE, log=log)
+            reloader.start()
+            return reloader
+        
+        def started(reloader):
+            if not self.server_running:
+                reloader.stop()
+                return
+            self.live_reloader = reloader
+            self.live_btn.config(text="关闭实时更新")
+            self.logger.info("✅ 实时更新已开启，正在监视: %s", os.path.basename(excel_file))
+        
+        # 首次开启可能需要解析整个文件，在后台执行
+        self.live_btn.config(state='disabled')
+        self.run_job(start_reloader, name="开启实时更新", on_done=started,
+                     on_finished=lambda: self.live_btn.config(
+                         state='normal' if self.server_running else 'disabled'))
+    
+    def stop_live_reload(self):
+        if not self.live_reloader:
+            return
+        self.live_reloader.stop()
+        self.live_reloader = None
+        self.live_btn.config(text="开启实时更新")
+        self.logger.info("实时更新已关闭")
     
     def open_browser(self):
         """打开浏览器 - 增强版"""
@@ -798,12 +1002,12 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             messagebox.showwarning("警告", "请先点击'启动服务器'按钮")
             return
             
-        url = f"http://localhost:{self.server_port}/static/signal_coverage_map.html"
-        self.logger.info(f"正在打开浏览器: {url}")
+        url = f"http://localhost:{self.server_port}/{os.path.basename(MAP_HTML_FILE)}"
+        self.logger.info("正在打开浏览器: %s", url)
         
         try:
             # 检查网页文件是否存在
-            if not os.path.exists('static/signal_coverage_map.html'):
+            if not os.path.exists(MAP_HTML_FILE):
                 self.logger.error("网页文件不存在")
                 messagebox.showerror("错误", "static/signal_coverage_map.html 文件不存在")
                 return
@@ -816,177 +1020,45 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"打开浏览器失败: {error_info['solution']}")
+            self.logger.error("打开浏览器失败: %s", error_info['solution'])
             if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
+                self.logger.debug("详细错误: %s", error_info['traceback'])
             messagebox.showerror("打开浏览器失败", f"请手动打开浏览器访问:\n{url}")
     
     def create_sample_data(self):
-        """生成示例数据 - 增强版"""
-        try:
-            self.logger.info("正在生成示例数据...")
-            
-            # 检查文件权限
-            if not self.diagnostics.check_file_permissions():
-                self.logger.error("文件写入权限不足")
-                messagebox.showerror("权限错误", "程序没有文件写入权限\n请以管理员身份运行程序")
-                return
-            
-            # 南通市示例数据 (100个数据点)
-            sample_data = [
-                {
-                    '位置描述': '南通市崇川区南大街',
-                    '详细地址': '江苏省南通市崇川区南大街128号',
-                    '网络类型': '5G',
-                    '信号强度': 2,
-                    '上报时间': '2024-01-15 10:30',
-                    '上报人': '张三',
-                    '备注': '地下商场信号较弱'
-                },
-                {
-                    '位置描述': '南通市开发区星湖101广场',
-                    '详细地址': '江苏省南通市开发区星湖大道101号',
-                    '网络类型': '4G',
-                    '信号强度': 3,
-                    '上报时间': '2024-01-15 14:20',
-                    '上报人': '李四',
-                    '备注': '电梯内部分楼层无信号'
-                },
-                {
-                    '位置描述': '南通市通州区金沙中学',
-                    '详细地址': '江苏省南通市通州区金沙镇人民东路88号',
-                    '网络类型': '5G',
-                    '信号强度': 1,
-                    '上报时间': '2024-01-16 09:15',
-                    '上报人': '王五',
-                    '备注': '教学楼地下室完全无信号'
-                },
-                {
-                    '位置描述': '南通市港闸区万达广场',
-                    '详细地址': '江苏省南通市港闸区永兴大道999号',
-                    '网络类型': '4G',
-                    '信号强度': 4,
-                    '上报时间': '2024-01-16 16:45',
-                    '上报人': '赵六',
-                    '备注': '停车场B2层信号断断续续'
-                },
-                {
-                    '位置描述': '南通市如东县掘港镇人民路',
-                    '详细地址': '江苏省南通市如东县掘港镇人民中路168号',
-                    '网络类型': '5G',
-                    '信号强度': 2,
-                    '上报时间': '2024-01-17 11:30',
-                    '上报人': '钱七',
-                    '备注': '银行内部信号不稳定'
-                },
-                {
-                    '位置描述': '南通市海门区人民中路',
-                    '详细地址': '江苏省南通市海门区人民中路258号',
-                    '网络类型': '4G',
-                    '信号强度': 6,
-                    '上报时间': '2024-01-17 15:20',
-                    '上报人': '孙八',
-                    '备注': '商业街信号基本正常'
-                },
-                {
-                    '位置描述': '南通市启东市汇龙镇',
-                    '详细地址': '江苏省南通市启东市汇龙镇人民中路368号',
-                    '网络类型': '5G',
-                    '信号强度': 7,
-                    '上报时间': '2024-01-18 09:00',
-                    '上报人': '周九',
-                    '备注': '市政府附近信号良好'
-                },
-                {
-                    '位置描述': '南通市海安市中大街',
-                    '详细地址': '江苏省南通市海安市中大街199号',
-                    '网络类型': '4G',
-                    '信号强度': 5,
-                    '上报时间': '2024-01-18 13:45',
-                    '上报人': '吴十',
-                    '备注': '老城区信号中等'
-                },
-                {
-                    '位置描述': '南通火车站',
-                    '详细地址': '江苏省南通市崇川区青年东路32号',
-                    '网络类型': '5G',
-                    '信号强度': 8,
-                    '上报时间': '2024-01-19 08:15',
-                    '上报人': '郑十一',
-                    '备注': '交通枢纽信号覆盖良好'
-                },
-                {
-                    '位置描述': '南通大学附属医院',
-                    '详细地址': '江苏省南通市崇川区西寺路20号',
-                    '网络类型': '5G',
-                    '信号强度': 6,
-                    '上报时间': '2024-01-19 14:30',
-                    '上报人': '冯十二',
-                    '备注': '医院大楼内信号稳定'
-                }
-            ]
-            
-            # 生成更多示例数据 (扩展到100个)
-            import random
-            base_locations = [
-                ("南通市崇川区", "江苏省南通市崇川区"),
-                ("南通市开发区", "江苏省南通市开发区"),
-                ("南通市通州区", "江苏省南通市通州区"),
-                ("南通市港闸区", "江苏省南通市港闸区"),
-                ("南通市如东县", "江苏省南通市如东县"),
-                ("南通市海门区", "江苏省南通市海门区"),
-                ("南通市启东市", "江苏省南通市启东市"),
-                ("南通市海安市", "江苏省南通市海安市"),
-            ]
-            
-            names = ["张三", "李四", "王五", "赵六", "钱七", "孙八", "周九", "吴十", "郑十一", "冯十二", 
-                    "陈明", "林华", "黄强", "刘敏", "杨洋", "朱峰", "徐静", "马超", "梁美", "谢勇"]
-            network_types = ["4G", "5G"]
-            
-            # 扩展示例数据到100个
-            for i in range(len(sample_data), 100):
-                location = random.choice(base_locations)
-                street_names = ["人民路", "中山路", "解放路", "建设路", "文化路", "工农路", "胜利路", "和平路", "友谊路", "青年路"]
-                street = random.choice(street_names)
-                number = random.randint(1, 999)
-                
-                sample_data.append({
-                    '位置描述': f"{location[0]}{street}",
-                    '详细地址': f"{location[1]}{street}{number}号",
-                    '网络类型': random.choice(network_types),
-                    '信号强度': random.randint(1, 8),
-                    '上报时间': f"2024-01-{random.randint(15, 30):02d} {random.randint(8, 18):02d}:{random.randint(0, 59):02d}",
-                    '上报人': random.choice(names),
-                    '备注': random.choice([
-                        "信号正常", "信号较弱", "偶有中断", "地下室信号差", 
-                        "电梯内无信号", "室内信号良好", "户外信号强", "网络稳定"
-                    ])
-                })
-            
-            # 保存为Excel文件到data目录
-            df = pd.DataFrame(sample_data)
-            file_path = '../data/example_data.xlsx'
-            
-            # 确保data目录存在
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            self.logger.debug(f"准备写入{len(sample_data)}条记录到{file_path}")
-            df.to_excel(file_path, index=False)
-            
-            self.file_path.set(f"已生成: {file_path}")
-            self.logger.info(f"✅ 示例数据已生成: {file_path} (共{len(sample_data)}条记录)")
-            
-            # 验证文件
-            if os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
-                self.logger.debug(f"文件大小: {file_size} 字节")
-            
-        except Exception as e:
-            error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"生成示例数据失败: {error_info['solution']}")
-            if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
-            messagebox.showerror("生成数据失败", f"错误类型: {error_info['type']}\n解决方案: {error_info['solution']}")
+        """生成示例数据（在后台执行）"""
+        self.logger.info("正在生成示例数据...")
+        self.run_job(self.write_sample_data, name="生成示例数据",
+                     on_done=self.on_sample_data_ready, error_title="生成数据失败")
+    
+    def on_sample_data_ready(self, result):
+        file_path, count = result
+        self.excel_file = os.path.abspath(file_path)
+        self.file_path.set(f"已生成: {file_path}")
+        self.logger.info("✅ 示例数据已生成: %s (共%d条记录)", file_path, count)
+    
+    def write_sample_data(self, job):
+        """生成示例数据并写入Excel文件（后台线程），返回 (文件路径, 记录数)"""
+        # 检查文件权限
+        if not self.diagnostics.check_file_permissions():
+            raise PermissionError("程序没有文件写入权限")
+        
+        # 南通市模拟数据，附带真实坐标，无需地理编码即可生成地图
+        from synthetic_data import generate_reports, write_reports
+        df = generate_reports(SAMPLE_DATA_SIZE, include_coordinates=True)
+        file_path = DEFAULT_EXCEL_FILE
+        
+        # 确保data目录存在
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        
+        job.log(f"准备写入{len(df)}条记录到{file_path}", 'debug')
+        write_reports(df, file_path)
+        
+        # 验证文件
+        if os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
+            job.log(f"文件大小: {file_size} 字节", 'debug')
+        return file_path, len(df)
     
     def select_excel_file(self):
         """选择Excel文件 - 增强版"""
@@ -1014,68 +1086,140 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
                     self.logger.warning("文件过大，可能影响性能")
                     messagebox.showwarning("警告", "文件较大，加载可能需要较长时间")
                 
+                self.excel_file = file_path
                 self.file_path.set(file_path)
-                self.logger.info(f"已选择文件: {os.path.basename(file_path)} ({file_size/1024:.1f}KB)")
+                self.logger.info("已选择文件: %s (%.1fKB)", os.path.basename(file_path), file_size / 1024)
                 
-                # 尝试验证Excel文件结构
-                try:
-                    df = pd.read_excel(file_path)
-                    self.logger.debug(f"文件包含 {len(df)} 行数据")
-                    required_columns = ['位置描述', '详细地址', '网络类型', '信号强度']
-                    missing_columns = [col for col in required_columns if col not in df.columns]
-                    if missing_columns:
-                        self.logger.warning(f"缺少必要列: {', '.join(missing_columns)}")
-                        messagebox.showwarning("数据格式提醒", f"Excel文件建议包含以下列:\n{', '.join(required_columns)}")
-                except Exception as e:
-                    self.logger.warning("无法预览Excel文件内容")
+                # 在后台验证Excel文件结构
+                self.jobs.submit(self.inspect_excel_file, file_path, name="预览Excel文件",
+                                 on_done=self.on_excel_inspected,
+                                 on_error=lambda e: self.logger.warning("无法预览Excel文件内容"))
                     
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"选择文件失败: {error_info['solution']}")
+            self.logger.error("选择文件失败: %s", error_info['solution'])
             if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
+                self.logger.debug("详细错误: %s", error_info['traceback'])
+    
+    def inspect_excel_file(self, job, file_path):
+        """读取Excel文件，返回 (行数, 缺少的必要列)（后台线程）"""
+        from resolved_reports import read_reports
+        df = read_reports(file_path)
+        required_columns = ['位置描述', '详细地址', '网络类型', '信号强度']
+        return len(df), [col for col in required_columns if col not in df.columns]
+    
+    def on_excel_inspected(self, result):
+        row_count, missing_columns = result
+        self.logger.debug("文件包含 %d 行数据", row_count)
+        if missing_columns:
+            self.logger.warning("缺少必要列: %s", ', '.join(missing_columns))
+            messagebox.showwarning("数据格式提醒", "Excel文件建议包含以下列:\n位置描述, 详细地址, 网络类型, 信号强度")
+    
+    def generate_map(self):
+        """根据当前Excel文件生成地图网页（在后台执行）"""
+        self.run_job(self.build_map, self.excel_file or DEFAULT_EXCEL_FILE, name="生成地图")
+    
+    def build_map(self, job, excel_file):
+        """生成地图网页（后台线程），输入未变化时直接复用已生成的文件"""
+        if not os.path.exists(excel_file):
+            raise FileNotFoundError(f"数据文件不存在: {excel_file}")
+        
+        from generate_amap_html import generate_amap_html
+        
+        job.log(f"正在生成地图: {os.path.basename(excel_file)}")
+        os.makedirs(os.path.dirname(MAP_HTML_FILE), exist_ok=True)
+        # 界面的服务器和导出功能使用同一份解析数据集，生成时随之更新
+        if not generate_amap_html(excel_file, MAP_HTML_FILE, progress=job.progress,
+                                  resolved_file=RESOLVED_REPORTS_FILE):
+            raise RuntimeError("地图生成失败，请检查数据文件和API密钥配置")
+        job.log(f"✅ 地图已就绪: {MAP_HTML_FILE}")
+        return MAP_HTML_FILE
+    
+    def export_results(self):
+        """把解析结果（含坐标）导出为Excel（在后台执行）"""
+        if not os.path.exists(RESOLVED_REPORTS_FILE):
+            messagebox.showwarning("没有可导出的结果", "请先生成地图，完成地址解析后再导出")
+            return
+        file_path = filedialog.asksaveasfilename(
+            title="导出结果",
+            defaultextension=".xlsx",
+            initialfile=f"signal_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            filetypes=[("Excel文件", "*.xlsx")]
+        )
+        if file_path:
+            self.run_job(self.write_export, file_path, name="导出结果",
+                         on_done=self.on_export_ready, error_title="导出失败")
+    
+    def write_export(self, job, file_path):
+        """流式写出解析结果（后台线程），返回 (文件路径, 行数)"""
+        from excel_export import export_reports
+        return file_path, export_reports(RESOLVED_REPORTS_FILE, file_path, progress=job.progress)
+    
+    def on_export_ready(self, result):
+        file_path, count = result
+        self.logger.info("✅ 已导出 %d 条记录: %s", count, file_path)
     
     def quick_start(self):
-        """一键启动完整服务 - 增强版"""
+        """一键启动完整服务：检查、准备数据和生成地图在后台执行，完成后启动服务器"""
         self.logger.info("🚀 开始一键启动...")
+        self.update_system_info()
+        self.run_job(self.prepare_quick_start, self.excel_file, name="一键启动",
+                     on_done=self.finish_quick_start, error_title="一键启动失败")
+    
+    def prepare_quick_start(self, job, excel_file):
+        """一键启动的前三步（后台线程），返回使用的数据文件"""
+        # 1. 系统检查
+        job.log("步骤 1/5: 执行系统检查...")
+        self.run_system_checks(job)
+        
+        # 2. 准备数据（已有数据文件时直接使用，不重复生成）
+        job.progress(message="准备数据")
+        job.log("步骤 2/5: 准备数据...")
+        if excel_file and os.path.exists(excel_file):
+            job.log(f"使用已选择的数据文件: {os.path.basename(excel_file)}")
+        elif os.path.exists(DEFAULT_EXCEL_FILE):
+            excel_file = DEFAULT_EXCEL_FILE
+            job.log("使用已有的示例数据")
+        else:
+            excel_file, count = self.write_sample_data(job)
+            job.log(f"✅ 示例数据已生成: {excel_file} (共{count}条记录)")
         
+        # 3. 生成地图（输入未变化时直接复用）
+        job.progress(message="生成地图")
+        job.log("步骤 3/5: 生成地图...")
         try:
-            # 1. 系统检查
-            self.logger.info("步骤 1/4: 执行系统检查...")
-            self.system_check()
-            time.sleep(0.5)
-            
-            # 2. 生成示例数据
-            self.logger.info("步骤 2/4: 生成示例数据...")
-            self.create_sample_data()
-            time.sleep(0.5)
-            
-            # 3. 启动服务器
-            self.logger.info("步骤 3/4: 启动HTTP服务器...")
-            self.start_server()
-            time.sleep(1)
-            
-            # 4. 打开浏览器
-            if self.server_running:
-                self.logger.info("步骤 4/4: 打开浏览器...")
-                self.open_browser()
-                self.logger.info("🎉 一键启动完成！enjoy!")
-            else:
-                self.logger.error("一键启动失败，服务器未能成功启动")
-                messagebox.showerror("启动失败", "服务器启动失败，请查看日志信息")
-                
+            self.build_map(job, excel_file)
         except Exception as e:
-            error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.error(f"一键启动失败: {error_info['solution']}")
-            if self.debug_mode:
-                self.logger.debug(f"详细错误: {error_info['traceback']}")
-            messagebox.showerror("一键启动失败", f"错误: {error_info['solution']}")
+            # 已有的地图文件仍可使用，继续启动服务器
+            job.log(f"生成地图失败: {str(e)}", 'error')
+        return excel_file
+    
+    def finish_quick_start(self, excel_file):
+        """一键启动的后两步（界面线程）"""
+        self.excel_file = excel_file
+        self.file_path.set(excel_file)
+        
+        # 4. 启动服务器
+        self.logger.info("步骤 4/5: 启动HTTP服务器...")
+        self.start_server()
+        
+        # 5. 打开浏览器
+        if self.server_running:
+            self.logger.info("步骤 5/5: 打开浏览器...")
+            self.open_browser()
+            self.logger.info("🎉 一键启动完成！enjoy!")
+        else:
+            self.logger.error("一键启动失败，服务器未能成功启动")
+            messagebox.showerror("启动失败", "服务器启动失败，请查看日志信息")
     
     def on_closing(self):
         """关闭程序时的清理工作 - 增强版"""
         try:
             self.logger.info("程序正在关闭...")
             
+            # 取消后台任务
+            self.jobs.shutdown()
+            
             # 停止服务器
             if self.server_running:
                 self.logger.info("正在停止服务器...")
@@ -1088,7 +1232,7 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
                     'debug_mode': self.debug_mode,
                     'close_time': datetime.now().isoformat()
                 }
-                self.logger.debug(f"保存配置: {config_info}")
+                self.logger.debug("保存配置: %s", config_info)
             except:
                 pass
             
@@ -1117,7 +1261,7 @@ psutil: {'✅ 已安装' if deps['psutil'] else '❌ 未安装'}
             
         except Exception as e:
             error_info = self.error_diagnostics.analyze_exception(e)
-            self.logger.critical(f"GUI运行失败: {error_info['solution']}")
+            self.logger.critical("GUI运行失败: %s", error_info['solution'])
             messagebox.showerror("程序运行错误", f"错误: {error_info['solution']}")
 
 def main():
@@ -1135,20 +1279,15 @@ def main():
         temp_logger.addHandler(handler)
         
         temp_logger.info("信号覆盖地图分析器启动中...")
-        temp_logger.info(f"工作目录: {script_dir}")
+        temp_logger.info("工作目录: %s", script_dir)
         
         # 基础环境检查
         if sys.version_info < (3, 7):
             raise RuntimeError("需要Python 3.7或更高版本")
         
-        # 检查关键依赖
-        required_modules = ['tkinter', 'pandas', 'psutil']
-        missing_modules = []
-        for module in required_modules:
-            try:
-                importlib.import_module(module)
-            except ImportError:
-                missing_modules.append(module)
+        # 检查关键依赖（只查找模块，实际使用时才导入）
+        required_modules = ['pandas', 'openpyxl']
+        missing_modules = [module for module in required_modules if find_spec(module) is None]
         
         if missing_modules:
             error_msg = f"缺少必要模块: {', '.join(missing_modules)}\n请运行: pip install {' '.join(missing_modules)}"
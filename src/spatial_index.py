@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+空间索引
+基于规则网格分桶的点索引：点按所在网格排序存放，
+矩形、半径、kNN 查询只检查与查询范围相交的网格，避免逐点扫描全部数据。
+- GridIndex: 任意平面坐标（经纬度或米制坐标），距离与坐标同单位
+- GeoIndex: 经纬度点，半径和距离以米为单位
+两者都支持批量建立和增量插入。
+"""
+
+import numpy as np
+
+# 默认网格边长（度），约 1 公里
+DEFAULT_CELL_SIZE = 0.01
+
+# GeoIndex 默认网格边长（米）
+DEFAULT_CELL_METERS = 1000
+
+# 每度纬度对应的米数（经度还要乘以纬度的余弦）
+METERS_PER_DEGREE = 111320.0
+
+
+def meter_scales(lat):
+    """经度、纬度每度对应的米数（按平均纬度近似，适用于城市范围）"""
+    return METERS_PER_DEGREE * np.cos(np.radians(np.mean(lat))), METERS_PER_DEGREE
+
+
+def smallest_per_group(group, values, k):
+    """group 为升序排列的组号（同组连续存放），取每组中最小的至多 k 个值
+
+    返回 (组号, 组内名次, 在 values 中的位置)，名次从 0 开始按值升序。
+    各组按大小分档（补齐到 2 的幂），每档组成矩阵后用 partition 选出前 k 个再排序，
+    计算量与元素数大致成线性，不必对全部元素排序。
+    """
+    if not len(group):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, len(group)])
+    size_class = np.ceil(np.log2(counts)).astype(np.int64)
+    owners, ranks, positions = [], [], []
+    for c in np.unique(size_class):
+        members = np.flatnonzero(size_class == c)
+        width = 1 << int(c)
+        columns = np.arange(width)
+        valid = columns[None, :] < counts[members, None]
+        position = np.minimum(starts[members, None] + columns[None, :], len(values) - 1)
+        matrix = np.where(valid, values[position], np.inf)
+        take = min(k, width)
+        if take < width:
+            chosen = np.argpartition(matrix, take - 1, axis=1)[:, :take]
+        else:
+            chosen = np.broadcast_to(columns, matrix.shape)
+        chosen = np.take_along_axis(
+            chosen, np.argsort(np.take_along_axis(matrix, chosen, axis=1), axis=1, kind='stable'),
+            axis=1)
+        row, rank = np.nonzero(np.take_along_axis(valid, chosen, axis=1))
+        owners.append(group[starts[members[row]]])
+        ranks.append(rank)
+        positions.append(starts[members[row]] + chosen[row, rank])
+    return np.concatenate(owners), np.concatenate(ranks), np.concatenate(positions)
+
+
+class GridIndex:
+    """平面点的网格索引，lng/lat 也可以是米制坐标"""
+
+    def __init__(self, lng, lat, cell_size=DEFAULT_CELL_SIZE):
+        self.lng = np.asarray(lng, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.cell_size = float(cell_size)
+        self._build()
+
+    def __len__(self):
+        return len(self.lng)
+
+    def _build(self):
+        """批量建立索引：计算网格编号并按编号排序"""
+        if len(self.lng):
+            self.origin = (np.floor(self.lng.min() / self.cell_size) * self.cell_size,
+                           np.floor(self.lat.min() / self.cell_size) * self.cell_size)
+            cx, cy = self._cell_xy(self.lng, self.lat)
+            self.nx = int(cx.max()) + 1
+            self.ny = int(cy.max()) + 1
+        else:
+            self.origin = (0.0, 0.0)
+            self.nx = self.ny = 0
+            cx = cy = np.empty(0, dtype=np.int64)
+
+        keys = cy * self.nx + cx
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def _cell_xy(self, lng, lat):
+        cx = np.floor((np.asarray(lng) - self.origin[0]) / self.cell_size).astype(np.int64)
+        cy = np.floor((np.asarray(lat) - self.origin[1]) / self.cell_size).astype(np.int64)
+        return cx, cy
+
+    def _candidates(self, x0, y0, x1, y1):
+        """返回网格范围 [x0, x1] × [y0, y1] 内所有点的下标"""
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.nx - 1), min(y1, self.ny - 1)
+        if x0 > x1 or y0 > y1:
+            return np.empty(0, dtype=np.int64)
+
+        # 同一行网格的编号连续，每行只需一次二分查找
+        rows = np.arange(y0, y1 + 1, dtype=np.int64) * self.nx
+        starts = np.searchsorted(self.sorted_keys, rows + x0, side='left')
+        ends = np.searchsorted(self.sorted_keys, rows + x1, side='right')
+        if not len(starts):
+            return np.empty(0, dtype=np.int64)
+        return self.order[np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])]
+
+    def query_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """返回落在矩形范围内的点的下标（升序）"""
+        if not len(self.lng):
+            return np.empty(0, dtype=np.int64)
+        (x0, x1), (y0, y1) = self._cell_xy([min_lng, max_lng], [min_lat, max_lat])
+        idx = self._candidates(int(x0), int(y0), int(x1), int(y1))
+        inside = ((self.lng[idx] >= min_lng) & (self.lng[idx] <= max_lng)
+                  & (self.lat[idx] >= min_lat) & (self.lat[idx] <= max_lat))
+        return np.sort(idx[inside])
+
+    def query_radius(self, lng, lat, radius):
+        """返回与 (lng, lat) 距离不超过 radius 的点，(距离, 下标) 按距离升序"""
+        if not len(self.lng):
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        (x0, x1), (y0, y1) = self._cell_xy([lng - radius, lng + radius],
+                                           [lat - radius, lat + radius])
+        idx = self._candidates(int(x0), int(y0), int(x1), int(y1))
+        d = np.hypot(self.lng[idx] - lng, self.lat[idx] - lat)
+        inside = d <= radius
+        d, idx = d[inside], idx[inside]
+        order = np.argsort(d, kind='stable')
+        return d[order], idx[order]
+
+    def insert(self, lng, lat):
+        """增量插入点，返回新点的下标
+
+        新点都在现有网格范围内时，按网格编号把新点并入已排序的数组，不重新排序已有的点；
+        超出范围时重新建立索引。
+        """
+        lng = np.atleast_1d(np.asarray(lng, dtype=float))
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        start = len(self.lng)
+        new_idx = np.arange(start, start + len(lng))
+        self.lng = np.concatenate([self.lng, lng])
+        self.lat = np.concatenate([self.lat, lat])
+        if not len(lng):
+            return new_idx
+
+        cx, cy = self._cell_xy(lng, lat)
+        if (not start or cx.min() < 0 or cy.min() < 0
+                or cx.max() >= self.nx or cy.max() >= self.ny):
+            self._build()
+            return new_idx
+
+        keys = cy * self.nx + cx
+        order = np.argsort(keys, kind='stable')
+        # side='right'：同一网格内已有的点排在新点之前
+        pos = np.searchsorted(self.sorted_keys, keys[order], side='right')
+        self.sorted_keys = np.insert(self.sorted_keys, pos, keys[order])
+        self.order = np.insert(self.order, pos, new_idx[order])
+        return new_idx
+
+    def _block_pairs(self, cx, cy, ring):
+        """每个查询点所在网格周围 ring 圈内的全部点，返回 (查询序号, 点下标) 配对"""
+        offsets = np.arange(-ring, ring + 1, dtype=np.int64)
+        rows = cy[:, None] + offsets[None, :]
+        x0 = np.clip(cx - ring, 0, self.nx - 1)[:, None]
+        x1 = np.clip(cx + ring, 0, self.nx - 1)[:, None]
+        valid = ((rows >= 0) & (rows < self.ny)
+                 & (cx[:, None] + ring >= 0) & (cx[:, None] - ring < self.nx))
+        starts = np.searchsorted(self.sorted_keys, rows * self.nx + x0, side='left')
+        ends = np.searchsorted(self.sorted_keys, rows * self.nx + x1, side='right')
+        counts = np.where(valid, ends - starts, 0).ravel()
+
+        # 把每个查询点的若干段连续下标展开成配对
+        total = int(counts.sum())
+        owner = np.repeat(np.repeat(np.arange(len(cx)), len(offsets)), counts)
+        first = np.repeat(starts.ravel() - np.cumsum(counts) + counts, counts)
+        return owner, self.order[first + np.arange(total)]
+
+    def query_knn(self, lng, lat, k, max_distance=None):
+        """批量查询每个点最近的 k 个点
+
+        返回 (距离, 下标)，形状均为 (查询点数, k)，按距离升序；
+        找到的点不足 k 个时，空位的距离为 inf、下标为 -1。
+        从查询点所在网格向外逐圈扩大搜索范围，密集区域只需检查相邻网格；
+        指定 max_distance 时只返回该距离内的点，搜索范围不再继续扩大。
+        """
+        lng = np.atleast_1d(np.asarray(lng, dtype=float))
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        dist = np.full((len(lng), k), np.inf)
+        idx = np.full((len(lng), k), -1, dtype=np.int64)
+        if not len(self.lng) or not len(lng):
+            return dist, idx
+
+        cx, cy = self._cell_xy(lng, lat)
+        pending = np.arange(len(lng))
+        ring = 1
+        while len(pending):
+            owner, points = self._block_pairs(cx[pending], cy[pending], ring)
+            d = np.hypot(self.lng[points] - lng[pending][owner], self.lat[points] - lat[pending][owner])
+
+            # 每个查询点取距离最小的 k 个
+            owner, rank, pair = smallest_per_group(owner, d, k)
+            rows = pending[owner]
+            dist[rows, rank] = d[pair]
+            idx[rows, rank] = points[pair]
+
+            # 第 k 近的点在已搜索范围的内切圆内时结果确定；
+            # 内切圆已超过 max_distance 或范围已覆盖整个索引时也结束
+            covers_all = (np.maximum(cx[pending], self.nx - 1 - cx[pending]) <= ring) & \
+                         (np.maximum(cy[pending], self.ny - 1 - cy[pending]) <= ring)
+            done = (dist[pending, k - 1] <= ring * self.cell_size) | covers_all
+            if max_distance is not None and ring * self.cell_size >= max_distance:
+                done[:] = True
+            pending = pending[~done]
+            ring *= 2
+
+        if max_distance is not None:
+            beyond = dist > max_distance
+            dist[beyond] = np.inf
+            idx[beyond] = -1
+        return dist, idx
+
+
+class GeoIndex:
+    """经纬度点索引，半径和距离以米为单位
+
+    建立时按数据的平均纬度确定经纬度到米的换算比例（见 meter_scales），
+    之后插入的点沿用同一比例，适用于城市范围的数据。
+    """
+
+    def __init__(self, lng, lat, cell_meters=DEFAULT_CELL_METERS):
+        lng = np.asarray(lng, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        # 空索引先按赤道比例，插入第一批点时再按其纬度确定
+        self.lng_scale, self.lat_scale = meter_scales(lat) if len(lat) else meter_scales(0.0)
+        self.grid = GridIndex(lng * self.lng_scale, lat * self.lat_scale, cell_size=cell_meters)
+
+    def __len__(self):
+        return len(self.grid)
+
+    @property
+    def lng(self):
+        return self.grid.lng / self.lng_scale
+
+    @property
+    def lat(self):
+        return self.grid.lat / self.lat_scale
+
+    def query_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """返回落在经纬度矩形范围内的点的下标（升序）"""
+        return self.grid.query_bbox(min_lng * self.lng_scale, min_lat * self.lat_scale,
+                                    max_lng * self.lng_scale, max_lat * self.lat_scale)
+
+    def query_radius(self, lng, lat, radius):
+        """返回 radius 米内的点，(距离(米), 下标) 按距离升序"""
+        return self.grid.query_radius(lng * self.lng_scale, lat * self.lat_scale, radius)
+
+    def query_knn(self, lng, lat, k, max_distance=None):
+        """批量查询最近的 k 个点，距离以米为单位，返回值同 GridIndex.query_knn"""
+        return self.grid.query_knn(np.asarray(lng, dtype=float) * self.lng_scale,
+                                   np.asarray(lat, dtype=float) * self.lat_scale,
+                                   k, max_distance)
+
+    def insert(self, lng, lat):
+        """增量插入点，返回新点的下标"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        if not len(self.grid) and len(lat):
+            self.lng_scale, self.lat_scale = meter_scales(lat)
+        return self.grid.insert(np.asarray(lng, dtype=float) * self.lng_scale,
+                                lat * self.lat_scale)
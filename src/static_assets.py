@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态文件预压缩
+生成产物时同时写出 .gz（以及可选的 .br）压缩副本，
+HTTP服务器根据 Accept-Encoding 直接返回对应副本，无需每次请求时压缩。
+"""
+
+import gzip
+import os
+
+try:
+    import brotli  # 可选依赖，未安装时只生成 .gz
+except ImportError:
+    brotli = None
+
+# 值得预压缩的文件类型
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.json', '.css', '.svg', '.csv', '.txt')
+
+# 按优先级排列的编码方式及对应的文件后缀
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _write_atomic(target, compress):
+    tmp_file = target + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as out:
+            compress(out)
+        os.replace(tmp_file, target)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def write_compressed_siblings(path):
+    """为 path 写出压缩副本，返回生成的文件列表"""
+    if not path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+        return []
+
+    written = []
+
+    def gzip_file(out):
+        # mtime=0 使相同内容得到相同的压缩结果
+        with open(path, 'rb') as src, gzip.GzipFile(fileobj=out, mode='wb',
+                                                    compresslevel=9, mtime=0) as gz:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                gz.write(chunk)
+
+    _write_atomic(path + '.gz', gzip_file)
+    written.append(path + '.gz')
+
+    if brotli is not None:
+        def brotli_file(out):
+            compressor = brotli.Compressor(quality=11)
+            with open(path, 'rb') as src:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(compressor.process(chunk))
+            out.write(compressor.finish())
+
+        _write_atomic(path + '.br', brotli_file)
+        written.append(path + '.br')
+
+    return written
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding，返回 编码 -> q值"""
+    accepted = {}
+    for item in (header or '').split(','):
+        parts = item.strip().split(';')
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoded_variant(path, accept_encoding):
+    """选择可用的压缩副本，返回 (文件路径, 编码)，没有合适的副本时编码为 None
+
+    副本比原文件旧时视为过期，不予使用。
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    if not accepted:
+        return path, None
+
+    try:
+        source_mtime = os.path.getmtime(path)
+    except OSError:
+        return path, None
+
+    for encoding, suffix in ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q <= 0:
+            continue
+        variant = path + suffix
+        try:
+            if os.path.getmtime(variant) >= source_mtime:
+                return variant, encoding
+        except OSError:
+            continue
+    return path, None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟数据生成器
+按南通各区县的分布批量生成信号上报数据（1千～1千万条），用于演示和压力测试：
+- 上报点围绕各区县的若干热点聚集，城区密集、郊区稀疏
+- 信号强度与位置相关：存在若干成片的弱覆盖区域，离城区越远信号越差
+- 上报时间集中在白天，网络类型比例随区县变化
+- 可附带真实坐标（经度/纬度列），解析时直接使用，不调用地理编码API
+全部计算使用 numpy 向量化完成，文本列使用类别编码。
+"""
+
+import numpy as np
+import pandas as pd
+
+from excel_export import write_frame_xlsx
+
+# 区县：名称、中心经纬度、分布范围（度）、上报量权重、5G占比
+DISTRICTS = [
+    ('崇川区', 120.864, 32.010, 0.05, 0.28, 0.70),
+    ('开发区', 120.950, 31.977, 0.04, 0.06, 0.65),
+    ('通州区', 121.073, 32.084, 0.08, 0.14, 0.55),
+    ('海门区', 121.181, 31.871, 0.08, 0.12, 0.50),
+    ('如皋市', 120.573, 32.371, 0.09, 0.12, 0.45),
+    ('海安市', 120.467, 32.533, 0.09, 0.09, 0.45),
+    ('启东市', 121.657, 31.808, 0.10, 0.10, 0.40),
+    ('如东县', 121.185, 32.331, 0.12, 0.09, 0.40),
+]
+
+STREETS = ['人民路', '中山路', '解放路', '建设路', '文化路', '工农路', '胜利路', '和平路',
+           '友谊路', '青年路', '长江路', '跃龙路', '世纪大道', '通富路', '星湖大道', '崇川路']
+PLACES = ['小区', '商场', '医院', '学校', '地铁站', '写字楼', '停车场', '菜市场', '公园', '工业园']
+REPORTERS = ['张三', '李四', '王五', '赵六', '钱七', '孙八', '周九', '吴十', '郑十一', '冯十二',
+             '陈明', '林华', '黄强', '刘敏', '杨洋', '朱峰', '徐静', '马超', '梁美', '谢勇']
+# 按信号强度分档的备注：差（1-2）、较差（3-4）、一般（5-6）、良好（7-8）
+NOTES = [
+    ['完全无信号', '地下室信号差', '电梯内无信号', '通话频繁中断'],
+    ['信号较弱', '偶有中断', '网速很慢', '室内信号不稳定'],
+    ['信号一般', '高峰期网速下降', '基本可用'],
+    ['信号良好', '室内信号良好', '户外信号强', '网络稳定'],
+]
+
+# 每个区县的热点数、全市弱覆盖区域数
+HOTSPOTS_PER_DISTRICT = 6
+WEAK_AREAS = 25
+
+
+def _coverage_field(rng, lng, lat, district_idx):
+    """位置对应的信号质量（约 1～8）：基础值 - 弱覆盖区域 - 离区县中心的距离"""
+    centers = np.array([(d[1], d[2]) for d in DISTRICTS])
+    spreads = np.array([d[3] for d in DISTRICTS])
+
+    # 弱覆盖区域：在各区县范围内随机分布的高斯凹陷
+    weak_district = rng.integers(0, len(DISTRICTS), WEAK_AREAS)
+    weak_centers = centers[weak_district] + rng.normal(0, 1, (WEAK_AREAS, 2)) * spreads[weak_district, None]
+    weak_radius = rng.uniform(0.005, 0.03, WEAK_AREAS)
+    weak_depth = rng.uniform(2.0, 5.0, WEAK_AREAS)
+
+    quality = np.full(len(lng), 7.0)
+    for (cx, cy), radius, depth in zip(weak_centers, weak_radius, weak_depth):
+        quality -= depth * np.exp(-((lng - cx) ** 2 + (lat - cy) ** 2) / (2 * radius ** 2))
+
+    distance = np.hypot(lng - centers[district_idx, 0], lat - centers[district_idx, 1])
+    quality -= 2.0 * distance / spreads[district_idx]
+    return quality
+
+
+def generate_reports(n, seed=None, include_coordinates=False, start='2024-01-01', days=90):
+    """生成 n 条模拟上报数据，列与Excel模板一致（文本列为 category 类型）
+
+    include_coordinates=True 时附带真实坐标（经度、纬度列）。
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array([d[4] for d in DISTRICTS])
+    district_idx = rng.choice(len(DISTRICTS), size=n, p=weights / weights.sum())
+
+    # 每个区县的热点：中心附近的若干聚集区，大小不一
+    centers = np.array([(d[1], d[2]) for d in DISTRICTS])
+    spreads = np.array([d[3] for d in DISTRICTS])
+    hotspot_offsets = rng.normal(0, 0.6, (len(DISTRICTS), HOTSPOTS_PER_DISTRICT, 2))
+    hotspot_sizes = rng.uniform(0.08, 0.3, (len(DISTRICTS), HOTSPOTS_PER_DISTRICT))
+    hotspot_idx = rng.integers(0, HOTSPOTS_PER_DISTRICT, n)
+
+    spread = spreads[district_idx]
+    lng = (centers[district_idx, 0] + hotspot_offsets[district_idx, hotspot_idx, 0] * spread
+           + rng.normal(0, 1, n) * hotspot_sizes[district_idx, hotspot_idx] * spread)
+    lat = (centers[district_idx, 1] + hotspot_offsets[district_idx, hotspot_idx, 1] * spread
+           + rng.normal(0, 1, n) * hotspot_sizes[district_idx, hotspot_idx] * spread)
+
+    # 信号强度：位置决定的覆盖质量 + 室内/地下场所的衰减 + 个体差异
+    place_idx = rng.integers(0, len(PLACES), n)
+    indoor_penalty = np.isin(place_idx, [1, 6]) * 1.0 + np.isin(place_idx, [4]) * 0.5
+    quality = _coverage_field(rng, lng, lat, district_idx) - indoor_penalty + rng.normal(0, 0.8, n)
+    signal = np.clip(np.rint(quality), 1, 8).astype(np.int8)
+
+    # 网络类型：按区县的5G占比
+    g5_share = np.array([d[5] for d in DISTRICTS])[district_idx]
+    network = pd.Categorical.from_codes((rng.random(n) < g5_share).astype(np.int8), ['4G', '5G'])
+
+    # 上报时间：白天多、夜间少，精确到分钟
+    hour_weights = np.array([1, 1, 1, 1, 1, 2, 4, 8, 10, 10, 9, 9, 10, 9, 9, 9, 10, 11, 12, 12,
+                             10, 7, 4, 2], dtype=float)
+    hours = rng.choice(24, size=n, p=hour_weights / hour_weights.sum())
+    minutes = rng.integers(0, days, n) * 1440 + hours * 60 + rng.integers(0, 60, n)
+    time_labels = (pd.Timestamp(start) + pd.to_timedelta(np.arange(days * 1440), unit='min')
+                   ).strftime('%Y-%m-%d %H:%M')
+
+    # 文本列都由有限的词表组合而成：只生成每种取值一次，各行用类别编码引用，
+    # 千万行时不必逐行拼接或格式化字符串
+    district_names = [d[0] for d in DISTRICTS]
+    street_idx = rng.integers(0, len(STREETS), n)
+    name_labels = [f"南通市{d}{s}{p}" for d in district_names for s in STREETS for p in PLACES]
+    address_labels = [f"江苏省南通市{d}{s}{no}号" for d in district_names for s in STREETS
+                      for no in range(1, 1000)]
+    location_code = district_idx * len(STREETS) + street_idx
+    note_band = np.minimum((signal - 1) // 2, 3)
+    note_labels = [note for band in NOTES for note in band]
+    note_offsets = np.cumsum([0] + [len(band) for band in NOTES])[:-1]
+    note_sizes = np.array([len(band) for band in NOTES])
+    note_code = note_offsets[note_band] + rng.integers(0, 1 << 16, n) % note_sizes[note_band]
+
+    df = pd.DataFrame({
+        '位置描述': pd.Categorical.from_codes(location_code * len(PLACES) + place_idx, name_labels),
+        '详细地址': pd.Categorical.from_codes(location_code * 999 + rng.integers(0, 999, n),
+                                          address_labels),
+        '网络类型': network,
+        '信号强度': signal,
+        '上报时间': pd.Categorical.from_codes(minutes, time_labels),
+        '上报人': pd.Categorical.from_codes(rng.integers(0, len(REPORTERS), n), REPORTERS),
+        '备注': pd.Categorical.from_codes(note_code, note_labels),
+    })
+    if include_coordinates:
+        df['经度'] = np.round(lng, 6)
+        df['纬度'] = np.round(lat, 6)
+    return df
+
+
+def write_reports(df, path, progress=None):
+    """按扩展名写出 .xlsx / .csv / .parquet 文件（xlsx 流式写出）"""
+    lower = path.lower()
+    if lower.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    elif lower.endswith('.csv'):
+        # 带BOM，Excel打开时中文不乱码
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+    elif lower.endswith(('.xlsx', '.xls')):
+        write_frame_xlsx(df, path, progress=progress)
+    else:
+        raise ValueError(f"不支持的文件格式: {path}")
+    return path
+
+
+def geocode_errors(resolved, reports):
+    """地理编码结果与真实坐标的距离（米），用于检验地理编码质量
+
+    resolved 为解析数据集，reports 为带经度/纬度列的原始数据，两者行顺序一致。
+    """
+    lng1, lat1 = np.radians(resolved['lng'].to_numpy(float)), np.radians(resolved['lat'].to_numpy(float))
+    lng2, lat2 = np.radians(reports['经度'].to_numpy(float)), np.radians(reports['纬度'].to_numpy(float))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return pd.Series(2 * 6371000 * np.arcsin(np.sqrt(a)), index=resolved.index)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""可疑上报识别：信号与周围明显不符的上报、服务区域外的上报"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from anomalies import detect_anomalies, drop_anomalies, service_area  # noqa: E402
+from districts import DISTRICT_CENTERS  # noqa: E402
+
+_, CENTER_LNG, CENTER_LAT = DISTRICT_CENTERS[0]
+
+
+def neighborhood(count=40, signal=8, spread=0.001, seed=0):
+    """中心附近约 100 米内、信号相近的一片上报"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'lng': CENTER_LNG + rng.uniform(-spread, spread, count),
+        'lat': CENTER_LAT + rng.uniform(-spread, spread, count),
+        'signal': signal + rng.integers(-1, 2, count),
+    })
+
+
+class DetectAnomaliesTest(unittest.TestCase):
+
+    def test_planted_outlier(self):
+        located = neighborhood()
+        located.loc[len(located)] = [CENTER_LNG, CENTER_LAT, 1]
+        flags = detect_anomalies(located)
+        self.assertEqual(flags.index[flags['anomaly']].tolist(), [len(located) - 1])
+        planted = flags.iloc[-1]
+        self.assertTrue(planted['signal_outlier'])
+        self.assertFalse(planted['outside_area'])
+        self.assertLess(planted['z'], -3.5)
+        self.assertEqual(planted['local_median'], 8)
+
+    def test_outside_service_area(self):
+        located = neighborhood()
+        west, south, east, north = service_area()
+        # 海上的点：信号与附近一致也视为可疑，且不作为其他点的近邻
+        located.loc[len(located)] = [east + 0.5, (south + north) / 2, 8]
+        flags = detect_anomalies(located)
+        self.assertEqual(flags.index[flags['anomaly']].tolist(), [len(located) - 1])
+        self.assertTrue(flags.iloc[-1]['outside_area'])
+        self.assertEqual(flags.iloc[-1]['neighbors'], 0)
+
+        kept, suspect = drop_anomalies(located)
+        self.assertEqual(len(kept), len(located) - 1)
+        self.assertTrue(suspect['outside_area'].all())
+
+    def test_explicit_bounds(self):
+        located = neighborhood()
+        bounds = (CENTER_LNG, CENTER_LAT - 1, CENTER_LNG + 1, CENTER_LAT + 1)
+        flags = detect_anomalies(located, bounds=bounds)
+        np.testing.assert_array_equal(flags['outside_area'], located['lng'] < CENTER_LNG)
+
+    def test_sparse_points_are_not_judged(self):
+        located = neighborhood(count=3)
+        located.loc[len(located)] = [CENTER_LNG, CENTER_LAT, 1]
+        self.assertFalse(detect_anomalies(located)['anomaly'].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""弱信号密度：核密度的总量守恒、峰值位置、FFT 卷积与直接卷积一致；导出文件"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from density import (density_contours, fft_convolve, gaussian_kernel, heat_weights,  # noqa: E402
+                     kde_surface, signal_density, write_density)
+from spatial_index import meter_scales  # noqa: E402
+
+CENTER_LNG, CENTER_LAT = 120.8664, 32.0307
+
+
+def cluster(count=500, spread_meters=80, seed=1):
+    """以 (CENTER_LNG, CENTER_LAT) 为中心、标准差约 spread_meters 米的一簇上报"""
+    rng = np.random.default_rng(seed)
+    lng_scale, lat_scale = meter_scales(CENTER_LAT)
+    return (CENTER_LNG + rng.normal(0, spread_meters, count) / lng_scale,
+            CENTER_LAT + rng.normal(0, spread_meters, count) / lat_scale)
+
+
+class KdeTest(unittest.TestCase):
+
+    def test_fft_convolve_matches_direct(self):
+        rng = np.random.default_rng(0)
+        grid = rng.random((9, 13))
+        kernel = gaussian_kernel(1.2)
+        ry, rx = kernel.shape[0] // 2, kernel.shape[1] // 2
+        padded = np.pad(grid, ((ry, ry), (rx, rx)))
+        direct = np.array([[(padded[i:i + kernel.shape[0], j:j + kernel.shape[1]]
+                             * kernel[::-1, ::-1]).sum() for j in range(grid.shape[1])]
+                           for i in range(grid.shape[0])])
+        np.testing.assert_allclose(fft_convolve(grid, kernel), direct, atol=1e-12)
+
+    def test_total_mass_equals_total_weight(self):
+        lng, lat = cluster()
+        weights = np.random.default_rng(2).integers(1, 11, len(lng)).astype(float)
+        surface = kde_surface(lng, lat, weights, cell_meters=50, bandwidth=150)
+        # 默认范围向外扩展了截断半径，核的质量全部落在网格内
+        cell_km2 = (50 / 1000) ** 2
+        self.assertAlmostEqual(surface.values.sum() * cell_km2 / weights.sum(), 1.0, places=6)
+
+    def test_peak_at_cluster_center(self):
+        lng, lat = cluster()
+        surface = kde_surface(lng, lat, cell_meters=50, bandwidth=150)
+        row, col = np.unravel_index(np.argmax(surface.values), surface.shape)
+        centers_lng, centers_lat = surface.cell_centers()
+        lng_scale, lat_scale = meter_scales(CENTER_LAT)
+        self.assertLess(abs(centers_lng[col] - CENTER_LNG) * lng_scale, 50)
+        self.assertLess(abs(centers_lat[row] - CENTER_LAT) * lat_scale, 50)
+
+    def test_weak_signal_weighs_more(self):
+        np.testing.assert_array_equal(heat_weights([1, 5, 10, 12]), [10, 6, 1, 1])
+        located = pd.DataFrame({'lng': [CENTER_LNG, CENTER_LNG + 0.05],
+                                'lat': [CENTER_LAT, CENTER_LAT], 'signal': [1, 10]})
+        surface = signal_density(located, cell_meters=100, bandwidth=200)
+        weak, strong = surface.sample(located['lng'], located['lat'])
+        self.assertAlmostEqual(weak / strong, 10, places=3)
+
+    def test_contours_surround_peak(self):
+        lng, lat = cluster()
+        surface = kde_surface(lng, lat, cell_meters=50, bandwidth=150)
+        contours = density_contours(surface)
+        levels = [level for level, _ in contours]
+        self.assertEqual(levels, sorted(levels))
+        for level, paths in contours:
+            self.assertTrue(paths)
+            points = np.concatenate([np.asarray(path) for path in paths])
+            self.assertLess(points[:, 0].min(), CENTER_LNG)
+            self.assertGreater(points[:, 0].max(), CENTER_LNG)
+
+
+class WriteDensityTest(unittest.TestCase):
+
+    def test_png_with_bounds_sidecar(self):
+        surface = kde_surface(*cluster(count=50), cell_meters=100, bandwidth=200)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'density.png')
+            write_density(surface, path)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+            with open(os.path.join(tmp, 'density.json'), encoding='utf-8') as f:
+                bounds = json.load(f)
+            self.assertEqual(bounds, {'west': surface.west, 'south': surface.south,
+                                      'east': surface.east, 'north': surface.north})
+            # 临时文件都已替换为正式文件
+            self.assertEqual(sorted(os.listdir(tmp)), ['density.json', 'density.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
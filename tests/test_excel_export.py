@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Excel导出：附加的所属区域、可疑上报两列按 report_id 对应到各行"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from excel_export import EXPORT_HEADERS, export_reports, report_analysis  # noqa: E402
+from resolved_reports import STATUS_FAILED, resolve_reports  # noqa: E402
+from synthetic_data import generate_reports  # noqa: E402
+
+
+def resolved_frame(n=400):
+    """带坐标的模拟上报，前三条按未定位处理"""
+    reports = generate_reports(n, seed=3, include_coordinates=True)
+    resolved = resolve_reports(reports, geocoder=lambda address: None, delay=0)
+    resolved.loc[:2, 'geocode_status'] = STATUS_FAILED
+    return resolved
+
+
+class ExportReportsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.resolved = resolved_frame()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_export(self, source):
+        path = os.path.join(self.tmp.name, 'out.xlsx')
+        self.assertEqual(export_reports(source, path), len(self.resolved))
+        return pd.read_excel(path)
+
+    def test_frame_and_parquet_exports_match(self):
+        parquet = os.path.join(self.tmp.name, 'resolved.parquet')
+        self.resolved.to_parquet(parquet, index=False)
+        from_frame = self.read_export(self.resolved)
+        self.assertTrue(from_frame.equals(self.read_export(parquet)))
+        self.assertIn(EXPORT_HEADERS['cluster'], from_frame.columns)
+        self.assertNotIn('report_id', from_frame.columns)
+
+    def test_analysis_joined_by_report_id(self):
+        exported = self.read_export(self.resolved)
+        cluster = exported[EXPORT_HEADERS['cluster']]
+        anomaly = exported[EXPORT_HEADERS['anomaly']]
+        # 未定位的上报没有区域和可疑标记
+        self.assertTrue(cluster[:3].isna().all() and anomaly[:3].isna().all())
+        expected = report_analysis(self.resolved)
+        ids = self.resolved['report_id'].to_numpy()[3:]
+        self.assertEqual(cluster[3:].astype(int).tolist(), expected.loc[ids, 'cluster'].tolist())
+        self.assertEqual(anomaly[3:].tolist(), expected.loc[ids, 'anomaly'].tolist())
+        self.assertEqual(cluster.min(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
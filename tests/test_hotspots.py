@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""热点分析：向量化的 erfc 近似与标准库结果一致"""
+
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from hotspots import erfc, two_sided_p  # noqa: E402
+
+
+class ErfcTest(unittest.TestCase):
+
+    def test_matches_math_erfc(self):
+        x = np.linspace(-6, 8, 2001)
+        expected = np.array([math.erfc(value) for value in x])
+        np.testing.assert_allclose(erfc(x), expected, rtol=2e-7)
+
+    def test_two_sided_p(self):
+        p = two_sided_p(np.array([0.0, 1.96, -2.576, np.inf]))
+        np.testing.assert_allclose(p, [1.0, 0.05, 0.01, 0.0], atol=1e-4)
+        self.assertLessEqual(p.max(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""重复上报合并：分桶连边与两两比较的结果一致，距离和时间相近的上报合并为一个事件"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from blind_spots import connected_components  # noqa: E402
+from incidents import incident_reports, link_reports  # noqa: E402
+
+
+def brute_force_pairs(x, y, t, distance, window):
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    close = (np.hypot(dx, dy) <= distance) & (np.abs(t[:, None] - t[None, :]) <= window)
+    u, v = np.nonzero(np.triu(close, k=1))
+    return u, v
+
+
+class LinkReportsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 600
+        # 约 600 米见方、30 天内的上报，部分上报集中在几个地点
+        self.x = np.concatenate([rng.uniform(0, 600, n // 2),
+                                 rng.choice([100.0, 350.0], n // 2) + rng.normal(0, 20, n // 2)])
+        self.y = np.concatenate([rng.uniform(0, 600, n // 2),
+                                 rng.choice([120.0, 480.0], n // 2) + rng.normal(0, 20, n // 2)])
+        self.t = rng.uniform(0, 24 * 30, n)
+
+    def test_edges_are_within_distance_and_window(self):
+        u, v = link_reports(self.x, self.y, self.t, 50, 24)
+        self.assertTrue(len(u))
+        self.assertTrue((np.hypot(self.x[u] - self.x[v], self.y[u] - self.y[v]) <= 50).all())
+        self.assertTrue((np.abs(self.t[u] - self.t[v]) <= 24).all())
+        self.assertFalse((u == v).any())
+
+    def test_components_match_brute_force(self):
+        for distance, window in ((50, 24), (100, 24 * 7), (10, 1)):
+            with self.subTest(distance=distance, window=window):
+                u, v = link_reports(self.x, self.y, self.t, distance, window)
+                expected_u, expected_v = brute_force_pairs(self.x, self.y, self.t, distance, window)
+                np.testing.assert_array_equal(
+                    connected_components(len(self.x), u, v),
+                    connected_components(len(self.x), expected_u, expected_v))
+
+
+class IncidentReportsTest(unittest.TestCase):
+
+    def test_nearby_reports_within_window_are_merged(self):
+        located = pd.DataFrame({
+            'name': ['地下车库', '地下车库', '地下车库', '电梯', '地下车库'],
+            'address': [''] * 5,
+            'lng': [120.8664, 120.8665, 120.8664, 120.9000, 120.8664],
+            'lat': [32.0307, 32.0307, 32.0308, 32.0307, 32.0307],
+            'signal': [3, 1, 2, 4, 5],
+            'network': ['4G'] * 5,
+            'time': ['2024-03-01 09:00', '2024-03-02 18:00', '2024-03-03 08:00',
+                     '2024-03-01 09:00', '2024-05-01 09:00'],
+            'reporter': ['张三', '李四', '张三', '王五', '赵六'],
+            'note': [''] * 5,
+        })
+        merged = incident_reports(located)
+        self.assertEqual(sorted(merged['reports'].tolist()), [1, 1, 3])
+        incident = merged[merged['reports'] == 3].iloc[0]
+        self.assertEqual(incident['signal'], 1)
+        self.assertEqual(incident['reporter'], '张三、李四')
+        self.assertIn('2024-03-01 09:00 ~ 2024-03-03 08:00', incident['time'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""后台任务执行器：日志、进度、完成回调在 poll() 线程中按正确的参数调用"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from job_executor import JobExecutor  # noqa: E402
+
+
+def poll_until(executor, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待任务回调超时")
+        executor.poll()
+        time.sleep(0.01)
+
+
+class JobExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = JobExecutor()
+        self.events = []
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_log_passes_message_then_level(self):
+        def task(job):
+            job.log('hello', 'warning')
+            job.log('plain')
+
+        def log_message(message, level='info'):
+            self.events.append((message, level))
+
+        self.executor.submit(task, on_log=log_message, on_done=lambda _: self.events.append('done'))
+        poll_until(self.executor, lambda: 'done' in self.events)
+        self.assertEqual(self.events, [('hello', 'warning'), ('plain', 'info'), 'done'])
+
+    def test_progress_and_done(self):
+        def task(job, total):
+            for done in range(total):
+                job.progress(done + 1, total, '处理中')
+            return total * 10
+
+        def on_progress(job, done, total, message):
+            self.events.append((job.name, done, total, message))
+
+        job = self.executor.submit(task, 3, name='计数', on_progress=on_progress,
+                                   on_done=lambda result: self.events.append(('done', result)))
+        poll_until(self.executor, lambda: ('done', 30) in self.events)
+        self.assertEqual(self.events, [('计数', 1, 3, '处理中'), ('计数', 2, 3, '处理中'),
+                                       ('计数', 3, 3, '处理中'), ('done', 30)])
+        self.assertNotIn(job, self.executor.active_jobs)
+
+    def test_error_reaches_on_error(self):
+        def task(job):
+            raise ValueError('坏数据')
+
+        self.executor.submit(task, on_error=self.events.append)
+        poll_until(self.executor, lambda: self.events)
+        self.assertIsInstance(self.events[0], ValueError)
+        self.assertFalse(self.executor.is_busy())
+
+    def test_base_exception_leaves_active_set(self):
+        def task(job):
+            raise KeyboardInterrupt
+
+        job = self.executor.submit(task, on_error=self.events.append)
+        poll_until(self.executor, lambda: self.events)
+        self.assertIsInstance(self.events[0], KeyboardInterrupt)
+        self.assertNotIn(job, self.executor.active_jobs)
+        self.assertFalse(self.executor.is_busy())
+
+
+if __name__ == '__main__':
+    unittest.main()
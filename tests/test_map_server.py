@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""地图HTTP服务器：不对外提供配置、源码和数据文件；条件请求、预压缩副本和分页接口"""
+
+import gzip
+import http.client
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from map_server import MapServer  # noqa: E402
+from resolved_reports import resolve_reports  # noqa: E402
+from static_assets import write_compressed_siblings  # noqa: E402
+from synthetic_data import generate_reports  # noqa: E402
+
+
+def write_file(root, name, content):
+    path = os.path.join(root, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+class MapServerCase(unittest.TestCase):
+    """在临时目录上以 0 号端口（由系统分配）启动服务器"""
+
+    reports_file = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.server = None
+
+    def start_server(self):
+        self.server = MapServer(self.root, port=0, reports_file=self.reports_file)
+        self.server.start()
+        self.port = self.server.httpd.server_address[1]
+
+    def tearDown(self):
+        if self.server:
+            self.server.stop()
+        self.tmp.cleanup()
+
+    def request(self, path, headers=None):
+        connection = http.client.HTTPConnection('localhost', self.port, timeout=10)
+        try:
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+
+class ForbiddenPathTest(MapServerCase):
+
+    def test_config_source_and_data_are_not_served(self):
+        write_file(self.root, 'map.html', '<html></html>')
+        write_file(self.root, 'config.py', 'AMAP_API_KEY = "secret"')
+        write_file(self.root, '.git/config', '[core]')
+        write_file(self.root, 'data/resolved_reports.parquet', 'rows')
+        self.start_server()
+        self.assertEqual(self.request('/map.html')[0], 200)
+        for path in ('/config.py', '/.git/config', '/data/resolved_reports.parquet',
+                     '/%2Egit/config', '/Data/resolved_reports.parquet', '/CONFIG.PY'):
+            with self.subTest(path=path):
+                status, _, body = self.request(path)
+                self.assertEqual(status, 404)
+                self.assertNotIn(b'secret', body)
+
+
+class ConditionalRequestTest(MapServerCase):
+
+    def setUp(self):
+        super().setUp()
+        self.page = write_file(self.root, 'map.html', '<html>' + '信号覆盖' * 2000 + '</html>')
+        write_compressed_siblings(self.page)
+        self.start_server()
+
+    def test_if_none_match_returns_304(self):
+        status, headers, _ = self.request('/map.html')
+        self.assertEqual(status, 200)
+        etag = headers['ETag']
+        status, headers, body = self.request('/map.html', {'If-None-Match': etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(headers['ETag'], etag)
+        self.assertEqual(body, b'')
+        # 内容变化后 ETag 不再匹配
+        write_file(self.root, 'map.html', '<html>changed</html>')
+        self.assertEqual(self.request('/map.html', {'If-None-Match': etag})[0], 200)
+
+    def test_gzip_variant_with_vary(self):
+        with open(self.page, 'rb') as f:
+            original = f.read()
+        status, headers, body = self.request('/map.html', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertEqual(gzip.decompress(body), original)
+
+        status, headers, body = self.request('/map.html')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(body, original)
+
+
+class PointsPagingTest(MapServerCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reports_file = os.path.join(self.root, 'reports.parquet')
+        resolved = resolve_reports(generate_reports(1000, seed=11, include_coordinates=True),
+                                   geocoder=lambda address: None, delay=0)
+        resolved.to_parquet(self.reports_file)
+        self.start_server()
+
+    def get_json(self, path):
+        status, _, body = self.request(path)
+        self.assertEqual(status, 200)
+        return json.loads(body)
+
+    def test_pages_do_not_repeat_rows(self):
+        for query in ('', '&bbox=120.80,31.95,120.95,32.10', '&max_signal=5&zoom=16'):
+            with self.subTest(query=query):
+                first = self.get_json(f'/api/points?page_size=70{query}')
+                self.assertEqual(first['mode'], 'points')
+                ids = []
+                for page in range(1, first['pages'] + 1):
+                    result = self.get_json(f'/api/points?page_size=70&page={page}{query}')
+                    self.assertEqual(result['page'], page)
+                    ids.extend(row[0] for row in result['points'])
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(len(ids), first['total'])
+
+
+if __name__ == '__main__':
+    unittest.main()
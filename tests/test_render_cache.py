@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""渲染缓存：按输入文件摘要记录的产物在读取输入前即可判断能否复用"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from render_cache import RenderCache  # noqa: E402
+
+
+class InputKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = self.touch('map.html')
+        self.data = self.touch('map.data.0123456789ab.js')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, name):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(name)
+        return path
+
+    def test_input_key_survives_reload(self):
+        RenderCache(self.tmp.name).record_input(self.page, 'key-1', [self.data])
+        cache = RenderCache(self.tmp.name)
+        self.assertTrue(cache.is_fresh_input(self.page, 'key-1'))
+        self.assertFalse(cache.is_fresh_input(self.page, 'key-2'))
+
+    def test_missing_dependency_is_not_fresh(self):
+        cache = RenderCache(self.tmp.name)
+        cache.record_input(self.page, 'key-1', [self.data])
+        os.remove(self.data)
+        self.assertFalse(cache.is_fresh_input(self.page, 'key-1'))
+
+    def test_input_entry_does_not_affect_output_key(self):
+        cache = RenderCache(self.tmp.name)
+        cache.record(self.page, 'rows-1')
+        cache.record_input(self.page, 'key-1')
+        self.assertTrue(cache.is_fresh(self.page, 'rows-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""上报查询接口：无效的整数参数返回 400，而不是服务器错误"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from report_api import ApiError, _parse_int  # noqa: E402
+
+
+class ParseIntTest(unittest.TestCase):
+
+    def test_clamps_to_range(self):
+        self.assertEqual(_parse_int({'page': '7.9'}, 'page', 1, 1, 5), 5)
+        self.assertEqual(_parse_int({'page': '-3'}, 'page', 1, 1, 5), 1)
+        self.assertEqual(_parse_int({}, 'page', 1, 1, 5), 1)
+
+    def test_invalid_values_are_client_errors(self):
+        for value in ('abc', 'nan', 'inf', '-inf', '1e400'):
+            with self.subTest(value=value), self.assertRaises(ApiError) as raised:
+                _parse_int({'page_size': value}, 'page_size', 100, 1, 1000)
+            self.assertEqual(raised.exception.status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
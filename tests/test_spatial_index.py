@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""空间索引：矩形、半径、kNN 查询与逐点扫描的结果一致（含增量插入）"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from spatial_index import GeoIndex, GridIndex, meter_scales  # noqa: E402
+
+
+def random_points(count, seed):
+    """城区范围内的点，一半集中在一个小簇里，制造网格疏密不均"""
+    rng = np.random.default_rng(seed)
+    spread = rng.uniform([120.80, 31.98], [120.95, 32.08], (count - count // 2, 2))
+    dense = rng.normal([120.87, 32.03], 0.002, (count // 2, 2))
+    points = np.vstack([spread, dense])
+    return points[:, 0], points[:, 1]
+
+
+class GridIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lng, self.lat = random_points(2000, seed=3)
+        self.queries = random_points(60, seed=4)
+
+    def check_against_scan(self, index, lng, lat):
+        for min_lng, min_lat, width, height in ((120.86, 32.02, 0.02, 0.015),
+                                                (120.70, 31.90, 0.50, 0.30),
+                                                (121.50, 33.00, 0.01, 0.01)):
+            max_lng, max_lat = min_lng + width, min_lat + height
+            expected = np.flatnonzero((lng >= min_lng) & (lng <= max_lng)
+                                      & (lat >= min_lat) & (lat <= max_lat))
+            np.testing.assert_array_equal(index.query_bbox(min_lng, min_lat, max_lng, max_lat),
+                                          expected)
+
+        for qlng, qlat in zip(*self.queries):
+            d = np.hypot(lng - qlng, lat - qlat)
+            dist, idx = index.query_radius(qlng, qlat, 0.006)
+            np.testing.assert_array_equal(np.sort(idx), np.flatnonzero(d <= 0.006))
+            self.assertTrue(np.all(np.diff(dist) >= 0))
+
+        k = 7
+        dist, idx = index.query_knn(*self.queries, k)
+        for row, (qlng, qlat) in enumerate(zip(*self.queries)):
+            d = np.hypot(lng - qlng, lat - qlat)
+            nearest = np.argsort(d, kind='stable')[:k]
+            np.testing.assert_allclose(dist[row], d[nearest])
+            np.testing.assert_allclose(d[idx[row]], d[nearest])
+
+    def test_bulk_build(self):
+        index = GridIndex(self.lng, self.lat, cell_size=0.005)
+        self.check_against_scan(index, self.lng, self.lat)
+
+    def test_incremental_insert(self):
+        index = GridIndex(self.lng[:500], self.lat[:500], cell_size=0.005)
+        index.insert(self.lng[500:1500], self.lat[500:1500])
+        # 超出原网格范围的点触发重建
+        far_lng, far_lat = np.array([121.20, 120.50]), np.array([32.30, 31.70])
+        new_idx = index.insert(far_lng, far_lat)
+        np.testing.assert_array_equal(new_idx, [1500, 1501])
+        lng = np.r_[self.lng[:1500], far_lng]
+        lat = np.r_[self.lat[:1500], far_lat]
+        self.check_against_scan(index, lng, lat)
+
+    def test_knn_padding_and_max_distance(self):
+        index = GridIndex([0.0, 1.0, 3.0], [0.0, 0.0, 0.0], cell_size=0.5)
+        dist, idx = index.query_knn([0.1], [0.0], 5)
+        np.testing.assert_array_equal(idx[0], [0, 1, 2, -1, -1])
+        self.assertTrue(np.isinf(dist[0, 3:]).all())
+        dist, idx = index.query_knn([0.1], [0.0], 3, max_distance=1.0)
+        np.testing.assert_array_equal(idx[0], [0, 1, -1])
+
+
+class GeoIndexTest(unittest.TestCase):
+
+    def test_radius_in_meters_matches_scan(self):
+        lng, lat = random_points(1500, seed=5)
+        index = GeoIndex(lng, lat, cell_meters=200)
+        lng_scale, lat_scale = meter_scales(lat)
+        for qlng, qlat in zip(*random_points(40, seed=6)):
+            d = np.hypot((lng - qlng) * lng_scale, (lat - qlat) * lat_scale)
+            dist, idx = index.query_radius(qlng, qlat, 300)
+            np.testing.assert_array_equal(np.sort(idx), np.flatnonzero(d <= 300))
+            np.testing.assert_allclose(dist, np.sort(d[d <= 300]))
+            dist, idx = index.query_knn([qlng], [qlat], 3)
+            np.testing.assert_allclose(dist[0], np.sort(d)[:3])
+
+    def test_bbox_matches_scan(self):
+        lng, lat = random_points(1500, seed=7)
+        index = GeoIndex(lng, lat)
+        expected = np.flatnonzero((lng >= 120.865) & (lng <= 120.875)
+                                  & (lat >= 32.025) & (lat <= 32.035))
+        np.testing.assert_array_equal(index.query_bbox(120.865, 32.025, 120.875, 32.035), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()